@@ -0,0 +1,130 @@
+"""
+Seeded generator of FakeStore-shaped products, users and carts.
+
+Every record is derived from (seed, entity, id) alone, so any slice of
+an endpoint can be produced independently and identically across runs,
+which lets the stub server page through millions of carts lazily.
+"""
+import random
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Iterator
+
+CATEGORIES = ["electronics", "jewelery", "men's clothing", "women's clothing"]
+CITIES = ["kilcoole", "cullman", "san antonio", "el paso", "fresno", "mesa"]
+FIRST_NAMES = ["john", "david", "kevin", "don", "derek", "david", "miriam", "william"]
+LAST_NAMES = ["doe", "morrison", "ryan", "romer", "powell", "russell", "snyder", "hopkins"]
+
+START_DATE = date(2019, 1, 1)
+DATE_SPAN_DAYS = 3 * 365
+
+
+@dataclass(frozen=True)
+class Scale:
+    """
+    Number of records per endpoint.
+    """
+
+    carts: int
+    users: int
+    products: int
+
+    @classmethod
+    def from_carts(cls, carts: int) -> "Scale":
+        """
+        Derive user and product counts from the cart volume.
+        """
+        return cls(
+            carts=carts,
+            users=max(10, carts // 20),
+            products=max(20, carts // 100),
+        )
+
+    def count(self, entity: str) -> int:
+        return getattr(self, entity)
+
+
+def _rng(seed: int, entity: str, record_id: int) -> random.Random:
+    return random.Random(f"{seed}:{entity}:{record_id}")
+
+
+def product(record_id: int, seed: int) -> dict:
+    rng = _rng(seed, "products", record_id)
+    return {
+        "id": record_id,
+        "title": f"Product {record_id} {rng.choice(['Slim', 'Classic', 'Pro', 'Lite'])}",
+        "price": round(rng.uniform(1, 1000), 2),
+        "description": "Synthetic product generated for benchmarks.",
+        "category": rng.choice(CATEGORIES),
+        "image": f"https://fakestoreapi.com/img/{record_id}.jpg",
+        "rating": {
+            "rate": round(rng.uniform(0, 5), 1),
+            "count": rng.randint(0, 1000),
+        },
+    }
+
+
+def user(record_id: int, seed: int) -> dict:
+    rng = _rng(seed, "users", record_id)
+    first_name = rng.choice(FIRST_NAMES)
+    last_name = rng.choice(LAST_NAMES)
+    return {
+        "id": record_id,
+        "email": f"{first_name}.{last_name}{record_id}@gmail.com",
+        "username": f"{first_name}{record_id}",
+        "password": "m38rmF$",
+        "name": {"firstname": first_name, "lastname": last_name},
+        "address": {
+            "city": rng.choice(CITIES),
+            "street": "new road",
+            "number": rng.randint(1, 9999),
+            "zipcode": f"{rng.randint(10000, 99999)}-{rng.randint(1000, 9999)}",
+            "geolocation": {
+                "lat": f"{rng.uniform(-90, 90):.4f}",
+                "long": f"{rng.uniform(-180, 180):.4f}",
+            },
+        },
+        "phone": f"1-570-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+    }
+
+
+def cart(record_id: int, seed: int, scale: Scale) -> dict:
+    rng = _rng(seed, "carts", record_id)
+    cart_date = START_DATE + timedelta(days=rng.randrange(DATE_SPAN_DAYS))
+    product_ids = rng.sample(
+        range(1, scale.products + 1), k=min(scale.products, rng.randint(1, 5))
+    )
+    return {
+        "id": record_id,
+        "userId": rng.randint(1, scale.users),
+        "date": f"{cart_date.isoformat()}T00:00:00.000Z",
+        "products": [
+            {"productId": product_id, "quantity": rng.randint(1, 10)}
+            for product_id in product_ids
+        ],
+        "__v": 0,
+    }
+
+
+def generate(
+    entity: str,
+    scale: Scale,
+    seed: int,
+    offset: int = 0,
+    limit: int | None = None,
+) -> Iterator[dict]:
+    """
+    Yield records of one endpoint ("products", "users" or "carts").
+    """
+    total = scale.count(entity)
+    stop = total if limit is None else min(total, offset + limit)
+
+    for record_id in range(offset + 1, stop + 1):
+        if entity == "products":
+            yield product(record_id, seed)
+        elif entity == "users":
+            yield user(record_id, seed)
+        elif entity == "carts":
+            yield cart(record_id, seed, scale)
+        else:
+            raise ValueError(f"Unknown entity: {entity}")
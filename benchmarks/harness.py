@@ -0,0 +1,285 @@
+"""
+End-to-end stage benchmark against a local Postgres.
+
+Serves generated FakeStore data from the local stub, runs every
+pipeline stage in order and records, per stage, wall time, rows/sec,
+peak RSS and warehouse round-trips into a JSON results file. With
+--baseline, the run is compared against an earlier results file and
+the process exits non-zero when a stage regressed beyond --tolerance.
+
+The warehouse is taken from the usual DW_* settings; the API base URL
+is pointed at the stub and LOAD_MODE is forced to "full".
+
+Usage:
+    python -m benchmarks.harness --carts 100000 --reset --output results.json
+    python -m benchmarks.harness --carts 100000 --reset --baseline results.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+from benchmarks.generator import Scale
+from benchmarks.stub_server import running_stub
+
+RESET_TABLES = [
+    "gold.agg_daily_product_sales",
+    "gold.agg_user_lifetime",
+    "gold.fact_sales",
+    "gold.dim_date",
+    "gold.dim_product",
+    "gold.dim_user",
+    "silver.cart_items",
+    "silver.carts",
+    "silver.products",
+    "silver.users",
+    "raw.carts",
+    "raw.products",
+    "raw.users",
+    "pipeline.watermarks",
+]
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "sql" / "migrations"
+
+
+# MEASUREMENT
+def _reset_peak_rss() -> bool:
+    """
+    Reset the kernel high-water mark so each stage reports its own peak.
+    """
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb() -> float:
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    # ru_maxrss is KiB on Linux and bytes on macOS; never reset per stage
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _rows(result) -> int:
+    """
+    Rows processed by a stage, whatever shape its return value has.
+    """
+    if isinstance(result, dict):
+        return sum(_rows(value) for value in result.values())
+    if isinstance(result, int) and not isinstance(result, bool):
+        return result
+    return 0
+
+
+def _measure(name: str, step: Callable, rows_hint: int) -> dict:
+    from etl.db import db_stats
+    from etl.metrics import stage
+
+    per_stage_rss = _reset_peak_rss()
+    round_trips = db_stats()["round_trips"]
+    start = time.perf_counter()
+
+    with stage(name) as metrics:
+        result = step()
+
+    seconds = time.perf_counter() - start
+    rows = _rows(result) or rows_hint
+
+    return {
+        "stage": name,
+        "seconds": round(seconds, 4),
+        "rows": rows,
+        "rows_per_sec": round(rows / seconds, 1) if seconds else None,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "peak_rss_scope": "stage" if per_stage_rss else "process",
+        "round_trips": db_stats()["round_trips"] - round_trips,
+        "metrics": metrics.as_dict(),
+    }
+
+
+# PIPELINE
+def _stages(scale: Scale) -> List[Tuple[str, Callable, int]]:
+    from etl.bronze import load_products_raw, load_users_raw, load_carts_raw
+    from etl.silver import transform_products, transform_users, transform_carts
+    from etl.gold import (
+        load_dim_user,
+        load_dim_product,
+        load_dim_date,
+        load_fact_sales,
+        publish_gold,
+    )
+    from etl.quality import (
+        validate_silver_products,
+        validate_silver_users,
+        validate_silver_cart_items,
+    )
+
+    return [
+        ("bronze.products", load_products_raw, scale.products),
+        ("bronze.users", load_users_raw, scale.users),
+        ("bronze.carts", load_carts_raw, scale.carts),
+        ("silver.products", transform_products, scale.products),
+        ("silver.users", transform_users, scale.users),
+        ("silver.carts", transform_carts, scale.carts),
+        ("quality.silver.products", validate_silver_products, scale.products),
+        ("quality.silver.users", validate_silver_users, scale.users),
+        ("quality.silver.cart_items", validate_silver_cart_items, scale.carts),
+        ("gold.dim_user", load_dim_user, scale.users),
+        ("gold.dim_product", load_dim_product, scale.products),
+        ("gold.dim_date", load_dim_date, 0),
+        ("gold.fact_sales", load_fact_sales, 0),
+        ("gold.publish", publish_gold, 0),
+    ]
+
+
+def _prepare_database(apply_migrations: bool, reset: bool) -> None:
+    from etl.db import execute_query
+
+    if apply_migrations:
+        for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+            execute_query(path.read_text())
+
+    if reset:
+        execute_query(f"TRUNCATE {', '.join(RESET_TABLES)} RESTART IDENTITY CASCADE;")
+
+
+def run(scale: Scale, seed: int, apply_migrations: bool, reset: bool) -> dict:
+    with running_stub(scale, seed) as base_url:
+        os.environ["FAKESTORE_API_BASE_URL"] = base_url
+        os.environ["LOAD_MODE"] = "full"
+
+        from etl.api import get_client
+        from etl.config import get_settings
+        from etl.keys import reset_key_caches
+
+        get_settings.cache_clear()
+        get_client.cache_clear()
+        reset_key_caches()
+
+        _prepare_database(apply_migrations, reset)
+
+        stages = [
+            _measure(name, step, rows_hint)
+            for name, step, rows_hint in _stages(scale)
+        ]
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "scale": {
+            "carts": scale.carts,
+            "users": scale.users,
+            "products": scale.products,
+        },
+        "stages": stages,
+    }
+
+
+# BASELINE COMPARISON
+def compare(current: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    List stages slower, hungrier or chattier than the baseline.
+
+    Throughput may drop and RSS/round-trips may grow by at most
+    ``tolerance`` (a fraction) before a stage is flagged.
+    """
+    if current["scale"] != baseline["scale"]:
+        return [
+            f"scale mismatch: current={current['scale']} baseline={baseline['scale']}"
+        ]
+
+    previous = {stage["stage"]: stage for stage in baseline["stages"]}
+    regressions = []
+
+    for stage in current["stages"]:
+        before = previous.get(stage["stage"])
+        if before is None:
+            continue
+
+        name = stage["stage"]
+
+        if before["rows_per_sec"] and stage["rows_per_sec"] is not None:
+            if stage["rows_per_sec"] < before["rows_per_sec"] * (1 - tolerance):
+                regressions.append(
+                    f"{name}: rows/sec {before['rows_per_sec']} -> {stage['rows_per_sec']}"
+                )
+
+        for metric in ("peak_rss_mb", "round_trips"):
+            if stage[metric] > before[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: {metric} {before[metric]} -> {stage[metric]}"
+                )
+
+    return regressions
+
+
+def _print_table(results: dict) -> None:
+    print(f"{'stage':<28}{'rows':>12}{'rows/sec':>14}{'rss MB':>10}{'round-trips':>13}")
+    for stage in results["stages"]:
+        rate = stage["rows_per_sec"] or 0
+        print(
+            f"{stage['stage']:<28}{stage['rows']:>12,}{rate:>14,.0f}"
+            f"{stage['peak_rss_mb']:>10,.1f}{stage['round_trips']:>13,}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pipeline stage benchmark")
+    parser.add_argument("--carts", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, default=Path("benchmark_results.json"))
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument(
+        "--apply-migrations",
+        action="store_true",
+        help="Run sql/migrations before benchmarking.",
+    )
+    parser.add_argument(
+        "--reset",
+        action="store_true",
+        help="Truncate raw, silver, gold and pipeline tables first.",
+    )
+    args = parser.parse_args()
+
+    results = run(
+        Scale.from_carts(args.carts),
+        args.seed,
+        args.apply_migrations,
+        args.reset,
+    )
+
+    args.output.write_text(json.dumps(results, indent=2))
+    _print_table(results)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        regressions = compare(
+            results,
+            json.loads(args.baseline.read_text()),
+            args.tolerance,
+        )
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Rows/sec of raw payload decoding plus silver preparation, dict path vs
+typed path.
+
+Both paths start from the same synthetic payloads as JSON text, the
+form they have in raw.* (JSONB). The dict path decodes them into nested
+dicts, as psycopg does for dict rows, and runs the Python engine; the
+typed path decodes them into slotted structs with msgspec and runs the
+typed engine. Database reads and writes are excluded.
+
+Usage:
+    python -m benchmarks.payload_decoding --rows 200000 --batch-size 500
+"""
+import argparse
+import json
+import time
+from typing import Callable, List
+
+from benchmarks import generator
+from etl import silver_typed
+from etl.silver import _prepare_cart, _prepare_product, _prepare_user
+
+PREPARE = {
+    "products": (_prepare_product, silver_typed.prepare_product),
+    "users": (_prepare_user, silver_typed.prepare_user),
+    "carts": (_prepare_cart, silver_typed.prepare_cart),
+}
+
+
+def _payloads(entity: str, count: int, seed: int) -> List[tuple]:
+    # Every entity at the requested row count
+    scale = generator.Scale(carts=count, users=count, products=count)
+    return [
+        (record["id"], json.dumps(record))
+        for record in generator.generate(entity, scale, seed, limit=count)
+    ]
+
+
+def _dict_path(entity: str) -> Callable[[List[tuple]], int]:
+    prepare = PREPARE[entity][0]
+
+    def run(rows: List[tuple]) -> int:
+        decoded = [
+            {"id": record_id, "payload": json.loads(payload)}
+            for record_id, payload in rows
+        ]
+        return sum(1 for row in decoded if prepare(row["id"], row["payload"]))
+
+    return run
+
+
+def _typed_path(entity: str) -> Callable[[List[tuple]], int]:
+    prepare = PREPARE[entity][1]
+
+    def run(rows: List[tuple]) -> int:
+        return sum(
+            1
+            for record_id, data in silver_typed.decode_payloads(entity, rows)
+            if prepare(record_id, data)
+        )
+
+    return run
+
+
+def _measure(transform: Callable[[List[tuple]], int], batches: List[List[tuple]]) -> float:
+    start = time.perf_counter()
+    rows = sum(transform(batch) for batch in batches)
+    return rows / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    for entity in PREPARE:
+        rows = _payloads(entity, args.rows, args.seed)
+        batches = [
+            rows[i:i + args.batch_size]
+            for i in range(0, len(rows), args.batch_size)
+        ]
+        rates = {
+            "dict": _measure(_dict_path(entity), batches),
+            "typed": _measure(_typed_path(entity), batches),
+        }
+        for path, rate in rates.items():
+            print(f"{entity:<10} {path:<10} {rate:>14,.0f} rows/sec ({len(rows):,} rows)")
+        print(f"{entity:<10} {'speedup':<10} {rates['typed'] / rates['dict']:>14.2f}x")
+
+
+if __name__ == "__main__":
+    main()
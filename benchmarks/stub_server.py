@@ -0,0 +1,107 @@
+"""
+Local HTTP stub serving generated FakeStore data.
+
+Serves /products, /users and /carts as JSON arrays, honouring the
+limit/offset query parameters used by FakeStoreClient. Bodies are
+streamed, so large scales do not need to fit in memory.
+
+Usage:
+    python -m benchmarks.stub_server --carts 100000 --port 8765
+"""
+import argparse
+import json
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.generator import Scale, generate
+
+ENTITIES = ("products", "users", "carts")
+
+# Records serialized per socket write
+WRITE_BATCH = 1000
+
+
+def _handler(scale: Scale, seed: int) -> type:
+    class FakeStoreHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            url = urlparse(self.path)
+            entity = url.path.strip("/")
+
+            if entity not in ENTITIES:
+                self.send_error(404)
+                return
+
+            query = parse_qs(url.query)
+            limit = int(query["limit"][0]) if "limit" in query else None
+            offset = int(query["offset"][0]) if "offset" in query else 0
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+
+            self.wfile.write(b"[")
+            batch = []
+            first = True
+
+            for record in generate(entity, scale, seed, offset, limit):
+                batch.append(json.dumps(record))
+                if len(batch) >= WRITE_BATCH:
+                    self._write(batch, first)
+                    first = False
+                    batch = []
+
+            if batch:
+                self._write(batch, first)
+
+            self.wfile.write(b"]")
+
+        def _write(self, batch: list, first: bool) -> None:
+            prefix = "" if first else ","
+            self.wfile.write((prefix + ",".join(batch)).encode("utf-8"))
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    return FakeStoreHandler
+
+
+@contextmanager
+def running_stub(
+    scale: Scale,
+    seed: int,
+    host: str = "127.0.0.1",
+    port: int = 0,
+) -> Iterator[str]:
+    """
+    Run the stub in a background thread and yield its base URL.
+    """
+    server = ThreadingHTTPServer((host, port), _handler(scale, seed))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    try:
+        yield f"http://{host}:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="FakeStore stub server")
+    parser.add_argument("--carts", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    scale = Scale.from_carts(args.carts)
+    server = ThreadingHTTPServer((args.host, args.port), _handler(scale, args.seed))
+    print(f"Serving {scale} on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,199 @@
-from etl.flow import etl_flow
+"""
+Run pipeline stages from the command line, without Prefect.
+
+Only the modules of the selected stages are imported. Stages run one
+after another in dependency order (see etl.stages), except bronze
+ingestions, which are independent and run concurrently, up to
+API_MAX_CONCURRENCY at a time, and quality checks, which run alongside
+the next transforms of their layer.
+
+In full mode a gold selection must include every gold table, since the
+refreshed tables are published together.
+
+Every run is checkpointed under a run id (see etl.checkpoint). Running
+again with the id of a failed run, or with --resume, skips the stages it
+finished and continues the others from their last committed batch.
+
+Usage:
+    python -m etl
+    python -m etl --stage silver --entity carts --mode full
+    python -m etl --stage gold --entity dim_user --entity fact_sales
+    python -m etl --resume
+    python -m etl --prefect
+"""
+import os
+import sys
+import time
+import argparse
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+
+from etl.stages import LAYERS, STAGES, Stage, describe, run_stage, select
+
+logger = logging.getLogger("etl")
+
+
+def _parse_args(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m etl",
+        description="Run pipeline stages without Prefect",
+    )
+    parser.add_argument(
+        "--stage",
+        choices=LAYERS,
+        action="append",
+        help="layer to run; repeatable (default: all)",
+    )
+    parser.add_argument(
+        "--entity",
+        choices=sorted({stage.entity for stage in STAGES}),
+        action="append",
+        help="entity to run within the selected layers; repeatable (default: all)",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=("full", "incremental"),
+        help="override LOAD_MODE for this run",
+    )
+    parser.add_argument(
+        "--run-id",
+        help="run id to start, or to resume when it already exists",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="resume the most recent run that did not succeed",
+    )
+    parser.add_argument(
+        "--list",
+        action="store_true",
+        help="print the selected stages and exit",
+    )
+    parser.add_argument(
+        "--prefect",
+        action="store_true",
+        help="run the whole pipeline as the Prefect flow instead",
+    )
+    return parser.parse_args(argv)
+
+
+def _run_stages(stages: list[Stage], max_concurrency: int) -> None:
+    """
+    Run stages layer by layer, in order, with two exceptions: bronze
+    ingestions run concurrently, and quality checks run in the
+    background while the next stages of their layer run, like in the
+    Prefect flow. A layer's checks finish before the next layer starts.
+    """
+    for layer, group in groupby(stages, key=lambda stage: stage.layer):
+        labels = [stage.label for stage in group]
+
+        if layer == "bronze":
+            workers = max_concurrency
+            background = labels
+        else:
+            background = [label for label in labels if label.startswith("quality.")]
+            workers = max(len(background), 1)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+
+            for label in labels:
+                if label in background:
+                    futures[label] = executor.submit(run_stage, label)
+                else:
+                    result, summary = run_stage(label)
+                    logger.info(describe(label, result, summary))
+
+            for label, future in futures.items():
+                result, summary = future.result()
+                logger.info(describe(label, result, summary))
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _parse_args(argv)
+
+    # Before settings are first loaded; also seen by silver worker processes
+    if args.mode:
+        os.environ["LOAD_MODE"] = args.mode
+
+    if args.prefect:
+        from etl.flow import etl_flow
+
+        etl_flow()
+        return 0
+
+    stages = select(args.stage, args.entity)
+
+    if not stages:
+        print("No stage matches the selected layers and entities.", file=sys.stderr)
+        return 2
+
+    if args.list:
+        for stage in stages:
+            print(stage.label)
+        return 0
+
+    from etl import checkpoint
+    from etl.config import get_settings
+    from etl.metrics import export_run_metrics, reset_run_metrics
+
+    settings = get_settings()
+    logging.basicConfig(
+        level=settings.log_level,
+        format="%(asctime)s | %(levelname)s | %(message)s",
+    )
+    logger.info(f"Load mode: {settings.load_mode}")
+
+    # A full refresh publishes every gold table at once, so it must
+    # rebuild all of them
+    gold = {stage.label for stage in stages if stage.layer == "gold"}
+    if gold and settings.load_mode == "full":
+        skipped = [
+            stage.label
+            for stage in STAGES
+            if stage.layer == "gold" and stage.label not in gold
+        ]
+        if skipped:
+            print(
+                "A full refresh rebuilds every gold table; selection skips: "
+                + ", ".join(skipped),
+                file=sys.stderr,
+            )
+            return 2
+
+    run_id = args.run_id
+    if args.resume:
+        run_id = checkpoint.last_unfinished_run()
+        if run_id is None:
+            print("No unfinished run to resume.", file=sys.stderr)
+            return 2
+    run_id = run_id or checkpoint.new_run_id()
+    logger.info(f"Run id: {run_id}")
+
+    if any(stage.layer == "gold" for stage in stages):
+        from etl.keys import reset_key_caches
+
+        reset_key_caches()
+
+    reset_run_metrics()
+    checkpoint.begin_run(run_id)
+    total_start = time.perf_counter()
+
+    try:
+        _run_stages(stages, settings.api_max_concurrency)
+    except BaseException:
+        checkpoint.end_run(succeeded=False)
+        raise
+
+    checkpoint.end_run(succeeded=True)
+    logger.info(f"Completed {len(stages)} stages in {time.perf_counter() - total_start:.2f}s")
+
+    for path in export_run_metrics(run_id):
+        logger.info(f"Metrics written to {path}")
+
+    return 0
+
 
 if __name__ == "__main__":
-    etl_flow()
+    sys.exit(main())
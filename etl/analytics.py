@@ -0,0 +1,405 @@
+"""
+Read-side access to the gold analytics queries.
+
+Each query of sql/analytics_aggregates.sql is exposed as a function.
+Results are cached under the current gold data version
+(pipeline.data_versions), which gold_layer bumps once its loads have
+committed, so a cached result is served until gold actually changes.
+
+The in-memory tier is an LRU bounded by entry count and by the pickled
+size of the results. With ANALYTICS_CACHE_DIR set, results are also
+written to disk, within the same bounds, so a restarted process serves
+warm results without querying the warehouse.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, List, Tuple
+
+from etl.config import get_settings
+from etl.db import fetch_all
+
+logger = logging.getLogger(__name__)
+
+GOLD = "gold"
+
+
+# DATA VERSION
+_version_lock = threading.Lock()
+_version: Tuple[int, float] | None = None  # (version, read at)
+
+
+def data_version(refresh: bool = False) -> int:
+    """
+    Current gold data version.
+
+    Re-read from the warehouse at most every ANALYTICS_VERSION_TTL_SECONDS.
+    """
+    global _version
+
+    ttl = get_settings().analytics_version_ttl_seconds
+
+    with _version_lock:
+        if (
+            not refresh
+            and _version is not None
+            and time.monotonic() - _version[1] < ttl
+        ):
+            return _version[0]
+
+    rows = fetch_all(
+        "SELECT version FROM pipeline.data_versions WHERE layer = %s",
+        (GOLD,),
+    )
+    version = rows[0]["version"] if rows else 0
+
+    with _version_lock:
+        _version = (version, time.monotonic())
+
+    return version
+
+
+def bump_data_version() -> int:
+    """
+    Mark gold as changed. Called once the gold loads have committed.
+    """
+    global _version
+
+    version = fetch_all(
+        """
+        INSERT INTO pipeline.data_versions (layer, version)
+        VALUES (%s, 1)
+        ON CONFLICT (layer)
+        DO UPDATE SET
+            version = pipeline.data_versions.version + 1,
+            updated_at = NOW()
+        RETURNING version
+        """,
+        (GOLD,),
+    )[0]["version"]
+
+    with _version_lock:
+        _version = (version, time.monotonic())
+
+    return version
+
+
+# CACHE
+class ResultCache:
+    """
+    Size-bounded LRU of query results with an optional on-disk tier.
+
+    Entries are keyed by (version, query name, params). On disk they live
+    under <directory>/<version>/, in a directory only the current user
+    can access, since cached results are unpickled when read back. The
+    disk tier is bounded like the memory one, dropping the least recently
+    written files first, and directories of older versions are removed
+    when a newer version is first written.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        directory: str | None = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.directory = Path(directory) if directory else None
+        self._entries: "OrderedDict[tuple, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._disk_ready: bool | None = None
+        self._disk_version: int | None = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _path(self, key: tuple) -> Path:
+        version, name, params = key
+        digest = hashlib.sha256(repr(params).encode("utf-8")).hexdigest()[:16]
+        return self.directory / str(version) / f"{name}-{digest}.pkl"
+
+    def _remember(self, key: tuple, value: Any, size: int) -> None:
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+
+        self._entries[key] = (value, size)
+        self._bytes += size
+
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+
+    def _use_disk(self) -> bool:
+        """
+        Create the cache directory as private to the current user, or
+        tighten its permissions. The disk tier is disabled when that
+        fails. Checked once per cache.
+        """
+        if self.directory is None:
+            return False
+
+        with self._disk_lock:
+            if self._disk_ready is None:
+                try:
+                    self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+                    if self.directory.stat().st_mode & 0o077:
+                        os.chmod(self.directory, 0o700)
+                    self._disk_ready = True
+                except OSError as e:
+                    logger.warning(
+                        f"analytics cache: disk tier disabled, "
+                        f"could not secure {self.directory}: {e}"
+                    )
+                    self._disk_ready = False
+
+            return self._disk_ready
+
+    def get(self, key: tuple) -> Tuple[bool, Any]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key][0]
+
+        if self._use_disk():
+            try:
+                payload = self._path(key).read_bytes()
+            except OSError:
+                payload = None
+
+            if payload is not None:
+                value = pickle.loads(payload)
+                with self._lock:
+                    self._remember(key, value, len(payload))
+                    self.disk_hits += 1
+                return True, value
+
+        with self._lock:
+            self.misses += 1
+        return False, None
+
+    def put(self, key: tuple, value: Any) -> None:
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+        with self._lock:
+            self._remember(key, value, len(payload))
+
+        if len(payload) <= self.max_bytes and self._use_disk():
+            self._write(key, payload)
+
+    def _write(self, key: tuple, payload: bytes) -> None:
+        version = key[0]
+        path = self._path(key)
+
+        try:
+            with self._disk_lock:
+                if self._disk_version is not None and version < self._disk_version:
+                    return
+                if version != self._disk_version:
+                    self._prune(version)
+                    self._disk_version = version
+
+                path.parent.mkdir(mode=0o700, exist_ok=True)
+                tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+                fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                with os.fdopen(fd, "wb") as file:
+                    file.write(payload)
+                os.replace(tmp, path)
+
+                self._evict(path.parent)
+        except OSError as e:
+            logger.warning(f"analytics cache: could not write {path}: {e}")
+
+    def _prune(self, version: int) -> None:
+        """
+        Remove the directories of versions older than `version`. Newer
+        ones belong to processes that have already seen a later version.
+        """
+        for child in self.directory.iterdir():
+            if child.is_dir() and child.name.isdigit() and int(child.name) < version:
+                shutil.rmtree(child, ignore_errors=True)
+
+    def _evict(self, directory: Path) -> None:
+        """
+        Bound a version directory by entry count and bytes, removing the
+        least recently written files first.
+        """
+        files = []
+        for path in directory.glob("*.pkl"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        files.sort()
+        count = len(files)
+        total = sum(size for _, size, _ in files)
+
+        for _, size, path in files:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            count -= 1
+            total -= size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+        if self.directory is not None and self.directory.is_dir():
+            with self._disk_lock:
+                shutil.rmtree(self.directory, ignore_errors=True)
+                self._disk_ready = None
+                self._disk_version = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
+
+
+@lru_cache
+def get_cache() -> ResultCache:
+    settings = get_settings()
+    return ResultCache(
+        max_entries=settings.analytics_cache_max_entries,
+        max_bytes=settings.analytics_cache_max_bytes,
+        directory=settings.analytics_cache_dir,
+    )
+
+
+def _query(name: str, query: str, params: tuple = ()) -> List[dict]:
+    cache = get_cache()
+    key = (data_version(), name, params)
+
+    hit, rows = cache.get(key)
+    if hit:
+        return rows
+
+    rows = fetch_all(query, params or None)
+    cache.put(key, rows)
+    return rows
+
+
+# QUERIES
+def total_revenue() -> List[dict]:
+    return _query(
+        "total_revenue",
+        """
+        SELECT SUM(total_spent) AS total_revenue
+        FROM gold.agg_user_lifetime
+        """,
+    )
+
+
+def revenue_by_month(start: date, end: date) -> List[dict]:
+    """
+    Monthly revenue for dates in [start, end).
+    """
+    return _query(
+        "revenue_by_month",
+        """
+        SELECT
+            EXTRACT(YEAR FROM date_key)::int AS year,
+            EXTRACT(MONTH FROM date_key)::int AS month,
+            SUM(revenue) AS monthly_revenue
+        FROM gold.agg_daily_product_sales
+        WHERE date_key >= %s
+          AND date_key < %s
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+        """,
+        (start, end),
+    )
+
+
+def top_products(limit: int = 5) -> List[dict]:
+    return _query(
+        "top_products",
+        """
+        SELECT
+            p.title,
+            SUM(a.revenue) AS revenue
+        FROM gold.agg_daily_product_sales a
+        JOIN gold.dim_product p ON a.product_key = p.product_key
+        GROUP BY p.title
+        ORDER BY revenue DESC
+        LIMIT %s
+        """,
+        (limit,),
+    )
+
+
+def revenue_by_category() -> List[dict]:
+    return _query(
+        "revenue_by_category",
+        """
+        SELECT
+            p.category,
+            SUM(a.revenue) AS revenue
+        FROM gold.agg_daily_product_sales a
+        JOIN gold.dim_product p ON a.product_key = p.product_key
+        GROUP BY p.category
+        ORDER BY revenue DESC
+        """,
+    )
+
+
+def average_ticket_per_user() -> List[dict]:
+    return _query(
+        "average_ticket_per_user",
+        """
+        SELECT
+            u.username,
+            SUM(l.total_spent) AS total_spent,
+            SUM(l.purchases) AS number_of_purchases,
+            ROUND(SUM(l.total_spent) / SUM(l.purchases), 2) AS avg_ticket
+        FROM gold.agg_user_lifetime l
+        JOIN gold.dim_user u ON l.user_key = u.user_key
+        GROUP BY u.username
+        ORDER BY total_spent DESC
+        """,
+    )
+
+
+def daily_sales_trend(start: date, end: date) -> List[dict]:
+    """
+    Daily revenue for dates in [start, end).
+    """
+    return _query(
+        "daily_sales_trend",
+        """
+        SELECT
+            date_key,
+            SUM(revenue) AS daily_revenue
+        FROM gold.agg_daily_product_sales
+        WHERE date_key >= %s
+          AND date_key < %s
+        GROUP BY date_key
+        ORDER BY date_key
+        """,
+        (start, end),
+    )
@@ -1,29 +1,329 @@
-from typing import Any, List
+import codecs
+import json
+import random
+import re
+import time
+from functools import lru_cache
+from typing import Any, Iterable, Iterator, List
+
 import requests
-from requests import Response
-from requests.exceptions import RequestException
+from requests import Response, Session
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, RequestException, Timeout
 
+from etl import metrics
 from etl.config import get_settings
 
+# Transient HTTP statuses worth retrying
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_WHITESPACE = re.compile(r"\s*")
+_STRUCTURE = re.compile(r'["\[\]{}]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+_SCALAR_END = re.compile(r'[\s,\[\]{}"]')
+_decoder = json.JSONDecoder()
+
+
+def _build_session(pool_size: int) -> Session:
+    """
+    HTTP session with a keep-alive connection pool sized for concurrent use.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class _ElementScanner:
+    """
+    Finds where a JSON element ends without decoding it. The element may
+    arrive over several pieces of text; each call resumes with the
+    nesting depth and string state the previous one reached, so every
+    character is scanned once.
+    """
+
+    def __init__(self, first: str) -> None:
+        self.scalar = first not in '"[{'
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def end(self, text: str, scan: int) -> int | None:
+        """
+        End of the element in `text`, scanning from `scan`, or None if it
+        continues past `text`.
+        """
+        if self.escaped:
+            if scan >= len(text):
+                return None
+            scan += 1
+            self.escaped = False
+
+        if self.scalar:
+            # Numbers and literals end at the next delimiter
+            match = _SCALAR_END.search(text, scan)
+            return match.start() if match else None
+
+        while True:
+            if self.in_string:
+                match = _STRING_SPECIAL.search(text, scan)
+                if match is None:
+                    return None
+                if match.group() == "\\":
+                    # Skip the escaped character, possibly in the next piece
+                    if match.end() == len(text):
+                        self.escaped = True
+                        return None
+                    scan = match.end() + 1
+                    continue
+                self.in_string = False
+                scan = match.end()
+                if self.depth == 0:
+                    return scan
+                continue
+
+            match = _STRUCTURE.search(text, scan)
+            if match is None:
+                return None
+
+            scan = match.end()
+            char = match.group()
+
+            if char == '"':
+                self.in_string = True
+            elif char in "[{":
+                self.depth += 1
+            else:
+                self.depth -= 1
+                if self.depth == 0:
+                    return scan
+
+
+def _iter_json_array(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """
+    Incrementally decode a top-level JSON array from byte chunks.
+
+    Each element is yielded as soon as it has been fully received, so
+    neither the whole body nor the whole object graph is held in memory.
+    The pieces of an element are only joined and decoded once a scan has
+    found its end, which keeps large elements linear to decode.
+
+    Raises:
+        ValueError: If the body is not a JSON array, is malformed or
+            ends prematurely.
+    """
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    # Next expected token: "[", "first" element or "]", "value" after a
+    # comma, "next" comma or "]" after an element
+    expect = "["
+    element: _ElementScanner | None = None
+    pieces: List[str] = []  # received text of the current element
+
+    for chunk in chunks:
+        buffer = utf8.decode(chunk)
+        pos = 0
+
+        while True:
+            if element is None:
+                pos = _WHITESPACE.match(buffer, pos).end()
+                if pos >= len(buffer):
+                    break
+
+                char = buffer[pos]
+
+                if expect == "[":
+                    if char != "[":
+                        raise ValueError("Expected a JSON array response.")
+                    expect = "first"
+                    pos += 1
+                    continue
+
+                if char == "]" and expect != "value":
+                    return
+
+                if expect == "next":
+                    if char != ",":
+                        raise ValueError("Malformed JSON array response.")
+                    expect = "value"
+                    pos += 1
+                    continue
+
+                element = _ElementScanner(char)
+
+            end = element.end(buffer, pos)
+            if end is None:
+                # Element not fully received yet
+                pieces.append(buffer[pos:])
+                break
+
+            if pieces:
+                pieces.append(buffer[pos:end])
+                text = "".join(pieces)
+                start, stop = 0, len(text)
+                pieces = []
+            else:
+                text, start, stop = buffer, pos, end
+
+            try:
+                item, decoded_end = _decoder.raw_decode(text, start)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Malformed JSON array response: {e}") from e
+            if decoded_end != stop:
+                raise ValueError("Malformed JSON array response.")
+
+            yield item
+            pos = end
+            expect = "next"
+            element = None
+
+    raise ValueError("Truncated JSON array response.")
+
 
 class FakeStoreClient:
     """
     Simple client for FakeStore API.
+
+    Requests share one pooled keep-alive session and are retried with
+    exponential backoff and full jitter on timeouts, connection errors
+    and transient (429/5xx) responses.
+
+    Endpoints can be consumed as generators (iter_*), which parse the
+    response incrementally and optionally page through it with
+    limit/offset parameters (API_PAGE_SIZE).
     """
 
-    def __init__(self) -> None:
+    def __init__(self, session: Session | None = None) -> None:
         settings = get_settings()
         self.base_url = settings.api_base_url.rstrip("/")
         self.timeout = settings.api_timeout_seconds
+        self.max_retries = settings.api_max_retries
+        self.backoff_base = settings.api_backoff_base_seconds
+        self.backoff_max = settings.api_backoff_max_seconds
+        self.page_size = settings.api_page_size
+        self.chunk_bytes = settings.api_stream_chunk_bytes
+        self.session = session or _build_session(settings.api_max_concurrency)
+
+    def _backoff(self, attempt: int) -> None:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        time.sleep(random.uniform(0, delay))
+
+    def _request(
+        self,
+        url: str,
+        params: dict | None = None,
+        stream: bool = False,
+    ) -> Response:
+        """
+        Issue a GET request, retrying transient failures until the
+        response headers arrive.
+        """
+        for attempt in range(self.max_retries + 1):
+            retries_left = attempt < self.max_retries
+
+            try:
+                metrics.record(api_requests=1)
+                with metrics.timed("api_seconds"):
+                    response: Response = self.session.get(
+                        url, params=params, timeout=self.timeout, stream=stream
+                    )
+                if response.status_code in RETRY_STATUSES and retries_left:
+                    response.close()
+                    self._backoff(attempt)
+                    continue
+
+                response.raise_for_status()
+                return response
+            except (ConnectionError, Timeout) as e:
+                if not retries_left:
+                    raise RuntimeError(f"API request failed for {url}: {e}") from e
+                self._backoff(attempt)
+            except RequestException as e:
+                raise RuntimeError(f"API request failed for {url}: {e}") from e
 
     def _get(self, endpoint: str) -> Any:
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
-        try:
-            response: Response = requests.get(url, timeout=self.timeout)
-            response.raise_for_status()
-            return response.json()
-        except RequestException as e:
-            raise RuntimeError(f"API request failed for {url}: {e}") from e
+        with self._request(url) as response:
+            data = response.json()
+
+        metrics.record(
+            api_bytes=len(response.content),
+            rows_read=len(data) if isinstance(data, list) else 1,
+        )
+        return data
+
+    @staticmethod
+    def _metered(chunks: Iterator[bytes]) -> Iterator[bytes]:
+        """
+        Attribute streamed body reads (time and bytes) to the API.
+        """
+        while True:
+            with metrics.timed("api_seconds"):
+                chunk = next(chunks, None)
+            if chunk is None:
+                return
+            metrics.record(api_bytes=len(chunk))
+            yield chunk
+
+    def _iter_page(self, url: str, params: dict | None) -> Iterator[dict]:
+        with self._request(url, params=params, stream=True) as response:
+            received = 0
+            try:
+                for record in _iter_json_array(
+                    self._metered(response.iter_content(chunk_size=self.chunk_bytes))
+                ):
+                    received += 1
+                    yield record
+            except (RequestException, ValueError) as e:
+                raise RuntimeError(f"API stream failed for {url}: {e}") from e
+            finally:
+                metrics.record(rows_read=received)
+
+    def _iter(self, endpoint: str, limit: int | None = None) -> Iterator[dict]:
+        """
+        Yield endpoint records as they are received.
+
+        Without a page size the endpoint is read in one streamed request.
+        Otherwise pages of API_PAGE_SIZE records are requested with
+        limit/offset until a short page is returned.
+
+        Raises:
+            RuntimeError: If a page repeats the previous one, as sources
+                that ignore offset do.
+        """
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+
+        if not self.page_size:
+            params = {"limit": limit} if limit else None
+            yield from self._iter_page(url, params)
+            return
+
+        offset = 0
+        previous_first = None
+
+        while limit is None or offset < limit:
+            page_limit = self.page_size
+            if limit is not None:
+                page_limit = min(page_limit, limit - offset)
+
+            received = 0
+            for record in self._iter_page(
+                url, {"limit": page_limit, "offset": offset}
+            ):
+                if received == 0:
+                    if record == previous_first:
+                        raise RuntimeError(
+                            f"API pagination failed for {url}: the page at "
+                            f"offset {offset} repeats the previous one; the "
+                            "source ignores offset, unset API_PAGE_SIZE"
+                        )
+                    previous_first = record
+                received += 1
+                yield record
+
+            offset += received
+            if received < page_limit:
+                return
 
     # Endpoints
 
@@ -35,3 +335,20 @@ class FakeStoreClient:
 
     def get_carts(self) -> List[dict]:
         return self._get("carts")
+
+    def iter_products(self, limit: int | None = None) -> Iterator[dict]:
+        return self._iter("products", limit)
+
+    def iter_users(self, limit: int | None = None) -> Iterator[dict]:
+        return self._iter("users", limit)
+
+    def iter_carts(self, limit: int | None = None) -> Iterator[dict]:
+        return self._iter("carts", limit)
+
+
+@lru_cache
+def get_client() -> FakeStoreClient:
+    """
+    Process-wide client, so concurrent loaders share one keep-alive session.
+    """
+    return FakeStoreClient()
@@ -1,73 +1,135 @@
+import hashlib
 import json
-from typing import List, Dict
+import logging
+from typing import Dict, Iterable, Iterator
 
-from etl.api import FakeStoreClient
-from etl.db import execute_many
-from etl.config import get_settings
+from psycopg.types.json import Jsonb
+
+from etl import landing
+from etl.api import FakeStoreClient, get_client
+from etl.db import bulk_merge, chunked
+
+logger = logging.getLogger(__name__)
 
 # Internal helpers
 
+def _canonical_json(record: Dict) -> str:
+    """
+    Serialize a record with sorted keys and no insignificant whitespace,
+    so equal payloads always produce the same hash.
+    """
+    return json.dumps(
+        record,
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+
+
 def _prepare_raw_records(
-    records: List[Dict],
+    records: Iterable[Dict],
     id_field: str
-) -> List[tuple]:
+) -> Iterator[tuple]:
     """
     Convert API records into tuples for insertion.
 
+    Records are converted lazily, so a streamed API response is written
+    in batches while it is still being downloaded.
+
     Each tuple:
-        (natural_id, json_payload)
+        (natural_id, json_payload, payload_hash)
     """
-    prepared = []
     for record in records:
         natural_id = record[id_field]
-        payload = json.dumps(record, ensure_ascii=False)
-        prepared.append((natural_id, payload))
-
-    return prepared
+        payload = Jsonb(record)
+        payload_hash = hashlib.sha256(
+            _canonical_json(record).encode("utf-8")
+        ).hexdigest()
+        yield (natural_id, payload, payload_hash)
 
 
-def _insert_raw(table: str, id_column: str, data: List[tuple]) -> None:
+def _insert_raw(table: str, id_column: str, data: Iterable[tuple]) -> Dict[str, int]:
     """
     Insert raw data with upsert to avoid duplicates.
+
+    Existing rows are only rewritten (and ingested_at bumped) when the
+    payload hash changed. Rows are flushed in chunks of BATCH_SIZE.
+
+    Returns:
+        Counts of inserted, updated and unchanged records.
     """
     query = f"""
-        INSERT INTO raw.{table} ({id_column}, payload)
-        VALUES (%s, %s)
-        ON CONFLICT ({id_column})
-        DO UPDATE SET
-            payload = EXCLUDED.payload,
-            ingested_at = NOW();
+        WITH merged AS (
+            INSERT INTO raw.{table} ({id_column}, payload, payload_hash)
+            SELECT {id_column}, payload, payload_hash
+            FROM (
+                SELECT DISTINCT ON ({id_column}) *
+                FROM {{stage}}
+                ORDER BY {id_column}, _seq DESC
+            ) s
+            ON CONFLICT ({id_column})
+            DO UPDATE SET
+                payload = EXCLUDED.payload,
+                payload_hash = EXCLUDED.payload_hash,
+                ingested_at = NOW()
+            WHERE raw.{table}.payload_hash IS DISTINCT FROM EXCLUDED.payload_hash
+            RETURNING (xmax = 0) AS inserted
+        )
+        SELECT
+            (SELECT COUNT(DISTINCT {id_column}) FROM {{stage}}) AS staged,
+            COUNT(*) FILTER (WHERE inserted) AS inserted,
+            COUNT(*) FILTER (WHERE NOT inserted) AS updated
+        FROM merged;
     """
 
-    execute_many(query, data)
+    stage_columns = {
+        id_column: "INTEGER",
+        "payload": "JSONB",
+        "payload_hash": "TEXT",
+    }
 
-# Public functions
-def load_products_raw() -> int:
-    client = FakeStoreClient()
-    records = client.get_products()
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
 
-    prepared = _prepare_raw_records(records, "id")
-    _insert_raw("products", "product_id", prepared)
+    for batch in chunked(data):
+        result = bulk_merge(
+            stage_columns, batch, query, stage=f"_stage_raw_{table}"
+        )
+        if not result:
+            continue
 
+        row = result[0]
+        counts["inserted"] += row["inserted"]
+        counts["updated"] += row["updated"]
+        counts["unchanged"] += row["staged"] - row["inserted"] - row["updated"]
 
-    return len(prepared)
+    logger.info(
+        f"raw.{table} | inserted={counts['inserted']} "
+        f"updated={counts['updated']} unchanged={counts['unchanged']}"
+    )
 
+    return counts
 
-def load_users_raw() -> int:
-    client = FakeStoreClient()
-    records = client.get_users()
+# Public functions
+def load_products_raw(client: FakeStoreClient | None = None) -> Dict[str, int]:
+    client = client or get_client()
+    records = landing.tee("products", client.iter_products())
 
     prepared = _prepare_raw_records(records, "id")
-    _insert_raw("users", "user_id", prepared)
+    return _insert_raw("products", "product_id", prepared)
+
 
-    return len(prepared)
+def load_users_raw(client: FakeStoreClient | None = None) -> Dict[str, int]:
+    client = client or get_client()
+    records = landing.tee("users", client.iter_users())
+
+    prepared = _prepare_raw_records(records, "id")
+    return _insert_raw("users", "user_id", prepared)
 
 
-def load_carts_raw() -> int:
-    client = FakeStoreClient()
-    records = client.get_carts()
+def load_carts_raw(client: FakeStoreClient | None = None) -> Dict[str, int]:
+    client = client or get_client()
+    records = landing.tee("carts", client.iter_carts())
 
     prepared = _prepare_raw_records(records, "id")
-    _insert_raw("carts", "cart_id", prepared)
+    return _insert_raw("carts", "cart_id", prepared)
 
-    return len(prepared)
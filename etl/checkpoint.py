@@ -0,0 +1,269 @@
+"""
+Run-state store for resumable pipeline runs.
+
+A run is identified by a run id (the Prefect flow run id, or one given
+to the CLI). Each stage of the run records in pipeline.run_stages the
+input watermarks it started from, the resume position of its last
+committed batch and, once finished, its result. A retried or resumed
+run with the same id then skips finished stages and continues an
+unfinished one from its last committed batch, over the same inputs.
+
+Batch positions are written inside the transaction of the batch itself,
+so a batch and its checkpoint are committed together.
+
+Checkpoints are only kept while a run is active (begin_run) and
+RUN_CHECKPOINTS is enabled; otherwise stages run as before.
+"""
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Generator
+
+from etl.config import get_settings
+from etl.db import execute_query, fetch_all
+
+logger = logging.getLogger(__name__)
+
+_run_lock = threading.Lock()
+_run_id: str | None = None
+
+# Checkpoint of the stage running in this context
+_current: ContextVar["StageCheckpoint | None"] = ContextVar(
+    "current_checkpoint", default=None
+)
+
+
+# JSON with dates and datetimes preserved
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    raise TypeError(f"Cannot checkpoint {type(value).__name__}")
+
+
+def _decode(value: dict) -> Any:
+    if "__datetime__" in value:
+        return datetime.fromisoformat(value["__datetime__"])
+    if "__date__" in value:
+        return date.fromisoformat(value["__date__"])
+    return value
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, default=_encode)
+
+
+def _loads(value: Any) -> Any:
+    # JSONB columns arrive decoded; round-trip to restore tagged values
+    if value is None:
+        return None
+    return json.loads(json.dumps(value), object_hook=_decode)
+
+
+# RUNS
+def new_run_id() -> str:
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+
+
+def last_unfinished_run() -> str | None:
+    """
+    Id of the most recent run that did not succeed, if any.
+    """
+    rows = fetch_all(
+        """
+        SELECT run_id
+        FROM pipeline.runs
+        WHERE status <> 'succeeded'
+        ORDER BY started_at DESC
+        LIMIT 1
+        """
+    )
+    return rows[0]["run_id"] if rows else None
+
+
+def begin_run(run_id: str) -> bool:
+    """
+    Start a run, or resume it when the id is already known.
+
+    Returns:
+        True when an earlier attempt of the run exists.
+    """
+    global _run_id
+
+    if not get_settings().run_checkpoints:
+        return False
+
+    rows = fetch_all(
+        """
+        INSERT INTO pipeline.runs (run_id, load_mode, status)
+        VALUES (%s, %s, 'running')
+        ON CONFLICT (run_id)
+        DO UPDATE SET
+            status = 'running',
+            attempts = pipeline.runs.attempts + 1,
+            finished_at = NULL
+        RETURNING attempts
+        """,
+        (run_id, get_settings().load_mode),
+    )
+
+    with _run_lock:
+        _run_id = run_id
+
+    resumed = rows[0]["attempts"] > 1
+    if resumed:
+        logger.info(f"Resuming run {run_id} (attempt {rows[0]['attempts']})")
+
+    return resumed
+
+
+def end_run(succeeded: bool) -> None:
+    """
+    Record the outcome of the active run and deactivate checkpoints.
+    """
+    global _run_id
+
+    with _run_lock:
+        run_id, _run_id = _run_id, None
+
+    if run_id is None:
+        return
+
+    execute_query(
+        """
+        UPDATE pipeline.runs
+        SET status = %s,
+            finished_at = NOW()
+        WHERE run_id = %s
+        """,
+        ("succeeded" if succeeded else "failed", run_id),
+    )
+
+
+# STAGES
+class StageCheckpoint:
+    """
+    Checkpoint state of one stage of the active run.
+    """
+
+    def __init__(self, run_id: str, stage: str) -> None:
+        self.run_id = run_id
+        self.stage = stage
+
+        rows = fetch_all(
+            """
+            INSERT INTO pipeline.run_stages (run_id, stage, status)
+            VALUES (%s, %s, 'running')
+            ON CONFLICT (run_id, stage)
+            DO UPDATE SET updated_at = NOW()
+            RETURNING status, inputs, progress, batches, result
+            """,
+            (run_id, stage),
+        )
+        row = rows[0]
+
+        self.done = row["status"] == "done"
+        self.result = _loads(row["result"])
+        self.batches = row["batches"]
+        self.progress = _loads(row["progress"])
+        self._inputs = _loads(row["inputs"])
+
+    def inputs(self, compute: Callable[[], dict]) -> dict:
+        """
+        Input watermarks of the stage: computed and stored by the first
+        attempt, returned as stored by later ones.
+        """
+        if self._inputs is None:
+            self._inputs = compute()
+            execute_query(
+                """
+                UPDATE pipeline.run_stages
+                SET inputs = %s::jsonb,
+                    updated_at = NOW()
+                WHERE run_id = %s
+                  AND stage = %s
+                """,
+                (_dumps(self._inputs), self.run_id, self.stage),
+            )
+
+        return self._inputs
+
+    def commit_batch(self, progress: dict) -> None:
+        """
+        Record the resume position after a batch. Call it inside the
+        transaction() writing the batch.
+        """
+        execute_query(
+            """
+            UPDATE pipeline.run_stages
+            SET progress = %s::jsonb,
+                batches = batches + 1,
+                updated_at = NOW()
+            WHERE run_id = %s
+              AND stage = %s
+            """,
+            (_dumps(progress), self.run_id, self.stage),
+        )
+        self.progress = progress
+        self.batches += 1
+
+    def complete(self, result: Any) -> None:
+        execute_query(
+            """
+            UPDATE pipeline.run_stages
+            SET status = 'done',
+                result = %s::jsonb,
+                updated_at = NOW()
+            WHERE run_id = %s
+              AND stage = %s
+            """,
+            (_dumps(result), self.run_id, self.stage),
+        )
+        self.done = True
+        self.result = result
+
+
+@contextmanager
+def stage(label: str) -> Generator[StageCheckpoint | None, None, None]:
+    """
+    Checkpoint of a stage of the active run, made current for the block.
+
+    Yields None when no run is active.
+    """
+    with _run_lock:
+        run_id = _run_id
+
+    if run_id is None:
+        yield None
+        return
+
+    with attach(run_id, label) as checkpoint:
+        yield checkpoint
+
+
+@contextmanager
+def attach(run_id: str, label: str) -> Generator[StageCheckpoint, None, None]:
+    """
+    Checkpoint of a stage of the given run, made current for the block.
+
+    For work of a stage done outside the process running the run, such
+    as silver shard workers, which checkpoint under labels of their own.
+    """
+    checkpoint = StageCheckpoint(run_id, label)
+    token = _current.set(checkpoint)
+
+    try:
+        yield checkpoint
+    finally:
+        _current.reset(token)
+
+
+def current() -> StageCheckpoint | None:
+    """
+    Checkpoint of the stage running in this context, if any.
+    """
+    return _current.get()
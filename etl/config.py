@@ -26,15 +26,51 @@ class Settings(BaseSettings):
     dw_name: str = Field(..., alias="DW_NAME")
     dw_user: str = Field(..., alias="DW_USER")
     dw_password: str = Field(..., alias="DW_PASSWORD")
+    dw_pool_min_size: int = Field(1, alias="DW_POOL_MIN_SIZE")
+    dw_pool_max_size: int = Field(8, alias="DW_POOL_MAX_SIZE")
+    dw_pool_timeout_seconds: float = Field(30, alias="DW_POOL_TIMEOUT_SECONDS")
+    dw_prepare_threshold: int | None = Field(5, alias="DW_PREPARE_THRESHOLD")
 
     # API
     api_base_url: str = Field(..., alias="FAKESTORE_API_BASE_URL")
     api_timeout_seconds: int = Field(30, alias="API_TIMEOUT_SECONDS")
+    api_max_concurrency: int = Field(3, alias="API_MAX_CONCURRENCY")
+    api_max_retries: int = Field(3, alias="API_MAX_RETRIES")
+    api_backoff_base_seconds: float = Field(0.5, alias="API_BACKOFF_BASE_SECONDS")
+    api_backoff_max_seconds: float = Field(10, alias="API_BACKOFF_MAX_SECONDS")
+    api_page_size: int | None = Field(None, alias="API_PAGE_SIZE")
+    api_stream_chunk_bytes: int = Field(65536, alias="API_STREAM_CHUNK_BYTES")
 
     # Pipeline
     load_mode: Literal["full", "incremental"] = Field("full", alias="LOAD_MODE")
     batch_size: int = Field(500, alias="BATCH_SIZE")
+    flow_max_concurrency: int = Field(3, alias="FLOW_MAX_CONCURRENCY")
+    silver_engine_products: Literal["python", "sql", "columnar", "typed"] = Field(
+        "python", alias="SILVER_ENGINE_PRODUCTS"
+    )
+    silver_engine_users: Literal["python", "sql", "typed"] = Field(
+        "python", alias="SILVER_ENGINE_USERS"
+    )
+    silver_engine_carts: Literal["python", "sql", "typed"] = Field(
+        "python", alias="SILVER_ENGINE_CARTS"
+    )
+    silver_workers: int = Field(1, alias="SILVER_WORKERS")
+    dimension_scd: Literal["type1", "type2"] = Field("type1", alias="DIMENSION_SCD")
+    run_checkpoints: bool = Field(True, alias="RUN_CHECKPOINTS")
+    quality_mode: Literal["table", "batch"] = Field("table", alias="QUALITY_MODE")
     log_level: str = Field("INFO", alias="LOG_LEVEL")
+    metrics_dir: str | None = Field(None, alias="METRICS_DIR")
+    landing_dir: str | None = Field(None, alias="LANDING_DIR")
+
+    # Analytics (read side)
+    analytics_cache_max_entries: int = Field(256, alias="ANALYTICS_CACHE_MAX_ENTRIES")
+    analytics_cache_max_bytes: int = Field(
+        64 * 1024 * 1024, alias="ANALYTICS_CACHE_MAX_BYTES"
+    )
+    analytics_cache_dir: str | None = Field(None, alias="ANALYTICS_CACHE_DIR")
+    analytics_version_ttl_seconds: float = Field(
+        30, alias="ANALYTICS_VERSION_TTL_SECONDS"
+    )
 
     class Config:
         env_file = BASE_DIR / ".env"
@@ -1,11 +1,83 @@
+import atexit
+import itertools
+import threading
+import time
+import zlib
 from contextlib import contextmanager
-from typing import Generator, Iterable, Any
+from contextvars import ContextVar
+from typing import Generator, Iterable, Iterator, Any, Sequence
 
 import psycopg
-from psycopg.rows import dict_row
+from psycopg.rows import RowFactory, dict_row
+from psycopg_pool import ConnectionPool
 
+from etl import metrics
 from etl.config import get_settings
 
+_pool: ConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+# Connection bound to the transaction() block running in this context
+_current_connection: ContextVar[psycopg.Connection | None] = ContextVar(
+    "current_connection", default=None
+)
+
+_stats_lock = threading.Lock()
+_stats = {"acquisitions": 0, "wait_seconds": 0.0, "round_trips": 0}
+
+_cursor_ids = itertools.count(1)
+
+
+def _count_round_trip() -> None:
+    with _stats_lock:
+        _stats["round_trips"] += 1
+    metrics.record(sql_statements=1)
+
+
+class _CountingCursor(psycopg.Cursor):
+    """
+    Client-side cursor that counts statements sent to the server and
+    times them against the running metrics stage.
+    """
+
+    def execute(self, *args, **kwargs):
+        _count_round_trip()
+        with metrics.timed("db_seconds"):
+            return super().execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        _count_round_trip()
+        with metrics.timed("db_seconds"):
+            return super().executemany(*args, **kwargs)
+
+    @contextmanager
+    def copy(self, *args, **kwargs):
+        _count_round_trip()
+        with metrics.timed("db_seconds"):
+            with super().copy(*args, **kwargs) as copy:
+                yield copy
+
+
+class _CountingServerCursor(psycopg.ServerCursor):
+    """
+    Named cursor that counts DECLARE and each FETCH sent to the server.
+    """
+
+    def execute(self, *args, **kwargs):
+        _count_round_trip()
+        with metrics.timed("db_seconds"):
+            return super().execute(*args, **kwargs)
+
+    def fetchmany(self, *args, **kwargs):
+        _count_round_trip()
+        with metrics.timed("db_seconds"):
+            return super().fetchmany(*args, **kwargs)
+
+
+def _configure_connection(conn: psycopg.Connection) -> None:
+    conn.cursor_factory = _CountingCursor
+    conn.server_cursor_factory = _CountingServerCursor
+
 
 def _build_dsn() -> str:
     settings = get_settings()
@@ -18,23 +90,126 @@ def _build_dsn() -> str:
     )
 
 
+def get_pool() -> ConnectionPool:
+    """
+    Return the process-wide connection pool, opening it on first use.
+
+    Connections are health-checked before being handed out and use
+    server-side prepared statements for queries executed repeatedly.
+    """
+    global _pool
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                settings = get_settings()
+                _pool = ConnectionPool(
+                    _build_dsn(),
+                    min_size=settings.dw_pool_min_size,
+                    max_size=settings.dw_pool_max_size,
+                    timeout=settings.dw_pool_timeout_seconds,
+                    kwargs={
+                        "row_factory": dict_row,
+                        "prepare_threshold": settings.dw_prepare_threshold,
+                    },
+                    configure=_configure_connection,
+                    check=ConnectionPool.check_connection,
+                    name="etl-dw",
+                    open=True,
+                )
+
+    return _pool
+
+
+def close_pool() -> None:
+    """
+    Close the process-wide connection pool, if open.
+    """
+    global _pool
+
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+# Once per process: the pool may be closed and reopened several times
+atexit.register(close_pool)
+
+
+def db_stats() -> dict:
+    """
+    Warehouse access statistics for this process: statements sent to
+    the server (round trips), connection acquisitions, the total time
+    callers spent waiting for a connection, and pool statistics.
+    """
+    with _stats_lock:
+        stats = {
+            "round_trips": _stats["round_trips"],
+            "connections_acquired": _stats["acquisitions"],
+            "connection_wait_seconds": round(_stats["wait_seconds"], 4),
+        }
+
+    if _pool is not None:
+        stats.update(_pool.get_stats())
+
+    return stats
+
+
+def _record_wait(seconds: float) -> None:
+    with _stats_lock:
+        _stats["acquisitions"] += 1
+        _stats["wait_seconds"] += seconds
+    metrics.record(connection_wait_seconds=seconds)
+
+
+@contextmanager
+def _pooled_connection() -> Generator[psycopg.Connection, None, None]:
+    start = time.perf_counter()
+    with get_pool().connection() as conn:
+        _record_wait(time.perf_counter() - start)
+        yield conn
+
+
+@contextmanager
+def transaction() -> Generator[psycopg.Connection, None, None]:
+    """
+    Group several operations into one transaction on one pooled connection.
+
+    Every etl.db call made inside the block reuses the same connection.
+    Commits if no exception occurs, otherwise rolls back. Nested blocks
+    run inside a savepoint.
+    """
+    conn = _current_connection.get()
+    if conn is not None:
+        with conn.transaction():
+            yield conn
+        return
+
+    with _pooled_connection() as conn:
+        token = _current_connection.set(conn)
+        try:
+            yield conn
+        finally:
+            _current_connection.reset(token)
+
+
 @contextmanager
 def get_connection() -> Generator[psycopg.Connection, None, None]:
     """
-    Context manager for PostgreSQL connection.
+    Context manager for a pooled PostgreSQL connection.
 
-    Automatically commits if no exception occurs,
-    otherwise rolls back.
+    Reuses the connection of an enclosing transaction() block; otherwise
+    borrows one from the pool, commits if no exception occurs and rolls
+    back otherwise.
     """
-    conn = psycopg.connect(_build_dsn(), row_factory=dict_row)
-    try:
+    conn = _current_connection.get()
+    if conn is not None:
+        yield conn
+        return
+
+    with transaction() as conn:
         yield conn
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
 
 
 def execute_query(query: str, params: tuple | None = None) -> None:
@@ -53,13 +228,276 @@ def fetch_all(query: str, params: tuple | None = None) -> list[dict]:
     with get_connection() as conn:
         with conn.cursor() as cur:
             cur.execute(query, params)
-            return cur.fetchall()
+            rows = cur.fetchall()
+
+    metrics.record(rows_read=len(rows))
+    return rows
+
+
+def fetch_iter(
+    query: str,
+    params: tuple | None = None,
+    batch_size: int | None = None,
+    row_factory: RowFactory | None = None,
+) -> Iterator[list]:
+    """
+    Stream query results in chunks of at most batch_size rows.
+
+    Rows are read through a named server-side cursor, so only one chunk
+    is held in memory at a time. Defaults to Settings.batch_size. Rows
+    are dicts unless another row_factory (e.g. tuple_row) is given.
+
+    The cursor keeps its own pooled connection (or the enclosing
+    transaction() connection) open while the caller iterates, so writes
+    issued between chunks are committed independently.
+    """
+    size = batch_size or get_settings().batch_size
+
+    def _stream(conn: psycopg.Connection) -> Iterator[list]:
+        with conn.cursor(
+            name=f"etl_fetch_{next(_cursor_ids)}",
+            row_factory=row_factory or conn.row_factory,
+        ) as cur:
+            cur.itersize = size
+            cur.execute(query, params)
+            while rows := cur.fetchmany(size):
+                metrics.record(rows_read=len(rows))
+                yield rows
+
+    conn = _current_connection.get()
+    if conn is not None:
+        yield from _stream(conn)
+        return
+
+    with _pooled_connection() as conn:
+        yield from _stream(conn)
+
+
+def chunked(
+    rows: Iterable[tuple[Any, ...]],
+    batch_size: int | None = None,
+) -> Iterator[list[tuple[Any, ...]]]:
+    """
+    Split an iterable of rows into lists of at most batch_size rows.
+
+    Used to flush writes in bounded chunks. Defaults to Settings.batch_size.
+    """
+    size = batch_size or get_settings().batch_size
+    iterator = iter(rows)
+
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
 
 
 def execute_many(query: str, data: Iterable[tuple[Any, ...]]) -> None:
     """
     Execute batch insert/update operations.
     """
+    data = list(data)
+
     with get_connection() as conn:
         with conn.cursor() as cur:
             cur.executemany(query, data)
+
+    metrics.record(rows_written=len(data))
+
+
+def _stage_name(table: str, columns: Sequence[str]) -> str:
+    # One staging table per target and column set, kept for the session
+    digest = zlib.crc32(",".join(columns).encode())
+    return f"_stage_{table.replace('.', '_')}_{digest:08x}"
+
+
+def _copy_into_stage(
+    cur: psycopg.Cursor,
+    stage: str,
+    columns: Sequence[str],
+    rows: Iterable[tuple[Any, ...]],
+) -> int:
+    """
+    Stream rows into a staging table using binary COPY.
+
+    Column types are read from the staging table itself, so values are
+    dumped with the binary format of the target column type.
+    """
+    cur.execute(
+        """
+        SELECT attname, atttypid::int AS type_oid
+        FROM pg_attribute
+        WHERE attrelid = %s::regclass
+          AND attnum > 0
+          AND NOT attisdropped
+        """,
+        (stage,),
+        prepare=True,
+    )
+    type_oids = {row["attname"]: row["type_oid"] for row in cur.fetchall()}
+
+    column_list = ", ".join(columns)
+    staged = 0
+
+    with cur.copy(
+        f"COPY {stage} ({column_list}) FROM STDIN (FORMAT BINARY)"
+    ) as copy:
+        copy.set_types([type_oids[column] for column in columns])
+        for row in rows:
+            copy.write_row(row)
+            staged += 1
+
+    metrics.record(rows_written=staged)
+    return staged
+
+
+def bulk_copy(
+    table: str,
+    columns: Sequence[str],
+    rows: Iterable[tuple[Any, ...]],
+) -> int:
+    """
+    Append rows to an existing table with binary COPY.
+
+    Meant for tables being built from scratch (no conflict handling).
+
+    Returns:
+        Number of rows copied.
+    """
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            return _copy_into_stage(cur, table, columns, rows)
+
+
+def _staged_merge(
+    stage: str,
+    create_stage: str,
+    columns: Sequence[str],
+    rows: Iterable[tuple[Any, ...]],
+    merge_query: str,
+) -> tuple[int, list[dict]]:
+    """
+    COPY rows into a temporary staging table and run the merge query in
+    the same transaction.
+
+    The staging table is created once per session (ON COMMIT DELETE
+    ROWS) and truncated before each use, so no ALTER or DROP is issued:
+    psycopg discards its prepared statements on those, and the catalog
+    lookup and merge query are prepared server-side. Staged rows carry
+    an increasing _seq column reflecting input order.
+    """
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(create_stage)
+            cur.execute(f"TRUNCATE {stage}")
+
+            staged = _copy_into_stage(
+                cur,
+                stage,
+                (*columns, "_seq"),
+                ((*row, seq) for seq, row in enumerate(rows)),
+            )
+
+            result: list[dict] = []
+            if staged:
+                cur.execute(merge_query.replace("{stage}", stage), prepare=True)
+                if cur.description:
+                    result = cur.fetchall()
+
+    return staged, result
+
+
+def bulk_merge(
+    stage_columns: dict[str, str],
+    rows: Iterable[tuple[Any, ...]],
+    merge_query: str,
+    stage: str = "_stage_merge",
+) -> list[dict]:
+    """
+    Bulk load rows into a temporary staging table and merge them into
+    the target with one set-based statement.
+
+    Args:
+        stage_columns: Ordered mapping of staging column name -> SQL type.
+        rows: Tuples matching the order of stage_columns.
+        merge_query: Statement reading from the staging table, referenced
+            as {stage}. Staged rows also expose a _seq column with the
+            input order.
+        stage: Name of the temporary staging table.
+
+    Returns:
+        Rows returned by the merge query (empty if it returns nothing).
+    """
+    column_defs = ", ".join(
+        f"{name} {sql_type}" for name, sql_type in stage_columns.items()
+    )
+    create_stage = (
+        f"CREATE TEMP TABLE IF NOT EXISTS {stage} "
+        f"({column_defs}, _seq BIGINT NOT NULL) ON COMMIT DELETE ROWS"
+    )
+
+    _, result = _staged_merge(
+        stage, create_stage, list(stage_columns), rows, merge_query
+    )
+    return result
+
+
+def bulk_upsert(
+    table: str,
+    columns: Sequence[str],
+    rows: Iterable[tuple[Any, ...]],
+    conflict_columns: Sequence[str],
+    update_columns: Sequence[str] = (),
+    extra_updates: str = "",
+) -> int:
+    """
+    Idempotent bulk upsert through a binary COPY staging table.
+
+    Rows are streamed into a temporary table shaped like the target and
+    merged with a single INSERT ... SELECT ... ON CONFLICT. When the same
+    conflict key appears more than once, the last row wins, matching the
+    row-by-row semantics of execute_many.
+
+    Args:
+        table: Fully qualified target table (e.g. "silver.products").
+        columns: Target columns, in the order of each row tuple.
+        rows: Iterable of row tuples.
+        conflict_columns: Columns of the unique constraint to upsert on.
+        update_columns: Columns overwritten on conflict. When empty the
+            statement uses DO NOTHING.
+        extra_updates: Additional SET assignments (e.g. "updated_at = NOW()").
+
+    Returns:
+        Number of rows staged.
+    """
+    stage = _stage_name(table, columns)
+    column_list = ", ".join(columns)
+    conflict_list = ", ".join(conflict_columns)
+
+    assignments = [f"{column} = EXCLUDED.{column}" for column in update_columns]
+    if extra_updates:
+        assignments.append(extra_updates)
+
+    if assignments:
+        conflict_action = "DO UPDATE SET " + ", ".join(assignments)
+    else:
+        conflict_action = "DO NOTHING"
+
+    create_stage = f"""
+        CREATE TEMP TABLE IF NOT EXISTS {stage} ON COMMIT DELETE ROWS AS
+        SELECT {column_list}, 0::bigint AS _seq
+        FROM {table}
+        WITH NO DATA
+    """
+
+    merge_query = f"""
+        INSERT INTO {table} ({column_list})
+        SELECT {column_list}
+        FROM (
+            SELECT DISTINCT ON ({conflict_list}) *
+            FROM {{stage}}
+            ORDER BY {conflict_list}, _seq DESC
+        ) s
+        ON CONFLICT ({conflict_list})
+        {conflict_action};
+    """
+
+    staged, _ = _staged_merge(stage, create_stage, columns, rows, merge_query)
+    return staged
@@ -1,23 +1,22 @@
 import time
 import logging
+import threading
+from contextlib import contextmanager
 
 from prefect import flow, task, get_run_logger
+from prefect.artifacts import create_table_artifact
+from prefect.runtime import flow_run
+from prefect.task_runners import ThreadPoolTaskRunner
 
+from etl.checkpoint import begin_run, end_run, new_run_id
 from etl.config import get_settings
-from etl.bronze import load_products_raw, load_users_raw, load_carts_raw
-from etl.silver import transform_products, transform_users, transform_carts
-from etl.gold import (
-    load_dim_user,
-    load_dim_product,
-    load_dim_date,
-    load_fact_sales,
-)
-
-from etl.quality import (
-    validate_silver_products,
-    validate_silver_users,
-    validate_silver_cart_items,
-)
+from etl.db import db_stats
+from etl.metrics import run_metrics, reset_run_metrics, export_run_metrics
+from etl.keys import reset_key_caches
+from etl.stages import describe, run_stage
+
+_slots: threading.BoundedSemaphore | None = None
+_slots_lock = threading.Lock()
 
 
 def _configure_logging():
@@ -28,85 +27,207 @@ def _configure_logging():
     )
 
 
-# Bronze
-@task
-def bronze_layer():
-    logger = get_run_logger()
-    start = time.perf_counter()
+@contextmanager
+def _warehouse_slot():
+    """
+    Limit how many tasks hit the warehouse at once (FLOW_MAX_CONCURRENCY).
+    """
+    global _slots
+
+    with _slots_lock:
+        if _slots is None:
+            _slots = threading.BoundedSemaphore(get_settings().flow_max_concurrency)
+
+    with _slots:
+        yield
+
 
-    logger.info("Starting Bronze layer ingestion...")
+def _run_step(label: str):
+    """
+    Run a stage of etl.stages, holding a warehouse slot.
+    """
+    with _warehouse_slot():
+        result, summary = run_stage(label)
 
-    p = load_products_raw()
-    u = load_users_raw()
-    c = load_carts_raw()
+    get_run_logger().info(describe(label, result, summary))
 
-    elapsed = round(time.perf_counter() - start, 2)
+    return result
 
-    logger.info(
-        f"Bronze completed | products={p} users={u} carts={c} | duration={elapsed}s"
+
+def _publish_metrics(logger, run_id: str) -> None:
+    """
+    Publish per-stage metrics as a Prefect artifact and, when METRICS_DIR
+    is set, as JSON and Prometheus textfile exports.
+    """
+    stages = run_metrics()
+
+    create_table_artifact(
+        key="etl-stage-metrics",
+        table=stages,
+        description="Per-stage wall time, rows, bytes, SQL statements and connection wait.",
     )
 
-    return {"products": p, "users": u, "carts": c}
+    for path in export_run_metrics(run_id, stages):
+        logger.info(f"Metrics written to {path}")
+
+
+# Bronze
+@task(name="bronze-products")
+def bronze_products():
+    return _run_step("bronze.products")
+
+
+@task(name="bronze-users")
+def bronze_users():
+    return _run_step("bronze.users")
+
+
+@task(name="bronze-carts")
+def bronze_carts():
+    return _run_step("bronze.carts")
+
+
+def bronze_layer():
+    """
+    Submit the three bronze ingestions; they run concurrently.
+    """
+    get_run_logger().info("Starting Bronze layer ingestion...")
+
+    return {
+        "products": bronze_products.submit(),
+        "users": bronze_users.submit(),
+        "carts": bronze_carts.submit(),
+    }
 
 
 # Silver
-@task
-def silver_layer():
-    logger = get_run_logger()
-    start = time.perf_counter()
+@task(name="silver-products")
+def silver_products():
+    return _run_step("silver.products")
 
-    logger.info("Starting Silver transformations...")
 
-    p = transform_products()
-    u = transform_users()
-    c = transform_carts()
+@task(name="silver-users")
+def silver_users():
+    return _run_step("silver.users")
 
-    logger.info("Running data quality checks (Silver layer)...")
 
-    validate_silver_products()
-    validate_silver_users()
-    validate_silver_cart_items()
+@task(name="silver-carts")
+def silver_carts():
+    return _run_step("silver.carts")
 
-    logger.info("Data quality checks passed.")
 
-    elapsed = round(time.perf_counter() - start, 2)
+@task(name="quality-silver-products")
+def quality_silver_products():
+    return _run_step("quality.silver.products")
+
+
+@task(name="quality-silver-users")
+def quality_silver_users():
+    return _run_step("quality.silver.users")
+
+
+@task(name="quality-silver-cart-items")
+def quality_silver_cart_items():
+    return _run_step("quality.silver.cart_items")
 
-    logger.info(
-        f"Silver completed | products={p} users={u} carts={c} | duration={elapsed}s"
-    )
 
-    return {"products": p, "users": u, "carts": c}
+def silver_layer(bronze: dict):
+    """
+    Submit silver transforms and their quality checks.
+
+    Products and users run in parallel; carts waits on both because of
+    the silver foreign keys.
+    """
+    get_run_logger().info("Starting Silver transformations...")
+
+    products = silver_products.submit(wait_for=[bronze["products"]])
+    users = silver_users.submit(wait_for=[bronze["users"]])
+    carts = silver_carts.submit(wait_for=[bronze["carts"], products, users])
+
+    return {
+        "products": products,
+        "users": users,
+        "carts": carts,
+        "checks": {
+            "products": quality_silver_products.submit(wait_for=[products]),
+            "users": quality_silver_users.submit(wait_for=[users]),
+            "cart_items": quality_silver_cart_items.submit(wait_for=[carts]),
+        },
+    }
 
 
 # Gold
-@task
-def gold_layer():
-    logger = get_run_logger()
-    start = time.perf_counter()
+@task(name="gold-dim-user")
+def gold_dim_user():
+    return _run_step("gold.dim_user")
+
+
+@task(name="gold-dim-product")
+def gold_dim_product():
+    return _run_step("gold.dim_product")
+
+
+@task(name="gold-dim-date")
+def gold_dim_date():
+    return _run_step("gold.dim_date")
+
+
+@task(name="gold-fact-sales")
+def gold_fact_sales():
+    return _run_step("gold.fact_sales")
+
+
+@task(name="gold-publish")
+def gold_publish():
+    return _run_step("gold.publish")
 
-    logger.info("Starting Gold dimensional load...")
 
-    du = load_dim_user()
-    dp = load_dim_product()
-    dd = load_dim_date()
-    fs = load_fact_sales()
+def gold_layer(silver: dict):
+    """
+    Submit gold loads: the three dimensions in parallel, facts last.
 
-    elapsed = round(time.perf_counter() - start, 2)
+    Each dimension waits on its silver source and that source's quality
+    check. Once everything has committed, the gold data version is
+    bumped so analytics caches pick up the new data.
+    """
+    get_run_logger().info("Starting Gold dimensional load...")
 
-    logger.info(
-        f"Gold completed | dim_user={du} dim_product={dp} dim_date={dd} fact_sales={fs} | duration={elapsed}s"
+    checks = silver["checks"]
+
+    dim_user = gold_dim_user.submit(
+        wait_for=[silver["users"], checks["users"]]
+    )
+    dim_product = gold_dim_product.submit(
+        wait_for=[silver["products"], checks["products"]]
+    )
+    dim_date = gold_dim_date.submit(
+        wait_for=[silver["carts"], checks["cart_items"]]
+    )
+    fact_sales = gold_fact_sales.submit(
+        wait_for=[dim_user, dim_product, dim_date]
+    )
+    version = gold_publish.submit(
+        wait_for=[dim_user, dim_product, dim_date, fact_sales]
     )
 
     return {
-        "dim_user": du,
-        "dim_product": dp,
-        "dim_date": dd,
-        "fact_sales": fs,
+        "dim_user": dim_user,
+        "dim_product": dim_product,
+        "dim_date": dim_date,
+        "fact_sales": fact_sales,
+        "version": version,
+    }
+
+
+def _results(futures: dict) -> dict:
+    return {
+        name: _results(future) if isinstance(future, dict) else future.result()
+        for name, future in futures.items()
     }
 
 
 # Main Flow
-@flow(name="medallion-etl")
+@flow(name="medallion-etl", task_runner=ThreadPoolTaskRunner())
 def etl_flow():
     _configure_logging()
     logger = get_run_logger()
@@ -116,21 +237,40 @@ def etl_flow():
     logger.info("Starting Medallion ETL Pipeline")
     logger.info(f"Environment: {settings.environment}")
     logger.info(f"Load mode: {settings.load_mode}")
+    logger.info(f"Max concurrent stages: {settings.flow_max_concurrency}")
     logger.info("<-------------------------------------->")
 
     total_start = time.perf_counter()
+    reset_key_caches()
+    reset_run_metrics()
+
+    # A retried flow run keeps its id and resumes from its checkpoints
+    run_id = str(flow_run.id or new_run_id())
+    begin_run(run_id)
 
-    bronze = bronze_layer()
-    silver = silver_layer(wait_for=[bronze])
-    gold = gold_layer(wait_for=[silver])
+    try:
+        bronze = bronze_layer()
+        silver = silver_layer(bronze)
+        gold = gold_layer(silver)
+
+        bronze, silver, gold = _results(bronze), _results(silver), _results(gold)
+    except BaseException:
+        end_run(succeeded=False)
+        raise
+
+    end_run(succeeded=True)
+    silver.pop("checks")
 
     total_elapsed = round(time.perf_counter() - total_start, 2)
 
     logger.info("<-------------------------------------->")
     logger.info("Pipeline completed successfully")
     logger.info(f"Total execution time: {total_elapsed}s")
+    logger.info(f"Warehouse access: {db_stats()}")
     logger.info("<-------------------------------------->")
 
+    _publish_metrics(logger, run_id)
+
     return {
         "bronze": bronze,
         "silver": silver,
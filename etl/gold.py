@@ -1,76 +1,68 @@
-from datetime import datetime
-from typing import List, Tuple
+import logging
+from datetime import date, datetime, timedelta
+from typing import Callable, Iterable, List, Set, Tuple
 
-from etl.db import fetch_all, execute_many
+from psycopg.rows import tuple_row
 
-# DIM USER
-def load_dim_user() -> int:
-    rows = fetch_all("""
-        SELECT user_id, email, username, first_name, last_name, city
-        FROM silver.users
-    """)
-
-    prepared = [
-        (
-            row["user_id"],
-            row["email"],
-            row["username"],
-            row["first_name"],
-            row["last_name"],
-            row["city"],
-        )
-        for row in rows
-    ]
+from etl import checkpoint, gold_full, scd
+from etl.analytics import bump_data_version
+from etl.config import get_settings
+from etl.db import (
+    bulk_copy,
+    bulk_upsert,
+    execute_query,
+    fetch_all,
+    fetch_iter,
+    transaction,
+)
+from etl.keys import user_keys, product_keys
+from etl.quality import validate_gold_aggregates
+from etl.watermark import get_watermark, set_watermark, since, advance
 
-    query = """
-        INSERT INTO gold.dim_user (
-            user_id, email, username, first_name, last_name, city
-        )
-        VALUES (%s, %s, %s, %s, %s, %s)
-        ON CONFLICT (user_id)
-        DO UPDATE SET
-            email = EXCLUDED.email,
-            username = EXCLUDED.username,
-            first_name = EXCLUDED.first_name,
-            last_name = EXCLUDED.last_name,
-            city = EXCLUDED.city;
-    """
+logger = logging.getLogger(__name__)
 
-    execute_many(query, prepared)
-    return len(prepared)
 
+def _full_refresh() -> bool:
+    # LOAD_MODE=full rebuilds gold into shadow tables (see etl.gold_full)
+    return get_settings().load_mode == "full"
 
-# DIM PRODUCT
-def load_dim_product() -> int:
-    rows = fetch_all("""
-        SELECT product_id, title, category, price
-        FROM silver.products
-    """)
-
-    prepared = [
-        (
-            row["product_id"],
-            row["title"],
-            row["category"],
-            row["price"],
-        )
-        for row in rows
-    ]
 
-    query = """
-        INSERT INTO gold.dim_product (
-            product_id, title, category, price
-        )
-        VALUES (%s, %s, %s, %s)
-        ON CONFLICT (product_id)
-        DO UPDATE SET
-            title = EXCLUDED.title,
-            category = EXCLUDED.category,
-            price = EXCLUDED.price;
+# DIM USER / DIM PRODUCT
+def _load_dimension(dimension: scd.Dimension) -> int:
     """
+    Apply the silver changes since the last run to a dimension (see
+    etl.scd).
+    """
+    name = dimension.table.split(".")[1]
+    last_run = get_watermark(dimension.table, dimension.source)
+
+    with transaction():
+        result = scd.merge(dimension, last_run)
+        set_watermark(
+            dimension.table,
+            dimension.source,
+            advance(last_run, (result.watermark,)),
+        )
+
+    logger.info(
+        f"{name}: {result.changed} changed in silver, "
+        f"{len(result.written)} written, {result.closed} version(s) closed"
+    )
+    return len(result.written)
+
+
+def load_dim_user() -> int:
+    if _full_refresh():
+        return gold_full.load_dim_user()
+
+    return _load_dimension(scd.USER)
+
+
+def load_dim_product() -> int:
+    if _full_refresh():
+        return gold_full.load_dim_product()
 
-    execute_many(query, prepared)
-    return len(prepared)
+    return _load_dimension(scd.PRODUCT)
 
 
 # DIM DATE
@@ -85,53 +77,392 @@ def load_dim_date() -> int:
     - month_name
     - quarter
 
+    In incremental mode only dates of carts changed since the last
+    successful run are read. The monthly gold.fact_sales partition of
+    every loaded date is created if missing.
+
     Idempotent load (ON CONFLICT DO NOTHING).
     """
+    if _full_refresh():
+        return gold_full.load_dim_date()
+
+    last_run = get_watermark("gold.dim_date", "silver.carts")
+    watermark = last_run
+    loaded = 0
 
-    rows = fetch_all("""
-        SELECT DISTINCT cart_date
+    for rows in fetch_iter(
+        """
+        SELECT cart_date, MAX(updated_at) AS updated_at
         FROM silver.carts
         WHERE cart_date IS NOT NULL
-    """)
-
-    prepared: List[Tuple] = []
-
-    for row in rows:
-        date_value = row["cart_date"]
-        dt = datetime.strptime(str(date_value), "%Y-%m-%d")
-
-        prepared.append(
-            (
-                date_value,
-                dt.year,
-                dt.month,
-                dt.day,
-                dt.strftime("%B"),                 # month_name
-                (dt.month - 1) // 3 + 1,           # quarter
+          AND updated_at > %s::timestamptz
+        GROUP BY cart_date
+        """,
+        (since(last_run),),
+    ):
+        prepared: List[Tuple] = []
+
+        for row in rows:
+            date_value = row["cart_date"]
+            dt = datetime.strptime(str(date_value), "%Y-%m-%d")
+
+            prepared.append(
+                (
+                    date_value,
+                    dt.year,
+                    dt.month,
+                    dt.day,
+                    dt.strftime("%B"),                 # month_name
+                    (dt.month - 1) // 3 + 1,           # quarter
+                )
             )
+
+        loaded += bulk_upsert(
+            "gold.dim_date",
+            ("date_key", "year", "month", "day", "month_name", "quarter"),
+            prepared,
+            conflict_columns=("date_key",),
         )
+        ensure_fact_partitions(row["cart_date"] for row in rows)
+        watermark = advance(watermark, (row["updated_at"] for row in rows))
 
-    query = """
-        INSERT INTO gold.dim_date (
-            date_key,
-            year,
-            month,
-            day,
-            month_name,
-            quarter
+    set_watermark("gold.dim_date", "silver.carts", watermark)
+    return loaded
+
+
+# FACT SALES
+FACT_COLUMNS = (
+    "user_key",
+    "product_key",
+    "date_key",
+    "quantity",
+    "unit_price",
+    "total_amount",
+)
+
+# Constraints and indexes built on a rebuilt partition before it is
+# attached, so ATTACH PARTITION adopts them instead of building and
+# validating them under lock. Anything missing here is still created by
+# the ATTACH itself.
+FACT_PARTITION_DDL = (
+    "ALTER TABLE {table} ADD PRIMARY KEY (sale_id, date_key)",
+    "ALTER TABLE {table} ADD UNIQUE (user_key, product_key, date_key)",
+    "ALTER TABLE {table} ADD FOREIGN KEY (user_key) "
+    "REFERENCES gold.dim_user(user_key) ON DELETE RESTRICT",
+    "ALTER TABLE {table} ADD FOREIGN KEY (product_key) "
+    "REFERENCES gold.dim_product(product_key) ON DELETE RESTRICT",
+    "ALTER TABLE {table} ADD FOREIGN KEY (date_key) "
+    "REFERENCES gold.dim_date(date_key) ON DELETE RESTRICT",
+    "CREATE INDEX ON {table} (user_key)",
+    "CREATE INDEX ON {table} (product_key)",
+    "CREATE INDEX ON {table} USING BRIN (date_key)",
+)
+
+
+def _month_start(value: date) -> date:
+    return value.replace(day=1)
+
+
+def _next_month(month: date) -> date:
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _partition_name(month: date) -> str:
+    return f"fact_sales_{month:%Y_%m}"
+
+
+def ensure_fact_partitions(dates: Iterable[date]) -> None:
+    """
+    Create the monthly gold.fact_sales partitions covering the given dates.
+    """
+    months = sorted({_month_start(value) for value in dates})
+    if months:
+        execute_query(
+            "SELECT gold.ensure_fact_sales_partition(m) FROM unnest(%s::date[]) AS m",
+            (months,),
+        )
+
+
+# AGGREGATES
+def refresh_daily_product_sales(start: date, end: date) -> None:
+    """
+    Recompute gold.agg_daily_product_sales for dates in [start, end).
+
+    Reads only the fact partitions covering the range.
+    """
+    with transaction():
+        execute_query(
+            """
+            DELETE FROM gold.agg_daily_product_sales
+            WHERE date_key >= %s
+              AND date_key < %s
+            """,
+            (start, end),
+        )
+        execute_query(
+            """
+            INSERT INTO gold.agg_daily_product_sales (
+                date_key,
+                product_key,
+                quantity,
+                revenue,
+                sales_count
+            )
+            SELECT
+                date_key,
+                product_key,
+                SUM(quantity),
+                SUM(total_amount),
+                COUNT(*)
+            FROM gold.fact_sales
+            WHERE date_key >= %s
+              AND date_key < %s
+            GROUP BY date_key, product_key
+            """,
+            (start, end),
         )
-        VALUES (%s, %s, %s, %s, %s, %s)
-        ON CONFLICT (date_key)
-        DO NOTHING;
+
+
+def refresh_user_lifetime(keys: Iterable[int]) -> None:
     """
+    Recompute gold.agg_user_lifetime for the given users.
 
-    if prepared:
-        execute_many(query, prepared)
+    Facts are read through the user_key index; users left without
+    facts are removed.
+    """
+    keys = sorted(keys)
+    if not keys:
+        return
+
+    with transaction():
+        execute_query(
+            """
+            INSERT INTO gold.agg_user_lifetime (
+                user_key,
+                total_spent,
+                purchases,
+                first_purchase_date,
+                last_purchase_date
+            )
+            SELECT
+                user_key,
+                SUM(total_amount),
+                COUNT(*),
+                MIN(date_key),
+                MAX(date_key)
+            FROM gold.fact_sales
+            WHERE user_key = ANY(%s)
+            GROUP BY user_key
+            ON CONFLICT (user_key)
+            DO UPDATE SET
+                total_spent = EXCLUDED.total_spent,
+                purchases = EXCLUDED.purchases,
+                first_purchase_date = EXCLUDED.first_purchase_date,
+                last_purchase_date = EXCLUDED.last_purchase_date,
+                updated_at = NOW()
+            """,
+            (keys,),
+        )
+        execute_query(
+            """
+            DELETE FROM gold.agg_user_lifetime a
+            WHERE a.user_key = ANY(%s)
+              AND NOT EXISTS (
+                  SELECT 1
+                  FROM gold.fact_sales f
+                  WHERE f.user_key = a.user_key
+              )
+            """,
+            (keys,),
+        )
 
-    return len(prepared)
+
+def _touched_months(
+    carts_last_run: datetime | None,
+    products_last_run: datetime | None,
+) -> List[dict]:
+    """
+    Months to rebuild, with the latest change timestamps seen per month:
+    months holding carts changed since the last run or carts containing
+    a product whose price may have changed, and months where the users
+    of the changed carts still have facts no silver cart accounts for
+    (where a changed cart was before its date or items changed).
+    """
+    return fetch_all(
+        """
+        WITH changed_carts AS (
+            SELECT user_id, cart_date, updated_at
+            FROM silver.carts
+            WHERE updated_at > %s::timestamptz
+              AND cart_date IS NOT NULL
+        ),
+        repriced AS (
+            SELECT
+                date_trunc('month', c.cart_date)::date AS month,
+                MAX(p.updated_at) AS product_updated_at
+            FROM silver.products p
+            JOIN silver.cart_items ci ON ci.product_id = p.product_id
+            JOIN silver.carts c ON c.cart_id = ci.cart_id
+            WHERE p.updated_at > %s::timestamptz
+              AND c.cart_date IS NOT NULL
+            GROUP BY 1
+        ),
+        stale AS (
+            SELECT DISTINCT date_trunc('month', f.date_key)::date AS month
+            FROM gold.fact_sales f
+            JOIN gold.dim_user du ON du.user_key = f.user_key
+            JOIN gold.dim_product dp ON dp.product_key = f.product_key
+            WHERE du.user_id IN (SELECT user_id FROM changed_carts)
+              AND NOT EXISTS (
+                  SELECT 1
+                  FROM silver.carts c
+                  JOIN silver.cart_items ci ON ci.cart_id = c.cart_id
+                  WHERE c.user_id = du.user_id
+                    AND c.cart_date = f.date_key
+                    AND ci.product_id = dp.product_id
+              )
+        )
+        SELECT
+            month,
+            MAX(cart_updated_at) AS cart_updated_at,
+            MAX(product_updated_at) AS product_updated_at
+        FROM (
+            SELECT
+                date_trunc('month', cart_date)::date AS month,
+                updated_at AS cart_updated_at,
+                NULL::timestamptz AS product_updated_at
+            FROM changed_carts
+            UNION ALL
+            SELECT month, NULL, product_updated_at
+            FROM repriced
+            UNION ALL
+            SELECT month, NULL, NULL
+            FROM stale
+        ) months
+        GROUP BY 1
+        ORDER BY 1
+        """,
+        (since(carts_last_run), since(products_last_run)),
+    )
+
+
+def _rebuild_partition(
+    month: date,
+    on_commit: Callable[[int, int, Set[int]], None] | None = None,
+) -> Tuple[int, int, Set[int]]:
+    """
+    Rebuild one monthly partition from silver and swap it in.
+
+    The month is written in date_key order into a standalone table,
+    which gets its constraints and indexes before the old partition is
+    detached and the new one attached in a single short transaction,
+    together with the month's daily aggregates. `on_commit` is called
+    with the results inside that transaction.
+
+    Returns:
+        (rows loaded, rows skipped with unresolved keys, user keys
+        present in the old or the new partition)
+    """
+    end = _next_month(month)
+    name = _partition_name(month)
+    partition = f"gold.{name}"
+    swap = f"gold.{name}_swap"
+    loaded = 0
+    unresolved = 0
+
+    touched_users = {
+        row["user_key"]
+        for row in fetch_all(f"SELECT DISTINCT user_key FROM {partition}")
+    }
+
+    execute_query(f"DROP TABLE IF EXISTS {swap}")
+    execute_query(
+        f"""
+        CREATE TABLE {swap} (
+            LIKE gold.fact_sales INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+            CONSTRAINT {name}_bounds
+                CHECK (date_key >= DATE '{month}' AND date_key < DATE '{end}')
+        )
+        """
+    )
+
+    # Last change wins when several carts share a (user, product, date)
+    for rows in fetch_iter(
+        """
+        SELECT user_id, product_id, cart_date, quantity, price
+        FROM (
+            SELECT DISTINCT ON (c.user_id, ci.product_id, c.cart_date)
+                c.user_id,
+                ci.product_id,
+                c.cart_date,
+                ci.quantity,
+                p.price
+            FROM silver.carts c
+            JOIN silver.cart_items ci ON c.cart_id = ci.cart_id
+            JOIN silver.products p ON ci.product_id = p.product_id
+            WHERE c.cart_date >= %s
+              AND c.cart_date < %s
+            ORDER BY
+                c.user_id,
+                ci.product_id,
+                c.cart_date,
+                c.updated_at DESC,
+                c.cart_id DESC
+        ) facts
+        ORDER BY cart_date
+        """,
+        (month, end),
+        row_factory=tuple_row,
+    ):
+        prepared = []
+
+        for user_id, product_id, cart_date, quantity, unit_price in rows:
+            user_key = user_keys.resolve(user_id, cart_date)
+            product_key = product_keys.resolve(product_id, cart_date)
+
+            if user_key is None or product_key is None:
+                unresolved += 1
+                continue
+
+            total_amount = quantity * unit_price
+
+            prepared.append(
+                (
+                    user_key,
+                    product_key,
+                    cart_date,
+                    quantity,
+                    unit_price,
+                    total_amount,
+                )
+            )
+            touched_users.add(user_key)
+
+        loaded += bulk_copy(swap, FACT_COLUMNS, prepared)
+
+    for ddl in FACT_PARTITION_DDL:
+        execute_query(ddl.format(table=swap))
+    execute_query(f"ANALYZE {swap}")
+
+    with transaction():
+        execute_query(f"ALTER TABLE gold.fact_sales DETACH PARTITION {partition}")
+        execute_query(f"DROP TABLE {partition}")
+        execute_query(f"ALTER TABLE {swap} RENAME TO {name}")
+        execute_query(
+            f"""
+            ALTER TABLE gold.fact_sales
+            ATTACH PARTITION {partition}
+            FOR VALUES FROM ('{month}') TO ('{end}')
+            """
+        )
+        execute_query(f"ALTER TABLE {partition} DROP CONSTRAINT {name}_bounds")
+        refresh_daily_product_sales(month, end)
+        if on_commit is not None:
+            on_commit(loaded, unresolved, touched_users)
+
+    return loaded, unresolved, touched_users
 
 
-# FACT SALES
 def load_fact_sales() -> int:
     """
     Loads fact_sales table from silver layer.
@@ -142,81 +473,110 @@ def load_fact_sales() -> int:
     Calculates:
         total_amount = quantity * unit_price
 
-    Idempotent load using ON CONFLICT.
-    """
+    gold.fact_sales is partitioned by month of date_key. Only months
+    holding carts changed since the last successful run (or carts with a
+    product whose price may have changed), or holding facts of those
+    carts before the change, are rebuilt; each one is fully
+    rewritten from silver into a staging table and swapped in place of
+    its partition. In full mode every month is rebuilt.
 
-    rows = fetch_all("""
-        SELECT
-            c.user_id,
-            ci.product_id,
-            c.cart_date,
-            ci.quantity,
-            p.price
-        FROM silver.carts c
-        JOIN silver.cart_items ci ON c.cart_id = ci.cart_id
-        JOIN silver.products p ON ci.product_id = p.product_id
-        WHERE c.cart_date IS NOT NULL
-    """)
-
-    prepared = []
-
-    for row in rows:
-        quantity = row["quantity"]
-        unit_price = row["price"]
-        total_amount = quantity * unit_price
+    The gold aggregates are maintained from the same changes: daily
+    product sales of each rebuilt month are recomputed within its swap,
+    then lifetime totals of every user found in a rebuilt month, and
+    both are checked against the base facts.
 
-        prepared.append(
-            (
-                row["user_id"],
-                row["product_id"],
-                row["cart_date"],
-                quantity,
-                unit_price,
-                total_amount,
+    Surrogate keys are resolved in memory from the dimension key caches,
+    to the dimension version in effect on the cart date. Rows whose user
+    or product is missing from the dimensions are skipped and reported.
+
+    Within a checkpointed run (see etl.checkpoint), the months to
+    rebuild are fixed by the stage's first attempt and each swapped
+    month is recorded with its swap, so a resumed load continues with
+    the next month.
+
+    Idempotent: rebuilding a month yields the same partition content.
+    """
+    if _full_refresh():
+        return gold_full.load_fact_sales()
+
+    carts_last_run = get_watermark("gold.fact_sales", "silver.carts")
+    products_last_run = get_watermark("gold.fact_sales", "silver.products")
+    state = checkpoint.current()
+    progress = state.progress if state is not None else None
+
+    user_keys.ensure_loaded()
+    product_keys.ensure_loaded()
+
+    if state is not None:
+        months = state.inputs(
+            lambda: {"months": _touched_months(carts_last_run, products_last_run)}
+        )["months"]
+    else:
+        months = _touched_months(carts_last_run, products_last_run)
+
+    ensure_fact_partitions(row["month"] for row in months)
+
+    position = progress["position"] if progress else 0
+    loaded = progress["loaded"] if progress else 0
+    unresolved = progress["unresolved"] if progress else 0
+    touched_users: Set[int] = set(progress["users"]) if progress else set()
+
+    for position in range(position, len(months)):
+
+        def commit(month_loaded: int, month_unresolved: int, month_users: Set[int]):
+            state.commit_batch(
+                {
+                    "position": position + 1,
+                    "loaded": loaded + month_loaded,
+                    "unresolved": unresolved + month_unresolved,
+                    "users": sorted(touched_users | month_users),
+                }
             )
-        )
 
-    query = """
-        INSERT INTO gold.fact_sales (
-            user_key,
-            product_key,
-            date_key,
-            quantity,
-            unit_price,
-            total_amount
+        month_loaded, month_unresolved, month_users = _rebuild_partition(
+            months[position]["month"],
+            on_commit=commit if state is not None else None,
         )
-        SELECT
-            u.user_key,
-            p.product_key,
-            %s,
-            %s,
-            %s,
-            %s
-        FROM gold.dim_user u
-        JOIN gold.dim_product p
-            ON p.product_id = %s
-        WHERE u.user_id = %s
-        ON CONFLICT (user_key, product_key, date_key)
-        DO UPDATE SET
-            quantity = EXCLUDED.quantity,
-            unit_price = EXCLUDED.unit_price,
-            total_amount = EXCLUDED.total_amount,
-            created_at = gold.fact_sales.created_at;
-    """
-
-    final_prepared = [
-        (
-            row[2],      # date_key
-            row[3],      # quantity
-            row[4],      # unit_price
-            row[5],      # total_amount
-            row[1],      # product_id
-            row[0],      # user_id
+        loaded += month_loaded
+        unresolved += month_unresolved
+        touched_users |= month_users
+
+    carts_watermark = advance(
+        carts_last_run, (row["cart_updated_at"] for row in months)
+    )
+    products_watermark = advance(
+        products_last_run, (row["product_updated_at"] for row in months)
+    )
+
+    refresh_user_lifetime(touched_users)
+    validate_gold_aggregates(
+        months=[row["month"] for row in months],
+        user_keys=touched_users,
+    )
+
+    logger.info(
+        f"fact_sales: rebuilt {len(months)} monthly partition(s), "
+        f"refreshed lifetime totals of {len(touched_users)} user(s)"
+    )
+
+    if unresolved:
+        logger.warning(
+            f"fact_sales: {unresolved} rows skipped with unresolved "
+            "user or product keys"
         )
-        for row in prepared
-    ]
 
-    if final_prepared:
-        execute_many(query, final_prepared)
+    set_watermark("gold.fact_sales", "silver.carts", carts_watermark)
+    set_watermark("gold.fact_sales", "silver.products", products_watermark)
+    return loaded
+
 
-    return len(final_prepared)
+# PUBLISH
+def publish_gold() -> int:
+    """
+    Make the gold loads of the run visible: swap in the shadow tables of
+    a full refresh, then bump the gold data version, in one transaction.
+    """
+    with transaction():
+        if _full_refresh():
+            gold_full.swap()
+        return bump_data_version()
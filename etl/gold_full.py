@@ -0,0 +1,368 @@
+"""
+Full refresh engine for gold (LOAD_MODE=full).
+
+Every gold table is rebuilt from silver into a shadow table (see
+etl.shadow) with set-based INSERT ... SELECT statements: no unique index
+probes, no secondary index maintenance and no dead tuples. Indexes and
+constraints are built once the rows are in. Foreign keys point at the
+shadow dimensions. The live tables are only replaced when the run
+publishes (see etl.gold.publish_gold), all of them in one transaction.
+
+Surrogate keys of members already in the live dimensions are kept; new
+members draw from the dimension's sequence. With DIMENSION_SCD=type2 the
+user and product shadows start from the live rows, so history is kept,
+and get the changes of all of silver through etl.scd. Watermarks are
+recorded as pending and take effect with the swap.
+"""
+import logging
+from datetime import timedelta
+from typing import Tuple
+
+from etl import metrics, scd, shadow
+from etl.db import execute_query, fetch_all
+from etl.watermark import promote_pending_watermarks, set_pending_watermark
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ("gold.dim_user", "gold.dim_product", "gold.dim_date")
+
+# Referencing tables first: the order swap() drops the live tables in
+GOLD_TABLES = (
+    "gold.fact_sales",
+    "gold.agg_daily_product_sales",
+    "gold.agg_user_lifetime",
+    *DIMENSIONS,
+)
+
+# Consumers whose watermarks are published with the swap
+CONSUMERS = ("gold.dim_user", "gold.dim_product", "gold.dim_date", "gold.fact_sales")
+
+
+def _load(query: str) -> Tuple[int, dict]:
+    """
+    Run a `WITH source AS (...), loaded AS (INSERT ... RETURNING 1)`
+    statement ending in a SELECT of the loaded row count and the
+    watermarks of its sources, all read from one snapshot.
+    """
+    row = fetch_all(query)[0]
+    metrics.record(rows_written=row["loaded"])
+    return row["loaded"], row
+
+
+# DIMENSIONS
+def _load_history(dimension: scd.Dimension) -> int:
+    """
+    Shadow of a Type 2 dimension: every live version, then the hash-diff
+    of all silver members against it.
+    """
+    table = shadow.create(dimension.table)
+    execute_query(f"INSERT INTO {table} SELECT * FROM {dimension.table}")
+    result = scd.merge(dimension, None, target=table)
+
+    shadow.build(dimension.table)
+    set_pending_watermark(dimension.table, dimension.source, result.watermark)
+    return len(result.written)
+
+
+def load_dim_user() -> int:
+    if scd.keeps_history():
+        return _load_history(scd.USER)
+
+    table = shadow.create("gold.dim_user")
+
+    loaded, row = _load(
+        f"""
+        WITH source AS (
+            SELECT user_id, email, username, first_name, last_name, city, updated_at
+            FROM silver.users
+        ),
+        loaded AS (
+            INSERT INTO {table} (
+                user_key, user_id, email, username, first_name, last_name, city,
+                row_hash, created_at
+            )
+            SELECT
+                COALESCE(
+                    d.user_key,
+                    nextval(pg_get_serial_sequence('gold.dim_user', 'user_key'))
+                ),
+                s.user_id, s.email, s.username, s.first_name, s.last_name, s.city,
+                {scd.row_hash(scd.USER, "s")},
+                COALESCE(d.created_at, NOW())
+            FROM source s
+            LEFT JOIN gold.dim_user d ON d.user_id = s.user_id AND d.is_current
+            ORDER BY s.user_id
+            RETURNING 1
+        )
+        SELECT
+            (SELECT COUNT(*) FROM loaded) AS loaded,
+            (SELECT MAX(updated_at) FROM source) AS users_watermark
+        """
+    )
+
+    shadow.build("gold.dim_user")
+    set_pending_watermark("gold.dim_user", "silver.users", row["users_watermark"])
+    return loaded
+
+
+def load_dim_product() -> int:
+    if scd.keeps_history():
+        return _load_history(scd.PRODUCT)
+
+    table = shadow.create("gold.dim_product")
+
+    loaded, row = _load(
+        f"""
+        WITH source AS (
+            SELECT product_id, title, category, price, updated_at
+            FROM silver.products
+        ),
+        loaded AS (
+            INSERT INTO {table} (
+                product_key, product_id, title, category, price, row_hash,
+                created_at
+            )
+            SELECT
+                COALESCE(
+                    d.product_key,
+                    nextval(pg_get_serial_sequence('gold.dim_product', 'product_key'))
+                ),
+                s.product_id, s.title, s.category, s.price,
+                {scd.row_hash(scd.PRODUCT, "s")},
+                COALESCE(d.created_at, NOW())
+            FROM source s
+            LEFT JOIN gold.dim_product d
+                ON d.product_id = s.product_id AND d.is_current
+            ORDER BY s.product_id
+            RETURNING 1
+        )
+        SELECT
+            (SELECT COUNT(*) FROM loaded) AS loaded,
+            (SELECT MAX(updated_at) FROM source) AS products_watermark
+        """
+    )
+
+    shadow.build("gold.dim_product")
+    set_pending_watermark(
+        "gold.dim_product", "silver.products", row["products_watermark"]
+    )
+    return loaded
+
+
+def load_dim_date() -> int:
+    table = shadow.create("gold.dim_date")
+
+    loaded, row = _load(
+        f"""
+        WITH source AS (
+            SELECT cart_date, updated_at
+            FROM silver.carts
+            WHERE cart_date IS NOT NULL
+        ),
+        loaded AS (
+            INSERT INTO {table} (date_key, year, month, day, month_name, quarter)
+            SELECT
+                cart_date,
+                EXTRACT(YEAR FROM cart_date),
+                EXTRACT(MONTH FROM cart_date),
+                EXTRACT(DAY FROM cart_date),
+                to_char(cart_date, 'FMMonth'),
+                EXTRACT(QUARTER FROM cart_date)
+            FROM (SELECT DISTINCT cart_date FROM source) dates
+            ORDER BY cart_date
+            RETURNING 1
+        )
+        SELECT
+            (SELECT COUNT(*) FROM loaded) AS loaded,
+            (SELECT MAX(updated_at) FROM source) AS carts_watermark
+        """
+    )
+
+    shadow.build("gold.dim_date")
+    set_pending_watermark("gold.dim_date", "silver.carts", row["carts_watermark"])
+    return loaded
+
+
+# FACTS AND AGGREGATES
+def _create_fact_partitions(table: str) -> int:
+    """
+    Create a monthly partition of the shadow fact table for every month
+    of the shadow date dimension.
+    """
+    months = fetch_all(
+        f"""
+        SELECT DISTINCT date_trunc('month', date_key)::date AS month
+        FROM {shadow.shadow_name("gold.dim_date")}
+        ORDER BY 1
+        """
+    )
+
+    for row in months:
+        month = row["month"]
+        end = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+        execute_query(
+            f"""
+            CREATE TABLE {table}_{month:%Y_%m}
+            PARTITION OF {table}
+            FOR VALUES FROM ('{month}') TO ('{end}')
+            """
+        )
+
+    return len(months)
+
+
+def load_fact_sales() -> int:
+    """
+    Rebuild gold.fact_sales and the gold aggregates into shadow tables.
+
+    Same grain and last-change-wins rule as the incremental load;
+    surrogate keys are resolved by joining the shadow dimensions, to the
+    version in effect on the cart date. Rows
+    whose user, product or date is missing from them are skipped and
+    reported.
+    """
+    table = shadow.create("gold.fact_sales", partition_by="RANGE (date_key)")
+    months = _create_fact_partitions(table)
+    dim_user, dim_product, dim_date = (shadow.shadow_name(t) for t in DIMENSIONS)
+
+    loaded, row = _load(
+        f"""
+        WITH source AS (
+            SELECT DISTINCT ON (c.user_id, ci.product_id, c.cart_date)
+                c.user_id,
+                ci.product_id,
+                c.cart_date,
+                ci.quantity,
+                p.price
+            FROM silver.carts c
+            JOIN silver.cart_items ci ON c.cart_id = ci.cart_id
+            JOIN silver.products p ON ci.product_id = p.product_id
+            WHERE c.cart_date IS NOT NULL
+            ORDER BY
+                c.user_id,
+                ci.product_id,
+                c.cart_date,
+                c.updated_at DESC,
+                c.cart_id DESC
+        ),
+        resolved AS (
+            SELECT
+                u.user_key,
+                p.product_key,
+                d.date_key,
+                s.quantity,
+                s.price
+            FROM source s
+            LEFT JOIN {dim_user} u
+                ON u.user_id = s.user_id
+               AND {scd.in_effect("u", "s.cart_date")}
+            LEFT JOIN {dim_product} p
+                ON p.product_id = s.product_id
+               AND {scd.in_effect("p", "s.cart_date")}
+            LEFT JOIN {dim_date} d ON d.date_key = s.cart_date
+        ),
+        loaded AS (
+            INSERT INTO {table} (
+                user_key, product_key, date_key, quantity, unit_price, total_amount
+            )
+            SELECT user_key, product_key, date_key, quantity, price, quantity * price
+            FROM resolved
+            WHERE user_key IS NOT NULL
+              AND product_key IS NOT NULL
+              AND date_key IS NOT NULL
+            ORDER BY date_key
+            RETURNING 1
+        )
+        SELECT
+            (SELECT COUNT(*) FROM loaded) AS loaded,
+            (SELECT COUNT(*) FROM resolved) - (SELECT COUNT(*) FROM loaded) AS unresolved,
+            (SELECT MAX(updated_at) FROM silver.carts) AS carts_watermark,
+            (SELECT MAX(updated_at) FROM silver.products) AS products_watermark
+        """
+    )
+
+    shadow.build("gold.fact_sales", shadowed=DIMENSIONS)
+    _load_aggregates(table)
+
+    logger.info(
+        f"fact_sales: full refresh of {months} monthly partition(s) into shadow tables"
+    )
+
+    if row["unresolved"]:
+        logger.warning(
+            f"fact_sales: {row['unresolved']} rows skipped with unresolved "
+            "user, product or date keys"
+        )
+
+    set_pending_watermark("gold.fact_sales", "silver.carts", row["carts_watermark"])
+    set_pending_watermark(
+        "gold.fact_sales", "silver.products", row["products_watermark"]
+    )
+    return loaded
+
+
+def _load_aggregates(facts: str) -> None:
+    """
+    Compute the gold aggregates from the shadow facts into their shadows.
+    """
+    daily = shadow.create("gold.agg_daily_product_sales")
+    execute_query(
+        f"""
+        INSERT INTO {daily} (date_key, product_key, quantity, revenue, sales_count)
+        SELECT
+            date_key,
+            product_key,
+            SUM(quantity),
+            SUM(total_amount),
+            COUNT(*)
+        FROM {facts}
+        GROUP BY date_key, product_key
+        ORDER BY date_key, product_key
+        """
+    )
+    shadow.build("gold.agg_daily_product_sales", shadowed=DIMENSIONS)
+
+    lifetime = shadow.create("gold.agg_user_lifetime")
+    execute_query(
+        f"""
+        INSERT INTO {lifetime} (
+            user_key,
+            total_spent,
+            purchases,
+            first_purchase_date,
+            last_purchase_date
+        )
+        SELECT
+            user_key,
+            SUM(total_amount),
+            COUNT(*),
+            MIN(date_key),
+            MAX(date_key)
+        FROM {facts}
+        GROUP BY user_key
+        ORDER BY user_key
+        """
+    )
+    shadow.build("gold.agg_user_lifetime", shadowed=DIMENSIONS)
+
+
+# PUBLISH
+def swap() -> None:
+    """
+    Replace the live gold tables with their shadows and make the pending
+    watermarks effective. Call it inside the publishing transaction.
+
+    Raises:
+        ValueError: If a gold table has no shadow built by this run,
+            i.e. the run did not rebuild every gold table.
+    """
+    missing = [table for table in GOLD_TABLES if not shadow.built(table)]
+    if missing:
+        raise ValueError(
+            "Full refresh incomplete, no shadow table built by this run for: "
+            + ", ".join(missing)
+        )
+
+    shadow.swap(GOLD_TABLES)
+    promote_pending_watermarks(CONSUMERS)
+    logger.info(f"gold: swapped in {len(GOLD_TABLES)} fully refreshed tables")
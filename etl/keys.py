@@ -0,0 +1,101 @@
+import threading
+from bisect import bisect_left
+from datetime import date, datetime, time, timedelta, timezone
+
+from etl.db import fetch_iter
+
+# Start of a member's first version, which has no valid_from
+_BEGINNING = datetime.min.replace(tzinfo=timezone.utc)
+
+
+class DimensionKeyCache:
+    """
+    In-memory natural key -> surrogate key lookup for one dimension.
+
+    Loaded once per run with a single streamed scan when fact loading
+    starts, after the dimension stages, so it resolves keys without
+    touching the database.
+
+    Members with a single version map straight to their key. Members
+    with several versions (DIMENSION_SCD=type2) also keep the start of
+    each version, and resolve to the one in effect at the end of the
+    given day (UTC), like etl.scd.in_effect.
+    """
+
+    def __init__(self, table: str, natural_key: str, surrogate_key: str) -> None:
+        self.table = table
+        self.natural_key = natural_key
+        self.surrogate_key = surrogate_key
+        self._keys: dict[int, int] = {}
+        self._versions: dict[int, tuple[list[datetime], list[int]]] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def ensure_loaded(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+
+            history: dict[int, list[tuple[datetime, int]]] = {}
+
+            for rows in fetch_iter(
+                f"""
+                SELECT {self.natural_key}, {self.surrogate_key}, valid_from, is_current
+                FROM {self.table}
+                """
+            ):
+                for row in rows:
+                    natural_id = row[self.natural_key]
+                    key = row[self.surrogate_key]
+
+                    if row["is_current"]:
+                        self._keys[natural_id] = key
+                    if row["valid_from"] is not None or not row["is_current"]:
+                        history.setdefault(natural_id, []).append(
+                            (row["valid_from"] or _BEGINNING, key)
+                        )
+
+            for natural_id, versions in history.items():
+                versions.sort()
+                self._versions[natural_id] = (
+                    [start for start, _ in versions],
+                    [key for _, key in versions],
+                )
+
+            self._loaded = True
+
+    def resolve(self, natural_id: int, on: date | None = None) -> int | None:
+        """
+        Surrogate key of a member: its current version, or the version in
+        effect at the end of day `on`.
+        """
+        versions = self._versions.get(natural_id)
+        if versions is None or on is None:
+            return self._keys.get(natural_id)
+
+        starts, keys = versions
+        end = datetime.combine(on + timedelta(days=1), time.min, tzinfo=timezone.utc)
+        index = bisect_left(starts, end) - 1
+        return keys[index] if index >= 0 else None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._keys.clear()
+            self._versions.clear()
+            self._loaded = False
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+user_keys = DimensionKeyCache("gold.dim_user", "user_id", "user_key")
+product_keys = DimensionKeyCache("gold.dim_product", "product_id", "product_key")
+
+
+def reset_key_caches() -> None:
+    """
+    Drop cached keys so the next fact load reloads them. Called once at
+    the start of each run.
+    """
+    user_keys.reset()
+    product_keys.reset()
@@ -0,0 +1,151 @@
+"""
+Local raw landing zone.
+
+With LANDING_DIR set, bronze also writes every API fetch as a gzip
+compressed, newline-delimited JSON snapshot:
+
+    <LANDING_DIR>/<YYYY-MM-DD>/<entity>-<HHMMSSffffff>.ndjson.gz
+
+Snapshots are memory-mapped and streamed back by iter_records(), which
+etl.silver.replay_snapshots() feeds straight into the silver transforms,
+so backfills need neither the API nor a scan of raw.*.
+
+Usage:
+    python -m etl.landing --from 2026-01-01 --to 2026-03-31
+"""
+import argparse
+import gzip
+import json
+import mmap
+import os
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List
+
+from etl.config import get_settings
+
+ENTITIES = ("products", "users", "carts")
+
+COMPRESS_LEVEL = 6
+
+
+def _landing_dir() -> Path | None:
+    directory = get_settings().landing_dir
+    return Path(directory) if directory else None
+
+
+def _snapshot_path(directory: Path, entity: str) -> Path:
+    now = datetime.now(timezone.utc)
+    return (
+        directory
+        / now.strftime("%Y-%m-%d")
+        / f"{entity}-{now.strftime('%H%M%S%f')}.ndjson.gz"
+    )
+
+
+def tee(entity: str, records: Iterable[Dict]) -> Iterator[Dict]:
+    """
+    Yield records unchanged while writing them to a new snapshot.
+
+    The snapshot only becomes visible (renamed from its .tmp name) once
+    the source is exhausted, so an interrupted fetch never leaves a
+    partial snapshot behind. No-op without LANDING_DIR.
+    """
+    directory = _landing_dir()
+    if directory is None:
+        yield from records
+        return
+
+    path = _snapshot_path(directory, entity)
+    tmp = path.with_suffix(".tmp")
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    try:
+        with gzip.open(
+            tmp, "wt", encoding="utf-8", compresslevel=COMPRESS_LEVEL
+        ) as out:
+            for record in records:
+                out.write(json.dumps(record, separators=(",", ":"), ensure_ascii=False))
+                out.write("\n")
+                yield record
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+    os.replace(tmp, path)
+
+
+def snapshots(
+    entity: str,
+    start: date | None = None,
+    end: date | None = None,
+) -> List[Path]:
+    """
+    Snapshots of an entity fetched between start and end (inclusive),
+    oldest first.
+    """
+    directory = _landing_dir()
+    if directory is None or not directory.is_dir():
+        return []
+
+    paths = []
+
+    for day_dir in sorted(directory.iterdir()):
+        try:
+            day = date.fromisoformat(day_dir.name)
+        except ValueError:
+            continue
+
+        if (start and day < start) or (end and day > end):
+            continue
+
+        paths.extend(sorted(day_dir.glob(f"{entity}-*.ndjson.gz")))
+
+    return paths
+
+
+def iter_snapshot(path: Path) -> Iterator[Dict]:
+    """
+    Stream the records of one snapshot from a memory-mapped file.
+    """
+    with open(path, "rb") as fh:
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with gzip.GzipFile(fileobj=mapped, mode="rb") as stream:
+                for line in stream:
+                    if line.strip():
+                        yield json.loads(line)
+
+
+def iter_records(
+    entity: str,
+    start: date | None = None,
+    end: date | None = None,
+) -> Iterator[Dict]:
+    """
+    Stream every record of an entity's snapshots in fetch order.
+    """
+    for path in snapshots(entity, start, end):
+        yield from iter_snapshot(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Replay landing zone snapshots into the silver layer"
+    )
+    parser.add_argument("--from", dest="start", type=date.fromisoformat)
+    parser.add_argument("--to", dest="end", type=date.fromisoformat)
+    parser.add_argument("--entity", choices=ENTITIES, action="append")
+    args = parser.parse_args()
+
+    from etl.silver import replay_snapshots
+
+    # Carts reference users and products in silver
+    for entity in ENTITIES:
+        if args.entity and entity not in args.entity:
+            continue
+        seen, loaded = replay_snapshots(entity, args.start, args.end)
+        print(f"{entity:<10} seen={seen} loaded={loaded}")
+
+
+if __name__ == "__main__":
+    main()
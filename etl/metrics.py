@@ -0,0 +1,230 @@
+"""
+Per-stage metrics for pipeline runs.
+
+A stage (one pipeline step, e.g. "silver.products") is measured with
+stage(). While it runs, etl.db and FakeStoreClient attribute their work
+to it through record() and timed(): rows read and written, API requests
+and bytes, SQL statements, time spent in the API and in the warehouse,
+and time spent waiting for a pooled connection. Whatever remains of the
+wall time is Python work (parsing, transformation).
+
+Finished stages are collected per process until reset_run_metrics(),
+and can be exported as JSON and as a Prometheus textfile.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Generator, List
+
+from etl.config import get_settings
+
+COUNTERS = (
+    "rows_read",
+    "rows_written",
+    "api_requests",
+    "api_bytes",
+    "api_seconds",
+    "sql_statements",
+    "db_seconds",
+    "connection_wait_seconds",
+)
+
+# Exported metric name and help text per stage field
+PROMETHEUS_METRICS = {
+    "seconds": ("etl_stage_duration_seconds", "Wall time of the stage."),
+    "rows_read": ("etl_stage_rows_read", "Rows read from the API or the warehouse."),
+    "rows_written": ("etl_stage_rows_written", "Rows sent to the warehouse."),
+    "api_requests": ("etl_stage_api_requests", "HTTP requests issued."),
+    "api_bytes": ("etl_stage_api_bytes", "HTTP response bytes received."),
+    "api_seconds": ("etl_stage_api_seconds", "Time spent waiting on the API."),
+    "sql_statements": ("etl_stage_sql_statements", "Statements sent to the warehouse."),
+    "db_seconds": ("etl_stage_db_seconds", "Time spent in warehouse calls."),
+    "connection_wait_seconds": (
+        "etl_stage_connection_wait_seconds",
+        "Time spent waiting for a pooled connection.",
+    ),
+    "other_seconds": (
+        "etl_stage_other_seconds",
+        "Wall time not spent on the API, the warehouse or connection waits.",
+    ),
+}
+
+
+class StageMetrics:
+    """
+    Counters of one stage execution. Safe to update from several threads.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.started_at = datetime.now(timezone.utc)
+        self.seconds = 0.0
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self._lock = threading.Lock()
+
+    def add(self, values: dict) -> None:
+        with self._lock:
+            for key, value in values.items():
+                self.counters[key] += value
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+
+        accounted = (
+            counters["api_seconds"]
+            + counters["db_seconds"]
+            + counters["connection_wait_seconds"]
+        )
+
+        return {
+            "stage": self.name,
+            "started_at": self.started_at.isoformat(),
+            "seconds": round(self.seconds, 4),
+            **{
+                key: round(value, 4) if isinstance(value, float) else value
+                for key, value in counters.items()
+            },
+            "other_seconds": round(max(self.seconds - accounted, 0.0), 4),
+        }
+
+
+_current_stage: ContextVar[StageMetrics | None] = ContextVar(
+    "current_stage", default=None
+)
+
+_finished_lock = threading.Lock()
+_finished: List[StageMetrics] = []
+
+
+def record(**values: float) -> None:
+    """
+    Add values to the counters of the stage running in this context.
+
+    No-op outside of a stage() block.
+    """
+    current = _current_stage.get()
+    if current is not None:
+        current.add(values)
+
+
+@contextmanager
+def timed(counter: str) -> Generator[None, None, None]:
+    """
+    Add the duration of the block to a *_seconds counter of the stage.
+    """
+    if _current_stage.get() is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(**{counter: time.perf_counter() - start})
+
+
+@contextmanager
+def stage(name: str) -> Generator[StageMetrics, None, None]:
+    """
+    Measure a pipeline stage and collect it for the current run.
+
+    Work done in threads started inside the block is not attributed,
+    since they do not inherit the stage context.
+    """
+    metrics = StageMetrics(name)
+    token = _current_stage.set(metrics)
+    start = time.perf_counter()
+
+    try:
+        yield metrics
+    finally:
+        metrics.seconds = time.perf_counter() - start
+        _current_stage.reset(token)
+        with _finished_lock:
+            _finished.append(metrics)
+
+
+def run_metrics() -> List[dict]:
+    """
+    Metrics of every stage finished since the last reset, in order.
+    """
+    with _finished_lock:
+        return [metrics.as_dict() for metrics in _finished]
+
+
+def reset_run_metrics() -> None:
+    with _finished_lock:
+        _finished.clear()
+
+
+# EXPORT
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def to_prometheus(stages: List[dict], run_id: str) -> str:
+    """
+    Render stage metrics in the Prometheus text exposition format.
+
+    Every series is a gauge labelled with the stage only, meant for the
+    node_exporter textfile collector; the run id is exposed once through
+    the etl_run_info metric, so each run does not start new series.
+    """
+    lines = []
+
+    for field, (metric, help_text) in PROMETHEUS_METRICS.items():
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} gauge")
+        for stage_metrics in stages:
+            labels = f'stage="{_escape(stage_metrics["stage"])}"'
+            lines.append(f"{metric}{{{labels}}} {stage_metrics[field]}")
+
+    lines.append("# HELP etl_run_info Id of the last run.")
+    lines.append("# TYPE etl_run_info gauge")
+    lines.append(f'etl_run_info{{run_id="{_escape(run_id)}"}} 1')
+
+    lines.append("# HELP etl_run_completed_timestamp_seconds End of the last run.")
+    lines.append("# TYPE etl_run_completed_timestamp_seconds gauge")
+    lines.append(f"etl_run_completed_timestamp_seconds {time.time():.3f}")
+
+    return "\n".join(lines) + "\n"
+
+
+def _write_atomic(path: Path, content: str) -> None:
+    # The textfile collector must never read a partially written file
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(content, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def export_run_metrics(run_id: str, stages: List[dict] | None = None) -> List[Path]:
+    """
+    Write the run metrics to METRICS_DIR, if configured.
+
+    Produces etl_run_<run_id>.json and etl_pipeline.prom (overwritten on
+    every run). Returns the written paths.
+    """
+    metrics_dir = get_settings().metrics_dir
+    if not metrics_dir:
+        return []
+
+    stages = run_metrics() if stages is None else stages
+    directory = Path(metrics_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    json_path = directory / f"etl_run_{run_id}.json"
+    prom_path = directory / "etl_pipeline.prom"
+
+    _write_atomic(
+        json_path,
+        json.dumps({"run_id": run_id, "stages": stages}, indent=2),
+    )
+    _write_atomic(prom_path, to_prometheus(stages, run_id))
+
+    return [json_path, prom_path]
@@ -1,22 +1,253 @@
-from typing import Tuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
+from etl.config import get_settings
 from etl.db import fetch_all
 
+# Offending keys reported per failed check
+SAMPLE_SIZE = 5
+
 
 class DataQualityError(Exception):
     """Raised when a data quality validation fails."""
-    pass
+
+    def __init__(self, message: str, failures: Sequence["CheckResult"] = ()):
+        super().__init__(message)
+        self.failures = list(failures)
+
+
+class Check(NamedTuple):
+    """
+    A declarative data quality rule.
+
+    condition is a SQL predicate that is true for a violating row of
+    table (for the gold aggregate checks, of the aggregate row `a` full
+    joined to the one recomputed from the facts, `f`); predicate is its
+    Python equivalent over a row dict, used to check in-flight silver
+    batches (None: table scan only).
+    """
+
+    name: str
+    table: str
+    key: str
+    condition: str
+    message: str
+    predicate: Callable[[dict], bool] | None = None
+
+
+class CheckResult(NamedTuple):
+    check: Check
+    violations: int
+    sample: List
+
+
+_registry: Dict[str, List[Check]] = {}
+
+
+def register(check: Check) -> Check:
+    """
+    Add a check to the registry. Names are unique per table.
+    """
+    checks = _registry.setdefault(check.table, [])
+    if any(existing.name == check.name for existing in checks):
+        raise ValueError(f"Check already registered: {check.table}.{check.name}")
+    checks.append(check)
+    return check
+
+
+def checks_for(table: str) -> List[Check]:
+    return list(_registry.get(table, []))
+
+
+def _describe(result: CheckResult) -> str:
+    check = result.check
+    return (
+        f"{check.message} [{check.table}.{check.name}: "
+        f"{result.violations} violation(s), sample {check.key}={result.sample}]"
+    )
+
+
+def _raise_failures(failures: List[CheckResult]) -> None:
+    if failures:
+        raise DataQualityError(
+            "\n".join(_describe(result) for result in failures), failures
+        )
+
+
+# TABLE SCANS
+def _scan_table(table: str) -> List[CheckResult]:
+    """
+    Evaluate every check of a table in a single aggregate scan.
+
+    Only violation counts are returned by the scan; samples of offending
+    keys are fetched afterwards, with a LIMIT, for failed checks only.
+    """
+    checks = checks_for(table)
+    if not checks:
+        return []
+
+    counts = ",\n".join(
+        f"COUNT(*) FILTER (WHERE {check.condition}) AS c{i}"
+        for i, check in enumerate(checks)
+    )
+    row = fetch_all(f"SELECT\n{counts}\nFROM {table};")[0]
+
+    results = []
+    for i, check in enumerate(checks):
+        violations = row[f"c{i}"]
+        sample = []
+
+        if violations:
+            sample = [
+                sampled["key"]
+                for sampled in fetch_all(
+                    f"""
+                    SELECT {check.key} AS key
+                    FROM {table}
+                    WHERE {check.condition}
+                    LIMIT {SAMPLE_SIZE};
+                    """
+                )
+            ]
+
+        results.append(CheckResult(check, violations, sample))
+
+    return results
+
+
+def run_checks(tables: Iterable[str] | None = None) -> List[CheckResult]:
+    """
+    Evaluate the registered checks of the given tables (all by default).
+
+    Each table is scanned once; tables are scanned concurrently on
+    separate pooled connections, at most DW_POOL_MAX_SIZE at a time.
+
+    Raises:
+        DataQualityError: Listing every failed check with its violation
+            count and a sample of offending keys.
+    """
+    tables = list(_registry if tables is None else tables)
+    workers = max(1, min(len(tables), get_settings().dw_pool_max_size))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        scanned = list(executor.map(_scan_table, tables))
+
+    results = [result for table_results in scanned for result in table_results]
+    _raise_failures([result for result in results if result.violations])
+    return results
 
 
-def _assert_zero(query: str, message: str) -> None:
+# IN-FLIGHT BATCHES
+def check_batch(table: str, columns: Sequence[str], rows: Iterable[Tuple]) -> None:
     """
-    Execute a validation query that must return zero rows.
+    Evaluate the checks of a table on a batch about to be written.
+
+    No-op unless QUALITY_MODE is "batch". Lets the silver transform
+    reject a bad batch before writing it, instead of rescanning the
+    table afterwards.
 
     Raises:
-        DataQualityError: If query returns any record.
+        DataQualityError: If any row of the batch violates a check.
     """
-    result = fetch_all(query)
-    if result:
-        raise DataQualityError(message)
+    if get_settings().quality_mode != "batch":
+        return
+
+    checks = [check for check in checks_for(table) if check.predicate]
+    if not checks:
+        return
+
+    violations = {check.name: 0 for check in checks}
+    samples = {check.name: [] for check in checks}
+
+    for row in rows:
+        record = dict(zip(columns, row))
+        for check in checks:
+            if check.predicate(record):
+                violations[check.name] += 1
+                if len(samples[check.name]) < SAMPLE_SIZE:
+                    samples[check.name].append(record[check.key])
+
+    _raise_failures(
+        [
+            CheckResult(check, violations[check.name], samples[check.name])
+            for check in checks
+            if violations[check.name]
+        ]
+    )
+
+
+# Tables whose transform evaluates checks in flight, by engine setting
+_IN_FLIGHT_ENGINES = {
+    "silver.products": ("silver_engine_products", ("python", "columnar")),
+    "silver.users": ("silver_engine_users", ("python",)),
+    "silver.cart_items": ("silver_engine_carts", ("python",)),
+}
+
+
+def _checked_in_flight(table: str) -> bool:
+    settings = get_settings()
+    if settings.quality_mode != "batch" or table not in _IN_FLIGHT_ENGINES:
+        return False
+
+    setting, engines = _IN_FLIGHT_ENGINES[table]
+    return getattr(settings, setting) in engines
+
+
+def _validate(table: str) -> None:
+    if not _checked_in_flight(table):
+        run_checks([table])
+
+
+def _negative(value) -> bool:
+    return value is not None and value < 0
+
+
+# SILVER CHECKS
+register(Check(
+    name="non_negative_price",
+    table="silver.products",
+    key="product_id",
+    condition="price < 0",
+    message="Invalid product pricing detected.",
+    predicate=lambda row: _negative(row["price"]),
+))
+
+register(Check(
+    name="non_negative_rating_count",
+    table="silver.products",
+    key="product_id",
+    condition="rating_count < 0",
+    message="Invalid product rating_count detected.",
+    predicate=lambda row: _negative(row["rating_count"]),
+))
+
+register(Check(
+    name="email_present",
+    table="silver.users",
+    key="user_id",
+    condition="email IS NULL",
+    message="Null email detected in silver.users.",
+    predicate=lambda row: row["email"] is None,
+))
+
+register(Check(
+    name="username_present",
+    table="silver.users",
+    key="user_id",
+    condition="username IS NULL",
+    message="Null username detected in silver.users.",
+    predicate=lambda row: row["username"] is None,
+))
+
+register(Check(
+    name="positive_quantity",
+    table="silver.cart_items",
+    key="cart_id",
+    condition="quantity <= 0",
+    message="Non-positive quantity detected in silver.cart_items.",
+    predicate=lambda row: row["quantity"] is not None and row["quantity"] <= 0,
+))
 
 
 # SILVER VALIDATIONS
@@ -24,41 +255,146 @@ def validate_silver_products() -> None:
     """
     Ensures no invalid prices or negative rating counts exist.
     """
-    _assert_zero(
-        """
-        SELECT product_id
-        FROM silver.products
-        WHERE price < 0
-           OR rating_count < 0;
-        """,
-        "Invalid product pricing or rating_count detected."
-    )
+    _validate("silver.products")
 
 
 def validate_silver_users() -> None:
     """
     Ensures critical user fields are not null.
     """
-    _assert_zero(
-        """
-        SELECT user_id
-        FROM silver.users
-        WHERE email IS NULL
-           OR username IS NULL;
-        """,
-        "Null email or username detected in silver.users."
-    )
+    _validate("silver.users")
 
 
 def validate_silver_cart_items() -> None:
     """
     Ensures cart item quantities are positive.
     """
-    _assert_zero(
-        """
-        SELECT cart_id
-        FROM silver.cart_items
-        WHERE quantity <= 0;
+    _validate("silver.cart_items")
+
+
+# GOLD AGGREGATES
+DAILY_PRODUCT_CONSISTENCY = Check(
+    name="matches_fact_sales",
+    table="gold.agg_daily_product_sales",
+    key="date_key/product_key",
+    condition=(
+        "(f.quantity, f.revenue, f.sales_count) "
+        "IS DISTINCT FROM (a.quantity, a.revenue, a.sales_count)"
+    ),
+    message="gold.agg_daily_product_sales is out of sync with gold.fact_sales.",
+)
+
+USER_LIFETIME_CONSISTENCY = Check(
+    name="matches_fact_sales",
+    table="gold.agg_user_lifetime",
+    key="user_key",
+    condition=(
+        "(f.total_spent, f.purchases, f.first_purchase_date, f.last_purchase_date) "
+        "IS DISTINCT FROM "
+        "(a.total_spent, a.purchases, a.first_purchase_date, a.last_purchase_date)"
+    ),
+    message="gold.agg_user_lifetime is out of sync with gold.fact_sales.",
+)
+
+
+def _mismatches(query: str, params: tuple) -> Tuple[int, List]:
+    row = fetch_all(
+        f"""
+        WITH mismatches AS ({query})
+        SELECT
+            COUNT(*) AS violations,
+            (array_agg(key ORDER BY key))[1:{SAMPLE_SIZE}] AS sample
+        FROM mismatches
+        """,
+        params,
+    )[0]
+    return row["violations"], row["sample"] or []
+
+
+def validate_gold_aggregates(
+    months: Iterable[date] | None = None,
+    user_keys: Iterable[int] | None = None,
+) -> None:
+    """
+    Ensures the gold aggregates match the base facts.
+
+    By default the whole of gold.fact_sales is re-aggregated. Passing
+    the months and users changed by a load limits the comparison to
+    those fact partitions and users.
+
+    Raises:
+        DataQualityError: With the number of mismatching aggregate rows
+            and a sample of their keys.
+    """
+    start, end = date.min, date.max
+    if months is not None:
+        months = sorted(months)
+        if not months:
+            start = end
+        else:
+            start = months[0]
+            end = (months[-1].replace(day=28) + timedelta(days=4)).replace(day=1)
+
+    daily = _mismatches(
+        f"""
+        SELECT COALESCE(f.date_key, a.date_key)::text
+            || '/' || COALESCE(f.product_key, a.product_key) AS key
+        FROM (
+            SELECT
+                date_key,
+                product_key,
+                SUM(quantity) AS quantity,
+                SUM(total_amount) AS revenue,
+                COUNT(*) AS sales_count
+            FROM gold.fact_sales
+            WHERE date_key >= %s AND date_key < %s
+            GROUP BY date_key, product_key
+        ) f
+        FULL JOIN (
+            SELECT *
+            FROM gold.agg_daily_product_sales
+            WHERE date_key >= %s AND date_key < %s
+        ) a
+            ON a.date_key = f.date_key
+           AND a.product_key = f.product_key
+        WHERE {DAILY_PRODUCT_CONSISTENCY.condition}
         """,
-        "Non-positive quantity detected in silver.cart_items."
+        (start, end, start, end),
+    )
+
+    keys = None if user_keys is None else sorted(user_keys)
+    lifetime = _mismatches(
+        f"""
+        SELECT COALESCE(f.user_key, a.user_key) AS key
+        FROM (
+            SELECT
+                user_key,
+                SUM(total_amount) AS total_spent,
+                COUNT(*) AS purchases,
+                MIN(date_key) AS first_purchase_date,
+                MAX(date_key) AS last_purchase_date
+            FROM gold.fact_sales
+            WHERE %s::bigint[] IS NULL OR user_key = ANY(%s::bigint[])
+            GROUP BY user_key
+        ) f
+        FULL JOIN (
+            SELECT *
+            FROM gold.agg_user_lifetime
+            WHERE %s::bigint[] IS NULL OR user_key = ANY(%s::bigint[])
+        ) a
+            ON a.user_key = f.user_key
+        WHERE {USER_LIFETIME_CONSISTENCY.condition}
+        """,
+        (keys, keys, keys, keys),
+    )
+
+    _raise_failures(
+        [
+            CheckResult(check, violations, sample)
+            for check, (violations, sample) in (
+                (DAILY_PRODUCT_CONSISTENCY, daily),
+                (USER_LIFETIME_CONSISTENCY, lifetime),
+            )
+            if violations
+        ]
     )
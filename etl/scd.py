@@ -0,0 +1,198 @@
+"""
+Hash-diff maintenance of gold.dim_user and gold.dim_product.
+
+Every dimension row keeps row_hash, an MD5 of its tracked attributes.
+The members changed in silver since the last run are frozen in a
+temporary table with their hash and compared, in bulk, against the
+current version of each member. Only members whose hash differs are
+written; all other rows are left untouched.
+
+DIMENSION_SCD selects how a changed member is written:
+
+- type1: the current row is overwritten in place.
+- type2: the current row is closed (valid_to, is_current = false) and a
+  new version with a new surrogate key is inserted, valid from the
+  silver change time. A member's first version has no valid_from.
+
+Facts resolve the version in effect at the end of the cart date (UTC),
+see in_effect() and etl.keys.
+"""
+from datetime import datetime
+from typing import List, NamedTuple, Tuple
+
+from etl import metrics
+from etl.config import get_settings
+from etl.db import execute_query, fetch_all, transaction
+from etl.watermark import since
+
+
+class Dimension(NamedTuple):
+    table: str
+    natural_key: str
+    surrogate_key: str
+    tracked: Tuple[str, ...]
+    source: str
+
+
+USER = Dimension(
+    "gold.dim_user",
+    "user_id",
+    "user_key",
+    ("email", "username", "first_name", "last_name", "city"),
+    "silver.users",
+)
+PRODUCT = Dimension(
+    "gold.dim_product",
+    "product_id",
+    "product_key",
+    ("title", "category", "price"),
+    "silver.products",
+)
+
+
+class MergeResult(NamedTuple):
+    changed: int
+    written: List[dict]
+    closed: int
+    watermark: datetime | None
+
+
+def keeps_history() -> bool:
+    return get_settings().dimension_scd == "type2"
+
+
+def row_hash(dimension: Dimension, alias: str) -> str:
+    """
+    SQL expression hashing the tracked attributes of `alias`.
+    """
+    columns = ", ".join(f"{alias}.{column}" for column in dimension.tracked)
+    return f"md5(ROW({columns})::text)::uuid"
+
+
+def in_effect(alias: str, day: str) -> str:
+    """
+    SQL condition: version `alias` was in effect at the end of `day`.
+    """
+    end = f"(({day}) + 1)::timestamp AT TIME ZONE 'UTC'"
+    return (
+        f"({alias}.valid_from IS NULL OR {alias}.valid_from < {end}) "
+        f"AND ({alias}.valid_to IS NULL OR {alias}.valid_to >= {end})"
+    )
+
+
+def _stage_changes(dimension: Dimension, last_run: datetime | None) -> str:
+    """
+    Freeze the silver rows changed since `last_run`, with their hash, in
+    a temporary table dropped at commit.
+    """
+    stage = f"_changes_{dimension.table.replace('.', '_')}"
+    columns = ", ".join((dimension.natural_key, *dimension.tracked))
+
+    execute_query(
+        f"""
+        CREATE TEMP TABLE {stage} ON COMMIT DROP AS
+        SELECT {columns}, {row_hash(dimension, "s")} AS row_hash, updated_at
+        FROM {dimension.source} s
+        WHERE updated_at > %s::timestamptz
+        """,
+        (since(last_run),),
+    )
+    return stage
+
+
+def _overwrite(dimension: Dimension, target: str, stage: str) -> List[dict]:
+    columns = ", ".join((dimension.natural_key, *dimension.tracked, "row_hash"))
+    assignments = ", ".join(
+        f"{column} = EXCLUDED.{column}" for column in (*dimension.tracked, "row_hash")
+    )
+
+    return fetch_all(
+        f"""
+        INSERT INTO {target} AS d ({columns})
+        SELECT {columns}
+        FROM {stage}
+        ORDER BY {dimension.natural_key}
+        ON CONFLICT ({dimension.natural_key}) WHERE is_current
+        DO UPDATE SET {assignments}, updated_at = NOW()
+        WHERE d.row_hash IS DISTINCT FROM EXCLUDED.row_hash
+        RETURNING {dimension.natural_key}, {dimension.surrogate_key}, valid_from
+        """
+    )
+
+
+def _add_versions(dimension: Dimension, target: str, stage: str) -> Tuple[int, List[dict]]:
+    natural_key = dimension.natural_key
+    columns = ", ".join((natural_key, *dimension.tracked, "row_hash"))
+    staged = ", ".join(
+        f"s.{column}" for column in (natural_key, *dimension.tracked, "row_hash")
+    )
+
+    closed = fetch_all(
+        f"""
+        UPDATE {target} d
+        SET valid_to = GREATEST(s.updated_at, d.valid_from),
+            is_current = FALSE,
+            updated_at = NOW()
+        FROM {stage} s
+        WHERE d.{natural_key} = s.{natural_key}
+          AND d.is_current
+          AND d.row_hash IS DISTINCT FROM s.row_hash
+        RETURNING d.{natural_key}
+        """
+    )
+
+    # Members without a current version: new ones and the ones just closed
+    written = fetch_all(
+        f"""
+        INSERT INTO {target} ({columns}, valid_from)
+        SELECT
+            {staged},
+            (
+                SELECT MAX(h.valid_to)
+                FROM {target} h
+                WHERE h.{natural_key} = s.{natural_key}
+            )
+        FROM {stage} s
+        WHERE NOT EXISTS (
+            SELECT 1
+            FROM {target} d
+            WHERE d.{natural_key} = s.{natural_key}
+              AND d.is_current
+        )
+        ORDER BY s.{natural_key}
+        RETURNING {natural_key}, {dimension.surrogate_key}, valid_from
+        """
+    )
+
+    return len(closed), written
+
+
+def merge(
+    dimension: Dimension,
+    last_run: datetime | None,
+    target: str | None = None,
+) -> MergeResult:
+    """
+    Apply the silver changes since `last_run` to the dimension (or to
+    `target`, e.g. its shadow) in one transaction.
+
+    Returns:
+        Changed silver rows, the (natural key, surrogate key, valid_from)
+        rows written, versions closed, and the latest change seen.
+    """
+    target = target or dimension.table
+
+    with transaction():
+        stage = _stage_changes(dimension, last_run)
+
+        if keeps_history():
+            closed, written = _add_versions(dimension, target, stage)
+        else:
+            closed, written = 0, _overwrite(dimension, target, stage)
+
+        row = fetch_all(
+            f"SELECT COUNT(*) AS changed, MAX(updated_at) AS watermark FROM {stage}"
+        )[0]
+
+    metrics.record(rows_written=len(written) + closed)
+    return MergeResult(row["changed"], written, closed, row["watermark"])
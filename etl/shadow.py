@@ -0,0 +1,269 @@
+"""
+Shadow tables for full refreshes.
+
+A full refresh loads a table into a fresh shadow copy (gold.dim_user ->
+gold.dim_user_shadow) that has only the columns, defaults and NOT NULL
+constraints of the live table: no indexes, keys, checks or foreign keys
+to maintain while rows are bulk loaded. build() then creates the
+constraints and indexes of the live table on the loaded shadow, read
+from the catalog so they always match the migrations. Foreign keys to
+tables refreshed alongside point at their shadows.
+
+Each shadow is tagged with the run that created it (see
+etl.checkpoint; outside a run, with the current process), so shadows
+left behind by an earlier run are never taken for this run's.
+
+swap() replaces a set of live tables with their shadows in a single
+transaction, so readers see either the old tables or the new ones,
+never a partly loaded table.
+"""
+import re
+import uuid
+import hashlib
+from typing import Iterable, Sequence
+
+from etl import checkpoint
+from etl.db import execute_query, fetch_all, transaction
+
+SUFFIX = "_shadow"
+
+# Build tag of shadows created outside a checkpointed run
+_PROCESS_BUILD = uuid.uuid4().hex
+
+
+def shadow_name(table: str) -> str:
+    return f"{table}{SUFFIX}"
+
+
+def _build_tag() -> str:
+    state = checkpoint.current()
+    build = state.run_id if state is not None else _PROCESS_BUILD
+    return f"shadow build {hashlib.md5(build.encode()).hexdigest()}"
+
+
+def built(table: str) -> bool:
+    """
+    Whether the shadow of a table exists and was created by this run.
+    """
+    rows = fetch_all(
+        "SELECT obj_description(to_regclass(%s), 'pg_class') AS tag",
+        (shadow_name(table),),
+    )
+    return rows[0]["tag"] == _build_tag()
+
+
+def _drop(shadow: str) -> None:
+    """
+    Drop a shadow table, after the shadows with foreign keys to it.
+    """
+    referencing = fetch_all(
+        """
+        SELECT DISTINCT conrelid::regclass::text AS name
+        FROM pg_constraint
+        WHERE contype = 'f'
+          AND confrelid = to_regclass(%s)
+          AND conrelid <> confrelid
+          AND conparentid = 0
+        """,
+        (shadow,),
+    )
+    for row in referencing:
+        _drop(row["name"])
+
+    execute_query(f"DROP TABLE IF EXISTS {shadow}")
+
+
+def create(table: str, partition_by: str | None = None) -> str:
+    """
+    Create an empty shadow of a table, replacing any earlier one along
+    with the shadows referencing it, which were built against it.
+
+    Returns:
+        The shadow table name.
+    """
+    shadow = shadow_name(table)
+    partitioning = f" PARTITION BY {partition_by}" if partition_by else ""
+
+    _drop(shadow)
+    execute_query(
+        f"CREATE TABLE {shadow} (LIKE {table} INCLUDING DEFAULTS){partitioning}"
+    )
+    execute_query(f"COMMENT ON TABLE {shadow} IS '{_build_tag()}'")
+    return shadow
+
+
+def _point_at_shadows(definition: str, shadowed: Iterable[str]) -> str:
+    for referenced in shadowed:
+        definition = definition.replace(
+            f"REFERENCES {referenced}(", f"REFERENCES {shadow_name(referenced)}("
+        )
+    return definition
+
+
+def build(table: str, shadowed: Iterable[str] = ()) -> None:
+    """
+    Create the constraints and indexes of a live table on its loaded
+    shadow, and analyze it.
+
+    Keys come first, then checks, then foreign keys, which point at the
+    shadow of every referenced table listed in `shadowed`. Each one is
+    validated as it is added. Names get the shadow suffix until swap().
+    """
+    shadow = shadow_name(table)
+    shadowed = list(shadowed)
+
+    constraints = fetch_all(
+        """
+        SELECT conname, pg_get_constraintdef(oid) AS definition
+        FROM pg_constraint
+        WHERE conrelid = %s::regclass
+          AND contype IN ('p', 'u', 'x', 'c', 'f')
+        ORDER BY array_position(ARRAY['p', 'u', 'x', 'c', 'f'], contype::text), conname
+        """,
+        (table,),
+    )
+    for row in constraints:
+        definition = _point_at_shadows(row["definition"], shadowed)
+        execute_query(
+            f"ALTER TABLE {shadow} ADD CONSTRAINT {row['conname']}{SUFFIX} {definition}"
+        )
+
+    # Indexes not backing one of the table's own constraints
+    indexes = fetch_all(
+        """
+        SELECT pg_get_indexdef(i.indexrelid) AS definition
+        FROM pg_index i
+        WHERE i.indrelid = %s::regclass
+          AND NOT EXISTS (
+              SELECT 1
+              FROM pg_constraint c
+              WHERE c.conrelid = i.indrelid
+                AND c.conindid = i.indexrelid
+          )
+        """,
+        (table,),
+    )
+    for row in indexes:
+        execute_query(
+            re.sub(
+                r"^CREATE (UNIQUE )?INDEX (\S+) ON (ONLY )?\S+ ",
+                lambda match: (
+                    f"CREATE {match[1] or ''}INDEX {match[2]}{SUFFIX} ON {shadow} "
+                ),
+                row["definition"],
+            )
+        )
+
+    execute_query(f"ANALYZE {shadow}")
+
+
+def _strip_suffix(name: str) -> str:
+    return name[: -len(SUFFIX)] if name.endswith(SUFFIX) else name
+
+
+def _adopt_sequences(table: str) -> None:
+    """
+    Move sequences owned by columns of the live table to its shadow, so
+    dropping the live table keeps them.
+    """
+    rows = fetch_all(
+        """
+        SELECT d.objid::regclass::text AS sequence, a.attname AS column_name
+        FROM pg_depend d
+        JOIN pg_class s ON s.oid = d.objid AND s.relkind = 'S'
+        JOIN pg_attribute a
+            ON a.attrelid = d.refobjid
+           AND a.attnum = d.refobjsubid
+        WHERE d.refobjid = %s::regclass
+          AND d.deptype = 'a'
+        """,
+        (table,),
+    )
+    for row in rows:
+        execute_query(
+            f"ALTER SEQUENCE {row['sequence']} "
+            f"OWNED BY {shadow_name(table)}.{row['column_name']}"
+        )
+
+
+def _promote(table: str) -> None:
+    """
+    Rename a shadow, its constraints, indexes and partitions to the
+    live names.
+    """
+    schema, name = table.split(".")
+    execute_query(f"ALTER TABLE {shadow_name(table)} RENAME TO {name}")
+    execute_query(f"COMMENT ON TABLE {table} IS NULL")
+
+    for row in fetch_all(
+        "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass",
+        (table,),
+    ):
+        if row["conname"].endswith(SUFFIX):
+            execute_query(
+                f"ALTER TABLE {table} RENAME CONSTRAINT {row['conname']} "
+                f"TO {_strip_suffix(row['conname'])}"
+            )
+
+    for row in fetch_all(
+        """
+        SELECT c.relname
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = %s::regclass
+        """,
+        (table,),
+    ):
+        if row["relname"].endswith(SUFFIX):
+            execute_query(
+                f"ALTER INDEX {schema}.{row['relname']} "
+                f"RENAME TO {_strip_suffix(row['relname'])}"
+            )
+
+    prefix = f"{name}{SUFFIX}_"
+    for row in fetch_all(
+        """
+        SELECT c.relname
+        FROM pg_inherits h
+        JOIN pg_class c ON c.oid = h.inhrelid
+        WHERE h.inhparent = %s::regclass
+        """,
+        (table,),
+    ):
+        if not row["relname"].startswith(prefix):
+            continue
+
+        partition = f"{name}_{row['relname'][len(prefix):]}"
+        execute_query(f"ALTER TABLE {schema}.{row['relname']} RENAME TO {partition}")
+
+        # Partition indexes are named after the partition when created
+        for index in fetch_all(
+            """
+            SELECT c.relname
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE i.indrelid = %s::regclass
+            """,
+            (f"{schema}.{partition}",),
+        ):
+            if index["relname"].startswith(prefix):
+                execute_query(
+                    f"ALTER INDEX {schema}.{index['relname']} "
+                    f"RENAME TO {name}_{index['relname'][len(prefix):]}"
+                )
+
+
+def swap(tables: Sequence[str]) -> None:
+    """
+    Replace live tables with their built shadows in one transaction.
+
+    Tables are dropped in the given order, so referencing tables must
+    come before the tables they reference.
+    """
+    with transaction():
+        for table in tables:
+            _adopt_sequences(table)
+        for table in tables:
+            execute_query(f"DROP TABLE {table}")
+        for table in tables:
+            _promote(table)
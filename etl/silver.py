@@ -1,11 +1,320 @@
-from decimal import Decimal
-from datetime import datetime
-from typing import List, Tuple
+import logging
+import re
+from decimal import Decimal, InvalidOperation
+from datetime import date, datetime
+from typing import Any, Callable, List, Tuple
+
+from psycopg.rows import tuple_row
+
+from etl import checkpoint, landing, silver_sql
+from etl.config import get_settings
+from etl.db import (
+    bulk_merge,
+    bulk_upsert,
+    chunked,
+    fetch_all,
+    fetch_iter,
+    transaction,
+)
+from etl.quality import check_batch
+from etl.watermark import get_watermark, set_watermark, since, advance
+
+logger = logging.getLogger(__name__)
+
+# (rows seen, rows loaded, new watermark)
+TransformResult = Tuple[int, int, datetime | None]
+
+PRODUCT_COLUMNS = (
+    "product_id",
+    "title",
+    "category",
+    "price",
+    "rating_rate",
+    "rating_count",
+    "price_bucket",
+)
+
+USER_COLUMNS = (
+    "user_id",
+    "email",
+    "username",
+    "first_name",
+    "last_name",
+    "city",
+)
+
+CART_COLUMNS = ("cart_id", "user_id", "cart_date")
+
+CART_ITEM_COLUMNS = ("cart_id", "product_id", "quantity")
+
+_INTEGER_RANGE = (-(2**31), 2**31 - 1)
+_INTEGER_TEXT = re.compile(r"\s*[+-]?\d+\s*")
+
+
+def _to_id(value: Any) -> int | None:
+    """
+    Integer id from a JSON value, accepted like an SQL `::integer` cast
+    (a whole number or a numeric string); None otherwise.
+    """
+    if isinstance(value, str) and _INTEGER_TEXT.fullmatch(value):
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int):
+        return None
+    return value if _INTEGER_RANGE[0] <= value <= _INTEGER_RANGE[1] else None
+
+
+def _to_int(value: Any) -> int | None:
+    """
+    Truncated integer from a JSON number or numeric string, like int();
+    None when it is not a finite number in the integer range.
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        return None
+    try:
+        number = Decimal(str(value).strip())
+    except InvalidOperation:
+        return None
+    if not number.is_finite():
+        return None
+    return _to_id(int(number))
+
+
+def _to_decimal(value: Any) -> Decimal | None:
+    """
+    Decimal from a JSON number or numeric string; None when it is not a
+    finite number.
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        return None
+    try:
+        number = Decimal(str(value).strip())
+    except InvalidOperation:
+        return None
+    return number if number.is_finite() else None
+
+
+def _object(value: Any) -> dict:
+    """
+    A nested JSON object, or an empty one when missing, null or not an
+    object.
+    """
+    return value if isinstance(value, dict) else {}
+
+
+def _run_transform(
+    entity: str,
+    label: str,
+    engine: str,
+    engines: dict[str, Callable[[datetime | None], TransformResult]],
+) -> int:
+    """
+    Run one silver transform with the selected engine and advance the
+    entity watermark once it succeeds.
+    """
+    if engine not in engines:
+        raise ValueError(f"Unsupported silver engine for {entity}: {engine}")
+
+    last_run = get_watermark(f"silver.{entity}", f"raw.{entity}")
+    seen, loaded, watermark = engines[engine](last_run)
+
+    if not loaded and last_run is None:
+        raise ValueError(f"No valid {label} records to load into silver layer.")
+
+    # Move past a delta of invalid rows instead of failing on it every run
+    if not loaded and seen:
+        logger.warning(
+            f"{label}: none of the {seen} raw rows ingested since the last run "
+            "is valid; skipping them"
+        )
+
+    set_watermark(f"silver.{entity}", f"raw.{entity}", watermark)
+    return loaded
+
+
+def _raw_inputs(entity: str, last_run: datetime | None) -> dict:
+    """
+    Input watermarks of a silver transform: rows ingested after
+    `last_run`, up to the latest ingestion seen now.
+    """
+    row = fetch_all(
+        f"""
+        SELECT MAX(ingested_at) AS until
+        FROM raw.{entity}
+        WHERE ingested_at > %s::timestamptz
+        """,
+        (since(last_run),),
+    )[0]
+    return {"last_run": last_run, "until": row["until"]}
+
+
+def _process_raw(
+    entity: str,
+    id_column: str,
+    last_run: datetime | None,
+    flush: Callable[[List], int],
+    id_range: Tuple[int, int] | None = None,
+    raw_payload: bool = False,
+    until: datetime | None = None,
+) -> TransformResult:
+    """
+    Stream raw rows ingested after `last_run` in BATCH_SIZE chunks and
+    hand each chunk to `flush`, which transforms and writes it and
+    returns the number of rows loaded. Each chunk is written in its own
+    transaction.
+
+    `id_range` restricts the rows to an inclusive primary key range and
+    `until` to rows ingested up to that time. With `raw_payload`, rows
+    are (id, payload JSON text, ingested_at) tuples instead of dicts
+    with a decoded payload.
+
+    Within a checkpointed run (see etl.checkpoint), rows are read in key
+    order up to the ingestion watermark fixed by the stage's first
+    attempt (`until` when given), and a resumed stage continues after
+    its last committed chunk.
+    """
+    state = checkpoint.current()
+    progress = None
+
+    if state is not None:
+        inputs = state.inputs(
+            lambda: _raw_inputs(entity, last_run)
+            if until is None
+            else {"last_run": last_run, "until": until}
+        )
+        last_run = inputs["last_run"]
+        until = inputs["until"]
+        progress = state.progress
+
+    watermark = progress["watermark"] if progress else last_run
+    seen = progress["seen"] if progress else 0
+    loaded = progress["loaded"] if progress else 0
+
+    payload = "payload::text" if raw_payload else "payload"
+    query = f"""
+        SELECT {id_column}, {payload}, ingested_at
+        FROM raw.{entity}
+        WHERE ingested_at > %s::timestamptz
+    """
+    params: tuple = (since(last_run),)
+
+    if id_range is not None:
+        query += f" AND {id_column} BETWEEN %s AND %s"
+        params += tuple(id_range)
+
+    # A NULL fixed `until` (nothing was pending) matches no row
+    if until is not None or state is not None:
+        query += " AND ingested_at <= %s::timestamptz"
+        params += (until,)
+
+    if state is not None:
+        if progress:
+            query += f" AND {id_column} > %s"
+            params += (progress["after"],)
+        query += f" ORDER BY {id_column}"
+
+    row_factory = tuple_row if raw_payload else None
+    record_id = 0 if raw_payload else id_column
+    ingested_at = 2 if raw_payload else "ingested_at"
+
+    for rows in fetch_iter(query, params, row_factory=row_factory):
+        with transaction():
+            seen += len(rows)
+            loaded += flush(rows)
+            watermark = advance(watermark, (row[ingested_at] for row in rows))
+
+            if state is not None:
+                state.commit_batch(
+                    {
+                        "after": rows[-1][record_id],
+                        "seen": seen,
+                        "loaded": loaded,
+                        "watermark": watermark,
+                    }
+                )
+
+    return seen, loaded, watermark
 
-from etl.db import fetch_all, execute_many
 
 # PRODUCTS
-def transform_products() -> int:
+def _prepare_product(product_id: int, data: dict) -> Tuple | None:
+    """
+    Normalize a single raw product payload.
+
+    Returns None when the record fails validation.
+    """
+    if not product_id:
+        return None
+
+    title = (data.get("title") or "").strip()
+    category = (data.get("category") or "").strip().lower()
+    rating = _object(data.get("rating"))
+
+    # A missing or null price is 0; a non-numeric one fails validation
+    raw_price = data.get("price")
+    price = Decimal(0) if raw_price is None else _to_decimal(raw_price)
+    rating_rate = _to_decimal(rating.get("rate")) or Decimal(0)
+    rating_count = _to_int(rating.get("count")) or 0
+
+    #  Basic validations 
+    if price is None or price < 0:
+        return None
+
+    if rating_count < 0:
+        rating_count = 0
+
+    #  Derived column 
+    if price < 50:
+        price_bucket = "low"
+    elif price <= 150:
+        price_bucket = "mid"
+    else:
+        price_bucket = "high"
+
+    return (
+        product_id,
+        title,
+        category,
+        price,
+        rating_rate,
+        rating_count,
+        price_bucket,
+    )
+
+
+def _write_products(prepared: List[Tuple]) -> int:
+    check_batch("silver.products", PRODUCT_COLUMNS, prepared)
+    return bulk_upsert(
+        "silver.products",
+        PRODUCT_COLUMNS,
+        prepared,
+        conflict_columns=("product_id",),
+        update_columns=PRODUCT_COLUMNS[1:],
+        extra_updates="updated_at = NOW()",
+    )
+
+
+def _flush_products_python(rows: List[dict]) -> int:
+    prepared = [
+        record
+        for row in rows
+        if (record := _prepare_product(row["product_id"], row["payload"]))
+    ]
+    return _write_products(prepared) if prepared else 0
+
+
+def _products_python(last_run: datetime | None) -> TransformResult:
+    return _transform_raw("products", "python", last_run)
+
+
+def _products_columnar(last_run: datetime | None) -> TransformResult:
+    return _transform_raw("products", "columnar", last_run)
+
+
+def _products_typed(last_run: datetime | None) -> TransformResult:
+    return _transform_raw("products", "typed", last_run)
+
+
+def transform_products(engine: str | None = None) -> int:
 
     """
         Transform raw product records into the silver layer.
@@ -20,11 +329,23 @@ def transform_products() -> int:
         - Text normalization (trimmed title, lowercase category)
         - Validation rules:
         • product_id must be present
-        • price must be >= 0
-        • rating_count coerced to >= 0
+        • price must be numeric and >= 0 (missing or null: 0)
+        • rating_count coerced to >= 0 (rating fields not numeric: 0)
         - Derived attribute:
         • price_bucket (low, mid, high) based on price ranges
 
+        Raw rows are streamed, transformed and flushed in chunks of
+        BATCH_SIZE rows, so memory stays flat regardless of table size.
+        In incremental mode only rows ingested after the last successful
+        run are read.
+
+        The engine (SILVER_ENGINE_PRODUCTS by default) selects where the
+        transformation runs: "python" row by row in this process, "sql"
+        as one set-based statement pushed down to Postgres (see
+        etl.silver_sql), "columnar" as array operations over each
+        batch (see etl.silver_columnar), or "typed" decoding payload text
+        into slotted structs (see etl.silver_typed).
+
         The load operation is idempotent, using ON CONFLICT (product_id)
         to ensure safe re-execution without duplication.
 
@@ -35,81 +356,77 @@ def transform_products() -> int:
         ValueError: If no valid product records are available for loading.
     """
 
-    rows = fetch_all("SELECT product_id, payload FROM raw.products")
+    engine = engine or get_settings().silver_engine_products
 
-    prepared: List[Tuple] = []
+    return _run_transform(
+        "products",
+        "product",
+        engine,
+        {
+            "python": _products_python,
+            "sql": silver_sql.transform_products,
+            "columnar": _products_columnar,
+            "typed": _products_typed,
+        },
+    )
 
-    for row in rows:
-        product_id = row["product_id"]
-        data = row["payload"]
+# USERS
+def _prepare_user(user_id: int, data: dict) -> Tuple | None:
+    """
+    Normalize a single raw user payload.
 
-        if not product_id:
-            continue
+    Returns None when the record fails validation.
+    """
+    if not user_id:
+        return None
 
-        title = (data.get("title") or "").strip()
-        category = (data.get("category") or "").strip().lower()
+    email = (data.get("email") or "").strip().lower()
+    username = (data.get("username") or "").strip()
+    name = _object(data.get("name"))
+    first_name = (name.get("firstname") or "").strip()
+    last_name = (name.get("lastname") or "").strip()
+    city = (_object(data.get("address")).get("city") or "").strip()
 
-        price = Decimal(str(data.get("price", 0)))
-        rating_rate = Decimal(str(data.get("rating", {}).get("rate", 0)))
-        rating_count = int(data.get("rating", {}).get("count", 0))
+    return (
+        user_id,
+        email,
+        username,
+        first_name,
+        last_name,
+        city,
+    )
 
-        #  Basic validations 
-        if price < 0:
-            continue
 
-        if rating_count < 0:
-            rating_count = 0
+def _write_users(prepared: List[Tuple]) -> int:
+    check_batch("silver.users", USER_COLUMNS, prepared)
+    return bulk_upsert(
+        "silver.users",
+        USER_COLUMNS,
+        prepared,
+        conflict_columns=("user_id",),
+        update_columns=USER_COLUMNS[1:],
+        extra_updates="updated_at = NOW()",
+    )
 
-        #  Derived column 
-        if price < 50:
-            price_bucket = "low"
-        elif price <= 150:
-            price_bucket = "mid"
-        else:
-            price_bucket = "high"
 
-        prepared.append(
-            (
-                product_id,
-                title,
-                category,
-                price,
-                rating_rate,
-                rating_count,
-                price_bucket,
-            )
-        )
+def _flush_users_python(rows: List[dict]) -> int:
+    prepared = [
+        record
+        for row in rows
+        if (record := _prepare_user(row["user_id"], row["payload"]))
+    ]
+    return _write_users(prepared) if prepared else 0
 
-    if not prepared:
-        raise ValueError("No valid product records to load into silver layer.")
-
-    query = """
-        INSERT INTO silver.products (
-            product_id,
-            title,
-            category,
-            price,
-            rating_rate,
-            rating_count,
-            price_bucket
-        )
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
-        ON CONFLICT (product_id)
-        DO UPDATE SET
-            title = EXCLUDED.title,
-            category = EXCLUDED.category,
-            price = EXCLUDED.price,
-            rating_rate = EXCLUDED.rating_rate,
-            rating_count = EXCLUDED.rating_count,
-            price_bucket = EXCLUDED.price_bucket,
-            updated_at = NOW();
-    """
 
-    execute_many(query, prepared)
-    return len(prepared)
+def _users_python(last_run: datetime | None) -> TransformResult:
+    return _transform_raw("users", "python", last_run)
 
-# USERS
-def transform_users() -> int:
+
+def _users_typed(last_run: datetime | None) -> TransformResult:
+    return _transform_raw("users", "typed", last_run)
+
+
+def transform_users(engine: str | None = None) -> int:
     """
         Transform raw user records from the bronze layer into the silver layer.
 
@@ -124,6 +441,13 @@ def transform_users() -> int:
         - Validation rule:
             • user_id must be present
 
+        Raw rows are streamed, transformed and flushed in chunks of
+        BATCH_SIZE rows. In incremental mode only rows ingested after the
+        last successful run are read.
+
+        The engine (SILVER_ENGINE_USERS by default) selects where the
+        transformation runs: "python", "sql" pushdown or "typed".
+
         The load operation is idempotent through the use of
         ON CONFLICT (user_id), ensuring safe re-execution without
         data duplication.
@@ -135,144 +459,387 @@ def transform_users() -> int:
             ValueError: If no valid user records are available for loading.
     """
 
-    rows = fetch_all("SELECT user_id, payload FROM raw.users")
+    engine = engine or get_settings().silver_engine_users
 
-    prepared = []
+    return _run_transform(
+        "users",
+        "user",
+        engine,
+        {
+            "python": _users_python,
+            "sql": silver_sql.transform_users,
+            "typed": _users_typed,
+        },
+    )
 
-    for row in rows:
-        user_id = row["user_id"]
-        data = row["payload"]
+# CARTS + CART ITEMS
+def _prepare_cart(
+    cart_id: int,
+    data: dict,
+) -> Tuple[Tuple, List[Tuple]] | None:
+    """
+    Normalize a single raw cart payload into a cart row and its items.
 
-        if not user_id:
-            continue
+    Returns None when the cart fails validation.
+    """
+    if not cart_id:
+        return None
+
+    user_id = _to_id(data.get("userId"))
+    raw_date = data.get("date")
 
-        email = (data.get("email") or "").strip().lower()
-        username = (data.get("username") or "").strip()
-        first_name = (data.get("name", {}).get("firstname") or "").strip()
-        last_name = (data.get("name", {}).get("lastname") or "").strip()
-        city = (data.get("address", {}).get("city") or "").strip()
+    if not user_id or not raw_date:
+        return None
 
-        prepared.append(
+    # Normalize date (YYYY-MM-DD)
+    try:
+        cart_date = datetime.fromisoformat(raw_date.replace("Z", "")).date()
+    except Exception:
+        return None
+
+    items = []
+
+    for item in data.get("products", []):
+        product_id = _to_id(item.get("productId"))
+        quantity = _to_int(item.get("quantity")) or 0
+
+        if not product_id or quantity <= 0:
+            continue
+
+        items.append(
             (
-                user_id,
-                email,
-                username,
-                first_name,
-                last_name,
-                city,
+                cart_id,
+                product_id,
+                quantity,
             )
         )
 
-    if not prepared:
-        raise ValueError("No valid user records to load into silver layer.")
-
-    query = """
-        INSERT INTO silver.users (
-            user_id,
-            email,
-            username,
-            first_name,
-            last_name,
-            city
-        )
-        VALUES (%s, %s, %s, %s, %s, %s)
-        ON CONFLICT (user_id)
+    return (cart_id, user_id, cart_date), items
+
+
+CART_ITEM_STAGE_COLUMNS = {
+    "cart_id": "INTEGER",
+    "product_id": "INTEGER",
+    "quantity": "INTEGER",
+}
+
+# Per-cart delta merge. The stage holds the complete item set of every
+# cart in the batch; a cart without items is staged as one row with a
+# NULL product_id. Items missing from their cart's incoming set are
+# deleted, new ones inserted and only changed quantities updated.
+CART_ITEMS_MERGE_QUERY = """
+    WITH incoming AS (
+        -- Last occurrence wins for a product repeated within a cart
+        SELECT DISTINCT ON (cart_id, product_id) cart_id, product_id, quantity
+        FROM {stage}
+        WHERE product_id IS NOT NULL
+        ORDER BY cart_id, product_id, _seq DESC
+    ),
+    deleted AS (
+        DELETE FROM silver.cart_items ci
+        USING (SELECT DISTINCT cart_id FROM {stage}) c
+        WHERE ci.cart_id = c.cart_id
+          AND NOT EXISTS (
+              SELECT 1
+              FROM incoming i
+              WHERE i.cart_id = ci.cart_id
+                AND i.product_id = ci.product_id
+          )
+        RETURNING 1
+    ),
+    merged AS (
+        INSERT INTO silver.cart_items (cart_id, product_id, quantity)
+        SELECT cart_id, product_id, quantity
+        FROM incoming
+        ON CONFLICT (cart_id, product_id)
         DO UPDATE SET
-            email = EXCLUDED.email,
-            username = EXCLUDED.username,
-            first_name = EXCLUDED.first_name,
-            last_name = EXCLUDED.last_name,
-            city = EXCLUDED.city,
-            updated_at = NOW();
+            quantity = EXCLUDED.quantity
+        WHERE silver.cart_items.quantity IS DISTINCT FROM EXCLUDED.quantity
+        RETURNING (xmax = 0) AS inserted
+    )
+    SELECT
+        (SELECT COUNT(*) FROM incoming) AS incoming,
+        (SELECT COUNT(*) FROM merged WHERE inserted) AS inserted,
+        (SELECT COUNT(*) FROM merged WHERE NOT inserted) AS updated,
+        (SELECT COUNT(*) FROM deleted) AS deleted;
+"""
+
+CART_ITEM_CHANGES = ("inserted", "updated", "deleted", "unchanged")
+
+
+def _merge_cart_items(carts: dict[int, List[Tuple]]) -> dict[str, int]:
     """
+    Replace the stored item sets of the given carts with the incoming
+    ones, writing only the differences.
+    """
+    staged = [
+        row
+        for cart_id, items in carts.items()
+        for row in (items or [(cart_id, None, None)])
+    ]
+
+    result = bulk_merge(
+        CART_ITEM_STAGE_COLUMNS,
+        staged,
+        CART_ITEMS_MERGE_QUERY,
+        stage="_stage_cart_items_delta",
+    )[0]
+
+    return {
+        "inserted": result["inserted"],
+        "updated": result["updated"],
+        "deleted": result["deleted"],
+        "unchanged": result["incoming"] - result["inserted"] - result["updated"],
+    }
+
+
+def _write_carts(
+    carts_prepared: List[Tuple],
+    items_by_cart: dict[int, List[Tuple]],
+) -> Tuple[int, dict[str, int]]:
+    check_batch(
+        "silver.cart_items",
+        CART_ITEM_COLUMNS,
+        (item for items in items_by_cart.values() for item in items),
+    )
+    loaded = bulk_upsert(
+        "silver.carts",
+        CART_COLUMNS,
+        carts_prepared,
+        conflict_columns=("cart_id",),
+        update_columns=CART_COLUMNS[1:],
+        extra_updates="updated_at = NOW()",
+    )
+    return loaded, _merge_cart_items(items_by_cart)
+
+
+def _write_cart_batch(
+    carts: dict[int, Tuple[Tuple, List[Tuple]]],
+    item_changes: dict[str, int] | None = None,
+) -> int:
+    """
+    Write prepared (cart row, items) pairs keyed by cart_id, adding the
+    cart item change counts to `item_changes`.
+    """
+    if not carts:
+        return 0
 
-    execute_many(query, prepared)
-    return len(prepared)
+    loaded, changes = _write_carts(
+        [cart for cart, _ in carts.values()],
+        {cart_id: items for cart_id, (_, items) in carts.items()},
+    )
 
-# CARTS + CART ITEMS
-def transform_carts() -> int:
-    rows = fetch_all("SELECT cart_id, payload FROM raw.carts")
+    if item_changes is not None:
+        for kind, count in changes.items():
+            item_changes[kind] += count
 
-    carts_prepared = []
-    items_prepared = []
+    return loaded
 
-    for row in rows:
-        cart_id = row["cart_id"]
-        data = row["payload"]
 
-        if not cart_id:
-            continue
+def _flush_carts_python(
+    rows: List[dict],
+    item_changes: dict[str, int] | None = None,
+) -> int:
+    # Last occurrence of a cart in the batch wins
+    carts: dict[int, Tuple[Tuple, List[Tuple]]] = {}
 
-        user_id = data.get("userId")
-        raw_date = data.get("date")
+    for row in rows:
+        result = _prepare_cart(row["cart_id"], row["payload"])
+        if result is not None:
+            carts[row["cart_id"]] = result
 
-        if not user_id or not raw_date:
-            continue
+    return _write_cart_batch(carts, item_changes)
 
-        # Normalize date (YYYY-MM-DD)
-        try:
-            cart_date = datetime.fromisoformat(raw_date.replace("Z", "")).date()
-        except Exception:
-            continue
 
-        carts_prepared.append(
-            (
-                cart_id,
-                user_id,
-                cart_date,
-            )
-        )
+def _carts_python(last_run: datetime | None) -> TransformResult:
+    return _transform_raw("carts", "python", last_run)
 
-        for item in data.get("products", []):
-            product_id = item.get("productId")
-            quantity = item.get("quantity")
 
-            if not product_id:
-                continue
+def _carts_typed(last_run: datetime | None) -> TransformResult:
+    return _transform_raw("carts", "typed", last_run)
 
-            quantity = int(quantity or 0)
 
-            if quantity <= 0:
-                continue
+def transform_carts(engine: str | None = None) -> int:
+    """
+    Transform raw carts into silver.carts and silver.cart_items.
 
-            items_prepared.append(
-                (
-                    cart_id,
-                    product_id,
-                    quantity,
-                )
-            )
+    The engine (SILVER_ENGINE_CARTS by default) is "python", "sql"
+    pushdown or "typed" (see etl.silver_typed).
+    """
+    engine = engine or get_settings().silver_engine_carts
+
+    return _run_transform(
+        "carts",
+        "cart",
+        engine,
+        {
+            "python": _carts_python,
+            "sql": silver_sql.transform_carts,
+            "typed": _carts_typed,
+        },
+    )
+
+
+# IN-PROCESS ENGINES
+def _columnar_flush(entity: str) -> Callable[[List[dict]], int]:
+    from etl import silver_columnar
+
+    return getattr(silver_columnar, f"flush_{entity}")
+
+
+def _typed_flush(entity: str) -> Callable:
+    from etl import silver_typed
+
+    return getattr(silver_typed, f"flush_{entity}")
+
+
+# entity -> (id column, engine setting, batch flush factories by engine).
+# Factories receive the cart item change counters to accumulate into.
+# The typed engine reads raw payload text (see _process_raw).
+_FLUSHERS = {
+    "products": (
+        "product_id",
+        "silver_engine_products",
+        {
+            "python": lambda changes: _flush_products_python,
+            "columnar": lambda changes: _columnar_flush("products"),
+            "typed": lambda changes: _typed_flush("products"),
+        },
+    ),
+    "users": (
+        "user_id",
+        "silver_engine_users",
+        {
+            "python": lambda changes: _flush_users_python,
+            "typed": lambda changes: _typed_flush("users"),
+        },
+    ),
+    "carts": (
+        "cart_id",
+        "silver_engine_carts",
+        {
+            "python": lambda changes: (
+                lambda rows: _flush_carts_python(rows, changes)
+            ),
+            "typed": lambda changes: (
+                lambda rows: _typed_flush("carts")(rows, changes)
+            ),
+        },
+    ),
+}
+
+# Engines decoding the raw payload text themselves
+RAW_PAYLOAD_ENGINES = ("typed",)
+
+# (rows seen, rows loaded, new watermark, cart item change counts)
+ShardResult = Tuple[int, int, datetime | None, dict[str, int]]
+
+
+def _log_item_changes(item_changes: dict[str, int]) -> None:
+    logger.info(
+        "silver.cart_items | "
+        + " ".join(f"{kind}={count}" for kind, count in item_changes.items())
+    )
+
+
+def transform_shard(
+    entity: str,
+    engine: str,
+    last_run: datetime | None,
+    id_range: Tuple[int, int] | None = None,
+    until: datetime | None = None,
+) -> ShardResult:
+    """
+    Transform the raw rows of one primary key range (all rows by default)
+    ingested up to `until` (no bound by default) with an in-process
+    engine.
+    """
+    id_column, _, flushers = _FLUSHERS[entity]
+    item_changes = dict.fromkeys(CART_ITEM_CHANGES, 0)
+
+    seen, loaded, watermark = _process_raw(
+        entity,
+        id_column,
+        last_run,
+        flushers[engine](item_changes),
+        id_range,
+        raw_payload=engine in RAW_PAYLOAD_ENGINES,
+        until=until,
+    )
+    return seen, loaded, watermark, item_changes
+
+
+def _transform_raw(
+    entity: str,
+    engine: str,
+    last_run: datetime | None,
+) -> TransformResult:
+    """
+    Run an in-process engine, sharded over SILVER_WORKERS processes when
+    more than one is configured (see etl.silver_parallel).
+    """
+    workers = get_settings().silver_workers
 
-    if not carts_prepared:
-        raise ValueError("No valid cart records to load into silver layer.")
+    if workers > 1:
+        from etl import silver_parallel
 
-    carts_query = """
-        INSERT INTO silver.carts (
-            cart_id,
-            user_id,
-            cart_date
+        id_column = _FLUSHERS[entity][0]
+        seen, loaded, watermark, item_changes = silver_parallel.transform_sharded(
+            entity, id_column, engine, last_run, workers
         )
-        VALUES (%s, %s, %s)
-        ON CONFLICT (cart_id)
-        DO UPDATE SET
-            user_id = EXCLUDED.user_id,
-            cart_date = EXCLUDED.cart_date,
-            updated_at = NOW();
+    else:
+        seen, loaded, watermark, item_changes = transform_shard(
+            entity, engine, last_run
+        )
+
+    if entity == "carts":
+        _log_item_changes(item_changes)
+
+    return seen, loaded, watermark
+
+
+# REPLAY
+def replay_snapshots(
+    entity: str,
+    start: date | None = None,
+    end: date | None = None,
+    engine: str | None = None,
+) -> Tuple[int, int]:
     """
+    Feed landing zone snapshots (see etl.landing) through the silver
+    transform of an entity, bypassing the API and raw.*.
 
-    items_query = """
-        INSERT INTO silver.cart_items (
-            cart_id,
-            product_id,
-            quantity
-        )
-        VALUES (%s, %s, %s)
-        ON CONFLICT (cart_id, product_id)
-        DO UPDATE SET
-            quantity = EXCLUDED.quantity;
+    Snapshots taken between start and end are replayed oldest first, so
+    the latest fetched version of a record wins. The "sql" engine runs
+    inside Postgres over raw.* and the "typed" engine decodes payload
+    text, so replay falls back to "python" for them.
+    Silver watermarks are left untouched.
+
+    Returns:
+        (records read, rows loaded)
     """
+    id_column, setting, flushers = _FLUSHERS[entity]
+    engine = engine or getattr(get_settings(), setting)
+
+    if engine not in flushers or engine in RAW_PAYLOAD_ENGINES:
+        logger.info(f"replay {entity}: engine {engine} cannot replay, using python")
+        engine = "python"
+
+    item_changes = dict.fromkeys(CART_ITEM_CHANGES, 0)
+    flush = flushers[engine](item_changes)
+    seen = 0
+    loaded = 0
+
+    rows = (
+        {id_column: record.get("id"), "payload": record}
+        for record in landing.iter_records(entity, start, end)
+    )
+
+    for batch in chunked(rows):
+        seen += len(batch)
+        loaded += flush(batch)
 
-    execute_many(carts_query, carts_prepared)
-    execute_many(items_query, items_prepared)
+    if entity == "carts":
+        _log_item_changes(item_changes)
 
-    return len(carts_prepared)
\ No newline at end of file
+    return seen, loaded
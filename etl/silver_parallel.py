@@ -0,0 +1,167 @@
+"""
+Multi-process execution of the in-process silver engines.
+
+The raw rows pending for an entity are split into SILVER_WORKERS primary
+key ranges holding about the same number of rows. Each range is decoded,
+transformed and written by its own worker process, which opens its own
+connection pool, so JSON decoding and normalization use several cores.
+
+The pending rows are those ingested after the entity watermark and up
+to the latest ingestion seen when the ranges are computed, so rows
+arriving meanwhile are left whole to the next run.
+
+Each shard commits on its own. The entity watermark is only advanced by
+the caller once every shard has succeeded, so a failed run is simply
+re-processed by the next one. Within a checkpointed run (see
+etl.checkpoint), the watermarks and ranges are fixed by the stage's
+first attempt and each shard checkpoints under a label of its own, so a
+resumed stage skips finished shards and continues the others after
+their last committed batch.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+from typing import List, Tuple
+
+from etl import checkpoint, metrics
+from etl.db import fetch_all
+from etl.silver import CART_ITEM_CHANGES, ShardResult, _raw_inputs, transform_shard
+from etl.watermark import since
+
+
+def shard_ranges(
+    entity: str,
+    id_column: str,
+    last_run: datetime | None,
+    until: datetime | None,
+    shards: int,
+) -> List[Tuple[int, int]]:
+    """
+    Inclusive primary key ranges splitting the raw rows ingested after
+    `last_run` and up to `until` into at most `shards` groups of about
+    the same size.
+    """
+    rows = fetch_all(
+        f"""
+        SELECT min({id_column}) AS low, max({id_column}) AS high
+        FROM (
+            SELECT
+                {id_column},
+                ntile(%s) OVER (ORDER BY {id_column}) AS shard
+            FROM raw.{entity}
+            WHERE ingested_at > %s::timestamptz
+              AND ingested_at <= %s::timestamptz
+        ) AS pending
+        GROUP BY shard
+        ORDER BY shard
+        """,
+        (shards, since(last_run), until),
+    )
+    return [(row["low"], row["high"]) for row in rows]
+
+
+def _run_shard(
+    entity: str,
+    engine: str,
+    last_run: datetime | None,
+    until: datetime | None,
+    id_range: Tuple[int, int],
+    shard_checkpoint: Tuple[str, str] | None,
+) -> Tuple[ShardResult, dict]:
+    """
+    Worker entry point: transform one shard and return its result with
+    the metrics counters it accumulated. `shard_checkpoint` is the
+    (run id, label) the shard checkpoints under, if any.
+    """
+    attached = (
+        checkpoint.attach(*shard_checkpoint) if shard_checkpoint else nullcontext()
+    )
+
+    with metrics.stage(f"silver.{entity}.shard") as shard_metrics, attached as state:
+        if state is not None and state.done:
+            result = tuple(state.result)
+        else:
+            result = transform_shard(entity, engine, last_run, id_range, until)
+            if state is not None:
+                state.complete(result)
+
+    return result, shard_metrics.counters
+
+
+def transform_sharded(
+    entity: str,
+    id_column: str,
+    engine: str,
+    last_run: datetime | None,
+    workers: int,
+) -> ShardResult:
+    """
+    Transform the pending raw rows of an entity over a pool of worker
+    processes and merge the shard results.
+
+    Returns:
+        (rows seen, rows loaded, new watermark, cart item change counts)
+    """
+
+    def pending() -> dict:
+        inputs = _raw_inputs(entity, last_run)
+        inputs["ranges"] = shard_ranges(
+            entity, id_column, last_run, inputs["until"], workers
+        )
+        return inputs
+
+    state = checkpoint.current()
+    inputs = state.inputs(pending) if state is not None else pending()
+    last_run, until = inputs["last_run"], inputs["until"]
+
+    # Inputs fixed by an unsharded first attempt have no ranges: the
+    # shards then re-read their rows instead of resuming
+    if "ranges" in inputs:
+        ranges = [tuple(id_range) for id_range in inputs["ranges"]]
+    else:
+        ranges = shard_ranges(entity, id_column, last_run, until, workers)
+    resumable = state is not None and "ranges" in inputs
+
+    seen = 0
+    loaded = 0
+    watermark = last_run
+    item_changes = dict.fromkeys(CART_ITEM_CHANGES, 0)
+
+    if not ranges:
+        return seen, loaded, watermark, item_changes
+
+    # Spawned workers start without the parent's pool and its threads.
+    context = multiprocessing.get_context("spawn")
+
+    with ProcessPoolExecutor(max_workers=len(ranges), mp_context=context) as pool:
+        futures = [
+            pool.submit(
+                _run_shard,
+                entity,
+                engine,
+                last_run,
+                until,
+                id_range,
+                (state.run_id, f"{state.stage}#{shard}") if resumable else None,
+            )
+            for shard, id_range in enumerate(ranges, 1)
+        ]
+
+        for future in futures:
+            (shard_seen, shard_loaded, shard_watermark, changes), counters = (
+                future.result()
+            )
+
+            seen += shard_seen
+            loaded += shard_loaded
+            if shard_watermark is not None and (
+                watermark is None or shard_watermark > watermark
+            ):
+                watermark = shard_watermark
+            for kind, count in changes.items():
+                item_changes[kind] += count
+
+            metrics.record(**counters)
+
+    return seen, loaded, watermark, item_changes
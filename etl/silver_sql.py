@@ -0,0 +1,289 @@
+"""
+SQL pushdown engine for silver transforms.
+
+Each transform is a single set-based statement over raw.* using JSONB
+operators, mirroring the rules of the Python engine in etl.silver.
+Nothing round-trips through the Python process.
+
+Every function receives the entity watermark and returns
+(rows seen, rows loaded, new watermark).
+"""
+import logging
+from datetime import datetime
+from typing import Tuple
+
+from etl.db import fetch_all
+from etl.watermark import since
+
+logger = logging.getLogger(__name__)
+
+# Characters removed by str.strip() in the Python engine
+_WHITESPACE = r"E' \t\n\r\f\v'"
+
+
+def _trim(expression: str) -> str:
+    return f"btrim(COALESCE({expression}, ''), {_WHITESPACE})"
+
+
+def _to_id(expression: str) -> str:
+    # NULL instead of a failing cast, like _to_id in the Python engine
+    return (
+        f"CASE WHEN pg_input_is_valid({expression}, 'integer') "
+        f"THEN ({expression})::integer END"
+    )
+
+
+def _to_int(expression: str) -> str:
+    # int() truncates numeric JSON values; NULL when not a finite number
+    # in the integer range (nested CASEs: AND does not short-circuit)
+    number = f"trunc(({expression})::numeric)"
+    return (
+        f"CASE WHEN pg_input_is_valid({expression}, 'numeric') THEN "
+        f"CASE WHEN {number} BETWEEN -2147483648 AND 2147483647 "
+        f"THEN {number}::integer END END"
+    )
+
+
+def _to_numeric(expression: str) -> str:
+    # NULL when not a finite number, like _to_decimal in the Python engine
+    number = f"({expression})::numeric"
+    return (
+        f"CASE WHEN pg_input_is_valid({expression}, 'numeric') THEN "
+        f"CASE WHEN {number} NOT IN ('NaN', 'Infinity', '-Infinity') "
+        f"THEN {number} END END"
+    )
+
+
+def _to_date(expression: str) -> str:
+    # YYYY-MM-DD prefix and a valid timestamp, like datetime.fromisoformat
+    value = f"replace({expression}, 'Z', '')"
+    return (
+        f"CASE WHEN {expression} ~ '^\\d{{4}}-\\d{{2}}-\\d{{2}}' THEN "
+        f"CASE WHEN pg_input_is_valid({value}, 'timestamp') "
+        f"THEN ({value})::timestamp::date END END"
+    )
+
+
+def _run(query: str, last_run: datetime | None) -> Tuple[int, int, datetime | None]:
+    row = fetch_all(query, (since(last_run),))[0]
+    return row["seen"], row["loaded"], row["watermark"] or last_run
+
+
+# PRODUCTS
+PRODUCTS_QUERY = f"""
+    WITH src AS (
+        SELECT product_id, payload, ingested_at
+        FROM raw.products
+        WHERE ingested_at > %s::timestamptz
+    ),
+    parsed AS (
+        SELECT
+            product_id,
+            {_trim("payload->>'title'")} AS title,
+            lower({_trim("payload->>'category'")}) AS category,
+            -- A missing or null price is 0; a non-numeric one is NULL
+            -- and fails the price filter
+            {_to_numeric("COALESCE(payload->>'price', '0')")} AS price,
+            COALESCE({_to_numeric("payload->'rating'->>'rate'")}, 0) AS rating_rate,
+            GREATEST(COALESCE({_to_int("payload->'rating'->>'count'")}, 0), 0)
+                AS rating_count
+        FROM src
+        WHERE COALESCE(product_id, 0) <> 0
+    ),
+    upserted AS (
+        INSERT INTO silver.products (
+            product_id,
+            title,
+            category,
+            price,
+            rating_rate,
+            rating_count,
+            price_bucket
+        )
+        SELECT
+            product_id,
+            title,
+            category,
+            price,
+            rating_rate,
+            rating_count,
+            CASE
+                WHEN price < 50 THEN 'low'
+                WHEN price <= 150 THEN 'mid'
+                ELSE 'high'
+            END
+        FROM parsed
+        WHERE price >= 0
+        ON CONFLICT (product_id)
+        DO UPDATE SET
+            title = EXCLUDED.title,
+            category = EXCLUDED.category,
+            price = EXCLUDED.price,
+            rating_rate = EXCLUDED.rating_rate,
+            rating_count = EXCLUDED.rating_count,
+            price_bucket = EXCLUDED.price_bucket,
+            updated_at = NOW()
+        RETURNING 1
+    )
+    SELECT
+        (SELECT COUNT(*) FROM src) AS seen,
+        (SELECT COUNT(*) FROM upserted) AS loaded,
+        (SELECT MAX(ingested_at) FROM src) AS watermark;
+"""
+
+
+def transform_products(last_run: datetime | None) -> Tuple[int, int, datetime | None]:
+    return _run(PRODUCTS_QUERY, last_run)
+
+
+# USERS
+USERS_QUERY = f"""
+    WITH src AS (
+        SELECT user_id, payload, ingested_at
+        FROM raw.users
+        WHERE ingested_at > %s::timestamptz
+    ),
+    upserted AS (
+        INSERT INTO silver.users (
+            user_id,
+            email,
+            username,
+            first_name,
+            last_name,
+            city
+        )
+        SELECT
+            user_id,
+            lower({_trim("payload->>'email'")}),
+            {_trim("payload->>'username'")},
+            {_trim("payload->'name'->>'firstname'")},
+            {_trim("payload->'name'->>'lastname'")},
+            {_trim("payload->'address'->>'city'")}
+        FROM src
+        WHERE COALESCE(user_id, 0) <> 0
+        ON CONFLICT (user_id)
+        DO UPDATE SET
+            email = EXCLUDED.email,
+            username = EXCLUDED.username,
+            first_name = EXCLUDED.first_name,
+            last_name = EXCLUDED.last_name,
+            city = EXCLUDED.city,
+            updated_at = NOW()
+        RETURNING 1
+    )
+    SELECT
+        (SELECT COUNT(*) FROM src) AS seen,
+        (SELECT COUNT(*) FROM upserted) AS loaded,
+        (SELECT MAX(ingested_at) FROM src) AS watermark;
+"""
+
+
+def transform_users(last_run: datetime | None) -> Tuple[int, int, datetime | None]:
+    return _run(USERS_QUERY, last_run)
+
+
+# CARTS + CART ITEMS
+CARTS_QUERY = f"""
+    WITH src AS (
+        SELECT cart_id, payload, ingested_at
+        FROM raw.carts
+        WHERE ingested_at > %s::timestamptz
+    ),
+    carts AS (
+        SELECT cart_id, user_id, cart_date, payload
+        FROM (
+            SELECT
+                cart_id,
+                {_to_id("payload->>'userId'")} AS user_id,
+                {_to_date("payload->>'date'")} AS cart_date,
+                payload
+            FROM src
+            WHERE COALESCE(cart_id, 0) <> 0
+        ) c
+        WHERE COALESCE(user_id, 0) <> 0
+          AND cart_date IS NOT NULL
+    ),
+    items AS (
+        -- Last occurrence wins for a product repeated within a cart
+        SELECT DISTINCT ON (cart_id, product_id)
+            cart_id,
+            product_id,
+            quantity
+        FROM (
+            SELECT
+                c.cart_id,
+                {_to_id("e.item->>'productId'")} AS product_id,
+                COALESCE({_to_int("e.item->>'quantity'")}, 0) AS quantity,
+                e.position
+            FROM carts c
+            CROSS JOIN LATERAL jsonb_array_elements(
+                COALESCE(c.payload->'products', '[]'::jsonb)
+            ) WITH ORDINALITY AS e(item, position)
+        ) i
+        WHERE COALESCE(product_id, 0) <> 0
+          AND quantity > 0
+        ORDER BY cart_id, product_id, position DESC
+    ),
+    upserted_carts AS (
+        INSERT INTO silver.carts (
+            cart_id,
+            user_id,
+            cart_date
+        )
+        SELECT cart_id, user_id, cart_date
+        FROM carts
+        ON CONFLICT (cart_id)
+        DO UPDATE SET
+            user_id = EXCLUDED.user_id,
+            cart_date = EXCLUDED.cart_date,
+            updated_at = NOW()
+        RETURNING 1
+    ),
+    -- Per-cart delta merge: drop items no longer in the cart, insert
+    -- new ones and update only changed quantities
+    deleted_items AS (
+        DELETE FROM silver.cart_items ci
+        USING carts c
+        WHERE ci.cart_id = c.cart_id
+          AND NOT EXISTS (
+              SELECT 1
+              FROM items i
+              WHERE i.cart_id = ci.cart_id
+                AND i.product_id = ci.product_id
+          )
+        RETURNING 1
+    ),
+    merged_items AS (
+        INSERT INTO silver.cart_items (
+            cart_id,
+            product_id,
+            quantity
+        )
+        SELECT cart_id, product_id, quantity
+        FROM items
+        ON CONFLICT (cart_id, product_id)
+        DO UPDATE SET
+            quantity = EXCLUDED.quantity
+        WHERE silver.cart_items.quantity IS DISTINCT FROM EXCLUDED.quantity
+        RETURNING (xmax = 0) AS inserted
+    )
+    SELECT
+        (SELECT COUNT(*) FROM src) AS seen,
+        (SELECT COUNT(*) FROM upserted_carts) AS loaded,
+        (SELECT COUNT(*) FROM items) AS items,
+        (SELECT COUNT(*) FROM merged_items WHERE inserted) AS items_inserted,
+        (SELECT COUNT(*) FROM merged_items WHERE NOT inserted) AS items_updated,
+        (SELECT COUNT(*) FROM deleted_items) AS items_deleted,
+        (SELECT MAX(ingested_at) FROM src) AS watermark;
+"""
+
+
+def transform_carts(last_run: datetime | None) -> Tuple[int, int, datetime | None]:
+    row = fetch_all(CARTS_QUERY, (since(last_run),))[0]
+
+    logger.info(
+        f"silver.cart_items | inserted={row['items_inserted']} "
+        f"updated={row['items_updated']} deleted={row['items_deleted']} "
+        f"unchanged={row['items'] - row['items_inserted'] - row['items_updated']}"
+    )
+    return row["seen"], row["loaded"], row["watermark"] or last_run
@@ -0,0 +1,218 @@
+"""
+Typed engine for silver transforms.
+
+Raw payloads are read as JSON text in tuple rows, instead of being
+decoded by psycopg into row dicts holding nested payload dicts, and are
+decoded by schema-compiled msgspec decoders straight into slotted
+structs. Fields the transforms do not use are skipped by the decoder
+without being materialized.
+
+Applies the same rules as the Python engine. A payload that does not
+match its schema is dropped like a record failing validation.
+
+Requires the optional msgspec dependency (data-pipeline-lab[typed]).
+"""
+import logging
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, List, Tuple
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - optional dependency
+    msgspec = None
+
+from etl.silver import (
+    _to_decimal,
+    _to_id,
+    _to_int,
+    _write_cart_batch,
+    _write_products,
+    _write_users,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _require_msgspec() -> None:
+    if msgspec is None:
+        raise RuntimeError(
+            "The typed silver engine requires msgspec. "
+            "Install it with: pip install 'data-pipeline-lab[typed]'"
+        )
+
+
+# SCHEMAS
+if msgspec is not None:
+
+    # Numbers are decoded as raw JSON values and converted like the
+    # Python engine does: an invalid rating is 0, an invalid price fails
+    # the product's validation
+    class Rating(msgspec.Struct, gc=False):
+        rate: Any = None
+        count: Any = None
+
+    class Product(msgspec.Struct, gc=False):
+        title: str | None = None
+        category: str | None = None
+        price: Any = None
+        rating: Rating | None = None
+
+    class Name(msgspec.Struct, gc=False):
+        firstname: str | None = None
+        lastname: str | None = None
+
+    class Address(msgspec.Struct, gc=False):
+        city: str | None = None
+
+    class User(msgspec.Struct, gc=False):
+        email: str | None = None
+        username: str | None = None
+        name: Name | None = None
+        address: Address | None = None
+
+    # Ids, quantities and dates are raw JSON values too: an invalid one
+    # skips its item or cart, not the whole payload
+    class CartItem(msgspec.Struct, rename="camel", gc=False):
+        product_id: Any = None
+        quantity: Any = None
+
+    class Cart(msgspec.Struct, rename="camel", gc=False):
+        user_id: Any = None
+        date: Any = None
+        products: List[CartItem] = []
+
+    # strict=False accepts numbers sent as strings, like int() in the
+    # Python engine
+    _DECODERS = {
+        "products": msgspec.json.Decoder(Product, strict=False),
+        "users": msgspec.json.Decoder(User, strict=False),
+        "carts": msgspec.json.Decoder(Cart, strict=False),
+    }
+
+
+def decode_payloads(entity: str, rows: List[tuple]) -> List[tuple]:
+    """
+    Decode the JSON text payloads of (id, payload, ...) rows into
+    (id, struct) pairs, dropping payloads that do not match the schema.
+    """
+    _require_msgspec()
+
+    decode = _DECODERS[entity].decode
+    decoded = []
+
+    for row in rows:
+        try:
+            decoded.append((row[0], decode(row[1])))
+        except msgspec.ValidationError:
+            continue
+
+    if len(decoded) < len(rows):
+        logger.warning(
+            f"silver.{entity} | dropped {len(rows) - len(decoded)} payloads "
+            "not matching the schema"
+        )
+
+    return decoded
+
+
+# PRODUCTS
+def prepare_product(product_id: int, data: "Product") -> Tuple | None:
+    if not product_id:
+        return None
+
+    rating = data.rating or Rating()
+    price = Decimal(0) if data.price is None else _to_decimal(data.price)
+    if price is None or price < 0:
+        return None
+
+    if price < 50:
+        price_bucket = "low"
+    elif price <= 150:
+        price_bucket = "mid"
+    else:
+        price_bucket = "high"
+
+    return (
+        product_id,
+        (data.title or "").strip(),
+        (data.category or "").strip().lower(),
+        price,
+        _to_decimal(rating.rate) or Decimal(0),
+        max(_to_int(rating.count) or 0, 0),
+        price_bucket,
+    )
+
+
+def flush_products(rows: List[tuple]) -> int:
+    prepared = [
+        record
+        for product_id, data in decode_payloads("products", rows)
+        if (record := prepare_product(product_id, data))
+    ]
+    return _write_products(prepared) if prepared else 0
+
+
+# USERS
+def prepare_user(user_id: int, data: "User") -> Tuple | None:
+    if not user_id:
+        return None
+
+    name = data.name or Name()
+    address = data.address or Address()
+
+    return (
+        user_id,
+        (data.email or "").strip().lower(),
+        (data.username or "").strip(),
+        (name.firstname or "").strip(),
+        (name.lastname or "").strip(),
+        (address.city or "").strip(),
+    )
+
+
+def flush_users(rows: List[tuple]) -> int:
+    prepared = [
+        record
+        for user_id, data in decode_payloads("users", rows)
+        if (record := prepare_user(user_id, data))
+    ]
+    return _write_users(prepared) if prepared else 0
+
+
+# CARTS
+def prepare_cart(cart_id: int, data: "Cart") -> Tuple[Tuple, List[Tuple]] | None:
+    if not cart_id:
+        return None
+
+    user_id = _to_id(data.user_id)
+    if not user_id or not isinstance(data.date, str) or not data.date:
+        return None
+
+    try:
+        cart_date = datetime.fromisoformat(data.date.replace("Z", "")).date()
+    except ValueError:
+        return None
+
+    items = []
+
+    for item in data.products:
+        product_id = _to_id(item.product_id)
+        quantity = _to_int(item.quantity) or 0
+
+        if product_id and quantity > 0:
+            items.append((cart_id, product_id, quantity))
+
+    return (cart_id, user_id, cart_date), items
+
+
+def flush_carts(rows: List[tuple], item_changes: dict[str, int] | None = None) -> int:
+    # Last occurrence of a cart in the batch wins
+    carts = {}
+
+    for cart_id, data in decode_payloads("carts", rows):
+        result = prepare_cart(cart_id, data)
+        if result is not None:
+            carts[cart_id] = result
+
+    return _write_cart_batch(carts, item_changes)
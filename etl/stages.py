@@ -0,0 +1,126 @@
+"""
+Registry of the pipeline stages shared by the CLI and the Prefect flow.
+
+Stages are listed in an order that satisfies their dependencies when
+run one after another. Each stage names the function that runs it as
+"module:function", which is only imported when the stage runs, so
+callers pay for the modules of the stages they select and nothing else.
+"""
+import importlib
+import logging
+from typing import Any, Callable, List, NamedTuple, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Stage(NamedTuple):
+    label: str
+    layer: str
+    entity: str
+    target: str
+
+
+STAGES = (
+    Stage("bronze.products", "bronze", "products", "etl.bronze:load_products_raw"),
+    Stage("bronze.users", "bronze", "users", "etl.bronze:load_users_raw"),
+    Stage("bronze.carts", "bronze", "carts", "etl.bronze:load_carts_raw"),
+    Stage("silver.products", "silver", "products", "etl.silver:transform_products"),
+    Stage(
+        "quality.silver.products",
+        "silver",
+        "products",
+        "etl.quality:validate_silver_products",
+    ),
+    Stage("silver.users", "silver", "users", "etl.silver:transform_users"),
+    Stage(
+        "quality.silver.users",
+        "silver",
+        "users",
+        "etl.quality:validate_silver_users",
+    ),
+    # Carts reference users and products in silver
+    Stage("silver.carts", "silver", "carts", "etl.silver:transform_carts"),
+    Stage(
+        "quality.silver.cart_items",
+        "silver",
+        "carts",
+        "etl.quality:validate_silver_cart_items",
+    ),
+    Stage("gold.dim_user", "gold", "dim_user", "etl.gold:load_dim_user"),
+    Stage("gold.dim_product", "gold", "dim_product", "etl.gold:load_dim_product"),
+    Stage("gold.dim_date", "gold", "dim_date", "etl.gold:load_dim_date"),
+    Stage("gold.fact_sales", "gold", "fact_sales", "etl.gold:load_fact_sales"),
+    Stage("gold.publish", "gold", "publish", "etl.gold:publish_gold"),
+)
+
+LAYERS = ("bronze", "silver", "gold")
+
+_BY_LABEL = {stage.label: stage for stage in STAGES}
+
+
+def select(
+    layers: List[str] | None = None,
+    entities: List[str] | None = None,
+) -> List[Stage]:
+    """
+    Stages of the given layers and entities (all by default), in run order.
+
+    gold.publish is added whenever another gold stage is selected: gold
+    loads are not visible to readers until it runs.
+    """
+    selected = [
+        stage
+        for stage in STAGES
+        if (not layers or stage.layer in layers)
+        and (not entities or stage.entity in entities)
+    ]
+    publish = _BY_LABEL["gold.publish"]
+    if publish not in selected and any(stage.layer == "gold" for stage in selected):
+        selected.append(publish)
+    return selected
+
+
+def resolve(label: str) -> Callable[[], Any]:
+    """
+    Import and return the function running a stage.
+    """
+    module, function = _BY_LABEL[label].target.split(":")
+    return getattr(importlib.import_module(module), function)
+
+
+def run_stage(label: str) -> Tuple[Any, dict]:
+    """
+    Run one stage under a metrics stage of the same name.
+
+    Within an active run (see etl.checkpoint), a stage finished by an
+    earlier attempt is skipped and its recorded result returned.
+
+    Returns:
+        (stage result, metrics summary)
+    """
+    from etl import checkpoint, metrics
+
+    step = resolve(label)
+
+    with metrics.stage(label) as stage_metrics, checkpoint.stage(label) as state:
+        if state is not None and state.done:
+            logger.info(f"{label} skipped: finished by an earlier attempt")
+            result = state.result
+        else:
+            result = step()
+            if state is not None:
+                state.complete(result)
+
+    return result, stage_metrics.as_dict()
+
+
+def describe(label: str, result: Any, summary: dict) -> str:
+    """
+    One-line completion message of a stage.
+    """
+    return (
+        f"{label} completed | result={result} | duration={summary['seconds']:.2f}s"
+        f" | api={summary['api_seconds']:.2f}s db={summary['db_seconds']:.2f}s"
+        f" other={summary['other_seconds']:.2f}s"
+        f" | sql_statements={summary['sql_statements']}"
+    )
@@ -0,0 +1,112 @@
+from datetime import datetime
+from typing import Iterable
+
+from etl.config import get_settings
+from etl.db import fetch_all, execute_query
+
+
+def get_watermark(consumer: str, source: str) -> datetime | None:
+    """
+    Return the last change timestamp of `source` processed by `consumer`.
+
+    Returns None in full load mode, or when the pair was never loaded,
+    so callers rescan the whole source.
+    """
+    if get_settings().load_mode != "incremental":
+        return None
+
+    rows = fetch_all(
+        """
+        SELECT watermark
+        FROM pipeline.watermarks
+        WHERE consumer = %s
+          AND source = %s
+        """,
+        (consumer, source),
+    )
+
+    return rows[0]["watermark"] if rows else None
+
+
+def set_watermark(consumer: str, source: str, watermark: datetime | None) -> None:
+    """
+    Record a successfully processed watermark. Never moves backwards.
+    """
+    if watermark is None:
+        return
+
+    execute_query(
+        """
+        INSERT INTO pipeline.watermarks (consumer, source, watermark)
+        VALUES (%s, %s, %s)
+        ON CONFLICT (consumer, source)
+        DO UPDATE SET
+            watermark = GREATEST(pipeline.watermarks.watermark, EXCLUDED.watermark),
+            updated_at = NOW();
+        """,
+        (consumer, source, watermark),
+    )
+
+
+def since(watermark: datetime | None) -> datetime | str:
+    """
+    Query parameter for `column > %s::timestamptz` filters.
+    """
+    return watermark if watermark is not None else "-infinity"
+
+
+def advance(
+    current: datetime | None,
+    values: Iterable[datetime | None],
+) -> datetime | None:
+    """
+    Return the highest of `current` and the given change timestamps.
+    """
+    latest = max((v for v in values if v is not None), default=None)
+
+    if latest is None:
+        return current
+    if current is None:
+        return latest
+
+    return max(current, latest)
+
+
+# Consumer suffix of watermarks waiting for their load to be published
+PENDING = "#pending"
+
+
+def set_pending_watermark(
+    consumer: str,
+    source: str,
+    watermark: datetime | None,
+) -> None:
+    """
+    Record the watermark of a load that readers do not see yet (e.g. a
+    full refresh into shadow tables). It takes effect once the load is
+    published with promote_pending_watermarks().
+    """
+    set_watermark(f"{consumer}{PENDING}", source, watermark)
+
+
+def promote_pending_watermarks(consumers: Iterable[str]) -> None:
+    """
+    Make the pending watermarks of the given consumers effective.
+    """
+    execute_query(
+        """
+        WITH pending AS (
+            DELETE FROM pipeline.watermarks
+            WHERE consumer = ANY(%s)
+            RETURNING consumer, source, watermark
+        )
+        INSERT INTO pipeline.watermarks (consumer, source, watermark)
+        SELECT left(consumer, -length(%s)), source, watermark
+        FROM pending
+        ON CONFLICT (consumer, source)
+        DO UPDATE SET
+            watermark = GREATEST(pipeline.watermarks.watermark, EXCLUDED.watermark),
+            updated_at = NOW();
+        """,
+        ([f"{consumer}{PENDING}" for consumer in consumers], PENDING),
+    )
@@ -0,0 +1,126 @@
+-- ANALYTICS EXAMPLES (AGGREGATES)
+-- Data Warehouse - Gold Layer
+--
+-- Same results as sql/analytics_examples.sql, read from the aggregate
+-- tables maintained by the pipeline instead of re-aggregating
+-- gold.fact_sales:
+--   gold.agg_daily_product_sales  (date, product)
+--   gold.agg_user_lifetime        (user)
+--
+-- Queries 2 and 6 take the same psql variables date_from (inclusive)
+-- and date_to (exclusive), which also default to every date:
+--
+--   psql -v date_from=2020-01-01 -v date_to=2021-01-01 -f sql/analytics_aggregates.sql
+
+\if :{?date_from}
+\else
+    \set date_from -infinity
+\endif
+\if :{?date_to}
+\else
+    \set date_to infinity
+\endif
+
+
+-- 1. Total Revenue
+SELECT
+    SUM(total_spent) AS total_revenue
+FROM gold.agg_user_lifetime;
+
+
+-- 2. Revenue by Month
+SELECT
+    EXTRACT(YEAR FROM a.date_key)::int AS year,
+    EXTRACT(MONTH FROM a.date_key)::int AS month,
+    SUM(a.revenue) AS monthly_revenue
+FROM gold.agg_daily_product_sales a
+WHERE a.date_key >= :'date_from'::date
+  AND a.date_key <  :'date_to'::date
+GROUP BY 1, 2
+ORDER BY 1, 2;
+
+
+-- 3. Top 5 Products by Revenue
+SELECT
+    p.title,
+    SUM(a.revenue) AS revenue
+FROM gold.agg_daily_product_sales a
+JOIN gold.dim_product p ON a.product_key = p.product_key
+GROUP BY p.title
+ORDER BY revenue DESC
+LIMIT 5;
+
+
+-- 4. Revenue by Category
+SELECT
+    p.category,
+    SUM(a.revenue) AS revenue
+FROM gold.agg_daily_product_sales a
+JOIN gold.dim_product p ON a.product_key = p.product_key
+GROUP BY p.category
+ORDER BY revenue DESC;
+
+
+-- 5. Average Ticket per User
+SELECT
+    u.username,
+    SUM(l.total_spent) AS total_spent,
+    SUM(l.purchases) AS number_of_purchases,
+    ROUND(SUM(l.total_spent) / SUM(l.purchases), 2) AS avg_ticket
+FROM gold.agg_user_lifetime l
+JOIN gold.dim_user u ON l.user_key = u.user_key
+GROUP BY u.username
+ORDER BY total_spent DESC;
+
+
+-- 6. Daily Sales Trend
+SELECT
+    a.date_key,
+    SUM(a.revenue) AS daily_revenue
+FROM gold.agg_daily_product_sales a
+WHERE a.date_key >= :'date_from'::date
+  AND a.date_key <  :'date_to'::date
+GROUP BY a.date_key
+ORDER BY a.date_key;
+
+
+-- CONSISTENCY CHECK
+-- Aggregate rows that differ from the base facts (expected: no rows).
+-- The pipeline runs the same comparison for the months it rebuilds
+-- (etl.quality.validate_gold_aggregates).
+SELECT 'agg_daily_product_sales' AS aggregate, COALESCE(f.date_key, a.date_key)::text
+    || '/' || COALESCE(f.product_key, a.product_key) AS key
+FROM (
+    SELECT
+        date_key,
+        product_key,
+        SUM(quantity) AS quantity,
+        SUM(total_amount) AS revenue,
+        COUNT(*) AS sales_count
+    FROM gold.fact_sales
+    GROUP BY date_key, product_key
+) f
+FULL JOIN gold.agg_daily_product_sales a
+    ON a.date_key = f.date_key
+   AND a.product_key = f.product_key
+WHERE (f.quantity, f.revenue, f.sales_count)
+    IS DISTINCT FROM (a.quantity, a.revenue, a.sales_count)
+
+UNION ALL
+
+SELECT 'agg_user_lifetime', COALESCE(f.user_key, a.user_key)::text
+FROM (
+    SELECT
+        user_key,
+        SUM(total_amount) AS total_spent,
+        COUNT(*) AS purchases,
+        MIN(date_key) AS first_purchase_date,
+        MAX(date_key) AS last_purchase_date
+    FROM gold.fact_sales
+    GROUP BY user_key
+) f
+FULL JOIN gold.agg_user_lifetime a
+    ON a.user_key = f.user_key
+WHERE (f.total_spent, f.purchases, f.first_purchase_date, f.last_purchase_date)
+    IS DISTINCT FROM
+      (a.total_spent, a.purchases, a.first_purchase_date, a.last_purchase_date);
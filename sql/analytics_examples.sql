@@ -2,6 +2,24 @@
 -- Data Warehouse - Gold Layer
 -- 
 -- These queries demonstrate the dimensional model usability.
+--
+-- gold.fact_sales is partitioned by month of date_key: filtering on
+-- f.date_key (not on dim_date attributes) lets Postgres prune every
+-- partition outside the requested range.
+--
+-- Queries 2 and 6 take that range from the psql variables date_from
+-- (inclusive) and date_to (exclusive); both default to every date:
+--
+--   psql -v date_from=2020-01-01 -v date_to=2021-01-01 -f sql/analytics_examples.sql
+
+\if :{?date_from}
+\else
+    \set date_from -infinity
+\endif
+\if :{?date_to}
+\else
+    \set date_to infinity
+\endif
 
 
 -- 1. Total Revenue
@@ -17,6 +35,8 @@ SELECT
     SUM(f.total_amount) AS monthly_revenue
 FROM gold.fact_sales f
 JOIN gold.dim_date d ON f.date_key = d.date_key
+WHERE f.date_key >= :'date_from'::date
+  AND f.date_key <  :'date_to'::date
 GROUP BY d.year, d.month
 ORDER BY d.year, d.month;
 
@@ -60,5 +80,7 @@ SELECT
     SUM(f.total_amount) AS daily_revenue
 FROM gold.fact_sales f
 JOIN gold.dim_date d ON f.date_key = d.date_key
+WHERE f.date_key >= :'date_from'::date
+  AND f.date_key <  :'date_to'::date
 GROUP BY d.date_key
 ORDER BY d.date_key;
@@ -0,0 +1,30 @@
+-- PIPELINE METADATA
+
+CREATE SCHEMA IF NOT EXISTS pipeline;
+
+COMMENT ON SCHEMA pipeline IS 'Pipeline metadata: watermarks and run state.';
+
+
+-- WATERMARKS
+-- Last change timestamp of a source table already processed by a consumer
+CREATE TABLE IF NOT EXISTS pipeline.watermarks (
+    consumer        TEXT NOT NULL,
+    source          TEXT NOT NULL,
+    watermark       TIMESTAMPTZ NOT NULL,
+    updated_at      TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+
+    PRIMARY KEY (consumer, source)
+);
+
+COMMENT ON TABLE pipeline.watermarks IS 'Incremental load watermarks per (consumer, source) table pair.';
+
+
+-- Change tracking indexes used by incremental gold loads
+CREATE INDEX IF NOT EXISTS idx_silver_products_updated_at
+    ON silver.products (updated_at);
+
+CREATE INDEX IF NOT EXISTS idx_silver_users_updated_at
+    ON silver.users (updated_at);
+
+CREATE INDEX IF NOT EXISTS idx_silver_carts_updated_at
+    ON silver.carts (updated_at);
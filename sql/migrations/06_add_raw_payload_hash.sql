@@ -0,0 +1,19 @@
+-- RAW PAYLOAD HASHES
+-- Used by bronze loads to skip upserts whose payload did not change
+
+ALTER TABLE raw.products
+    ADD COLUMN IF NOT EXISTS payload_hash TEXT;
+
+COMMENT ON COLUMN raw.products.payload_hash IS 'SHA-256 of the canonical JSON payload.';
+
+
+ALTER TABLE raw.users
+    ADD COLUMN IF NOT EXISTS payload_hash TEXT;
+
+COMMENT ON COLUMN raw.users.payload_hash IS 'SHA-256 of the canonical JSON payload.';
+
+
+ALTER TABLE raw.carts
+    ADD COLUMN IF NOT EXISTS payload_hash TEXT;
+
+COMMENT ON COLUMN raw.carts.payload_hash IS 'SHA-256 of the canonical JSON payload.';
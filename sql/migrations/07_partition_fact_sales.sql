@@ -0,0 +1,165 @@
+-- GOLD FACT SALES - MONTHLY RANGE PARTITIONING
+-- Rebuilds gold.fact_sales as a table partitioned by month of date_key.
+-- Partitions are named gold.fact_sales_YYYY_MM and created on demand by
+-- gold.ensure_fact_sales_partition (called from load_dim_date).
+
+
+-- 1. Move an existing unpartitioned table out of the way
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'gold'
+          AND c.relname = 'fact_sales'
+          AND c.relkind = 'r'
+    ) THEN
+        ALTER TABLE gold.fact_sales RENAME TO fact_sales_unpartitioned;
+        ALTER TABLE gold.fact_sales_unpartitioned
+            RENAME CONSTRAINT fact_sales_pkey TO fact_sales_unpartitioned_pkey;
+        ALTER TABLE gold.fact_sales_unpartitioned
+            RENAME CONSTRAINT uq_fact_sales_grain TO uq_fact_sales_unpartitioned_grain;
+
+        DROP INDEX IF EXISTS gold.idx_fact_sales_user;
+        DROP INDEX IF EXISTS gold.idx_fact_sales_product;
+        DROP INDEX IF EXISTS gold.idx_fact_sales_date;
+
+        -- Keep the sequence (and its position) for the partitioned table
+        ALTER SEQUENCE gold.fact_sales_sale_id_seq OWNED BY NONE;
+    END IF;
+END $$;
+
+
+-- 2. Partitioned fact table
+-- Grain: 1 row per (user, product, date)
+CREATE SEQUENCE IF NOT EXISTS gold.fact_sales_sale_id_seq;
+
+CREATE TABLE IF NOT EXISTS gold.fact_sales (
+    sale_id         BIGINT NOT NULL DEFAULT nextval('gold.fact_sales_sale_id_seq'),
+
+    user_key        BIGINT NOT NULL,
+    product_key     BIGINT NOT NULL,
+    date_key        DATE NOT NULL,
+
+    quantity        INTEGER NOT NULL CHECK (quantity > 0),
+    unit_price      NUMERIC(10,2) NOT NULL CHECK (unit_price >= 0),
+    total_amount    NUMERIC(12,2) NOT NULL CHECK (total_amount >= 0),
+
+    created_at      TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+
+    -- Unique constraints must include the partition key
+    CONSTRAINT fact_sales_pkey
+        PRIMARY KEY (sale_id, date_key),
+
+    -- Referential integrity
+    CONSTRAINT fk_fact_user
+        FOREIGN KEY (user_key)
+        REFERENCES gold.dim_user(user_key)
+        ON DELETE RESTRICT,
+
+    CONSTRAINT fk_fact_product
+        FOREIGN KEY (product_key)
+        REFERENCES gold.dim_product(product_key)
+        ON DELETE RESTRICT,
+
+    CONSTRAINT fk_fact_date
+        FOREIGN KEY (date_key)
+        REFERENCES gold.dim_date(date_key)
+        ON DELETE RESTRICT,
+
+    -- Grain enforcement
+    CONSTRAINT uq_fact_sales_grain
+        UNIQUE (user_key, product_key, date_key),
+
+    -- Business rule consistency
+    CONSTRAINT chk_fact_sales_math
+        CHECK (total_amount = quantity * unit_price)
+) PARTITION BY RANGE (date_key);
+
+ALTER SEQUENCE gold.fact_sales_sale_id_seq OWNED BY gold.fact_sales.sale_id;
+
+COMMENT ON TABLE gold.fact_sales IS 'Sales fact table, range-partitioned by month of date_key.';
+
+
+-- Partitions are rewritten in date_key order, so a BRIN index stays
+-- tight for date ranges; B-trees remain on the dimension keys.
+-- (04_create_gold_tables.sql recreates the B-tree on re-runs.)
+DROP INDEX IF EXISTS gold.idx_fact_sales_date;
+
+CREATE INDEX IF NOT EXISTS idx_fact_sales_user
+    ON gold.fact_sales(user_key);
+
+CREATE INDEX IF NOT EXISTS idx_fact_sales_product
+    ON gold.fact_sales(product_key);
+
+CREATE INDEX IF NOT EXISTS brin_fact_sales_date
+    ON gold.fact_sales USING BRIN (date_key);
+
+
+-- 3. Partition management
+CREATE OR REPLACE FUNCTION gold.ensure_fact_sales_partition(p_date DATE)
+RETURNS TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_start DATE := date_trunc('month', p_date)::date;
+    v_end   DATE := (date_trunc('month', p_date) + INTERVAL '1 month')::date;
+    v_name  TEXT := 'fact_sales_' || to_char(p_date, 'YYYY_MM');
+BEGIN
+    IF to_regclass(format('gold.%I', v_name)) IS NULL THEN
+        EXECUTE format(
+            'CREATE TABLE gold.%I PARTITION OF gold.fact_sales FOR VALUES FROM (%L) TO (%L)',
+            v_name, v_start, v_end
+        );
+    END IF;
+
+    RETURN v_name;
+END;
+$$;
+
+COMMENT ON FUNCTION gold.ensure_fact_sales_partition(DATE) IS
+    'Creates the monthly gold.fact_sales partition covering the given date, if missing.';
+
+
+-- 4. Copy existing facts into their partitions
+DO $$
+BEGIN
+    PERFORM gold.ensure_fact_sales_partition(date_key)
+    FROM (
+        SELECT DISTINCT date_trunc('month', date_key)::date AS date_key
+        FROM gold.dim_date
+    ) months;
+
+    IF to_regclass('gold.fact_sales_unpartitioned') IS NOT NULL THEN
+        PERFORM gold.ensure_fact_sales_partition(date_key)
+        FROM (
+            SELECT DISTINCT date_trunc('month', date_key)::date AS date_key
+            FROM gold.fact_sales_unpartitioned
+        ) months;
+
+        INSERT INTO gold.fact_sales (
+            sale_id,
+            user_key,
+            product_key,
+            date_key,
+            quantity,
+            unit_price,
+            total_amount,
+            created_at
+        )
+        SELECT
+            sale_id,
+            user_key,
+            product_key,
+            date_key,
+            quantity,
+            unit_price,
+            total_amount,
+            created_at
+        FROM gold.fact_sales_unpartitioned
+        ORDER BY date_key;
+
+        DROP TABLE gold.fact_sales_unpartitioned;
+    END IF;
+END $$;
@@ -0,0 +1,85 @@
+-- GOLD AGGREGATES
+-- Maintained by load_fact_sales from the fact rows rebuilt in each run.
+
+
+-- DAILY SALES BY PRODUCT
+-- Grain: 1 row per (date, product). Category comes from dim_product.
+CREATE TABLE IF NOT EXISTS gold.agg_daily_product_sales (
+    date_key        DATE NOT NULL,
+    product_key     BIGINT NOT NULL,
+
+    quantity        BIGINT NOT NULL,
+    revenue         NUMERIC(14,2) NOT NULL,
+    sales_count     BIGINT NOT NULL,
+
+    updated_at      TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+
+    PRIMARY KEY (date_key, product_key),
+
+    CONSTRAINT fk_agg_daily_product
+        FOREIGN KEY (product_key)
+        REFERENCES gold.dim_product(product_key)
+        ON DELETE RESTRICT
+);
+
+COMMENT ON TABLE gold.agg_daily_product_sales IS 'Daily quantity and revenue per product, aggregated from gold.fact_sales.';
+
+CREATE INDEX IF NOT EXISTS idx_agg_daily_product_sales_product
+    ON gold.agg_daily_product_sales(product_key);
+
+
+-- USER LIFETIME TOTALS
+-- Grain: 1 row per user with at least one sale
+CREATE TABLE IF NOT EXISTS gold.agg_user_lifetime (
+    user_key            BIGINT PRIMARY KEY,
+
+    total_spent         NUMERIC(14,2) NOT NULL,
+    purchases           BIGINT NOT NULL,
+    first_purchase_date DATE NOT NULL,
+    last_purchase_date  DATE NOT NULL,
+
+    updated_at          TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+
+    CONSTRAINT fk_agg_user_lifetime_user
+        FOREIGN KEY (user_key)
+        REFERENCES gold.dim_user(user_key)
+        ON DELETE RESTRICT
+);
+
+COMMENT ON TABLE gold.agg_user_lifetime IS 'Lifetime sales totals per user, aggregated from gold.fact_sales.';
+
+
+-- Initial population from existing facts
+INSERT INTO gold.agg_daily_product_sales (
+    date_key,
+    product_key,
+    quantity,
+    revenue,
+    sales_count
+)
+SELECT
+    date_key,
+    product_key,
+    SUM(quantity),
+    SUM(total_amount),
+    COUNT(*)
+FROM gold.fact_sales
+GROUP BY date_key, product_key
+ON CONFLICT (date_key, product_key) DO NOTHING;
+
+INSERT INTO gold.agg_user_lifetime (
+    user_key,
+    total_spent,
+    purchases,
+    first_purchase_date,
+    last_purchase_date
+)
+SELECT
+    user_key,
+    SUM(total_amount),
+    COUNT(*),
+    MIN(date_key),
+    MAX(date_key)
+FROM gold.fact_sales
+GROUP BY user_key
+ON CONFLICT (user_key) DO NOTHING;
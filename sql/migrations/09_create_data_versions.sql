@@ -0,0 +1,14 @@
+-- DATA VERSIONS
+-- Monotonic version per layer, bumped when a layer finishes loading.
+-- Read-side caches (etl.analytics) key their entries on it.
+CREATE TABLE IF NOT EXISTS pipeline.data_versions (
+    layer           TEXT PRIMARY KEY,
+    version         BIGINT NOT NULL,
+    updated_at      TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+COMMENT ON TABLE pipeline.data_versions IS 'Data version per layer, bumped on every committed load.';
+
+INSERT INTO pipeline.data_versions (layer, version)
+VALUES ('gold', 1)
+ON CONFLICT (layer) DO NOTHING;
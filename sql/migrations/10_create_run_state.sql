@@ -0,0 +1,34 @@
+-- RUN STATE
+-- Checkpoints of pipeline runs, so a retried or resumed run skips the
+-- stages it already finished and continues a stage from its last
+-- committed batch (see etl.checkpoint).
+CREATE TABLE IF NOT EXISTS pipeline.runs (
+    run_id          TEXT PRIMARY KEY,
+    load_mode       TEXT NOT NULL,
+    status          TEXT NOT NULL CHECK (status IN ('running', 'succeeded', 'failed')),
+    attempts        INTEGER NOT NULL DEFAULT 1,
+    started_at      TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at     TIMESTAMPTZ
+);
+
+COMMENT ON TABLE pipeline.runs IS 'Pipeline runs and their attempts.';
+
+
+CREATE TABLE IF NOT EXISTS pipeline.run_stages (
+    run_id          TEXT NOT NULL REFERENCES pipeline.runs(run_id) ON DELETE CASCADE,
+    stage           TEXT NOT NULL,
+    status          TEXT NOT NULL CHECK (status IN ('running', 'done')),
+    inputs          JSONB,
+    progress        JSONB,
+    batches         INTEGER NOT NULL DEFAULT 0,
+    result          JSONB,
+    started_at      TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at      TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+
+    PRIMARY KEY (run_id, stage)
+);
+
+COMMENT ON TABLE pipeline.run_stages IS 'Per-stage state of a run: input watermarks, last committed batch and result.';
+COMMENT ON COLUMN pipeline.run_stages.inputs IS 'Input watermarks fixed by the first attempt of the stage.';
+COMMENT ON COLUMN pipeline.run_stages.progress IS 'Resume position and counters as of the last committed batch.';
+COMMENT ON COLUMN pipeline.run_stages.batches IS 'Number of committed batches.';
@@ -0,0 +1,53 @@
+-- DIMENSION HISTORY
+-- dim_user and dim_product keep a hash of their tracked attributes, so
+-- unchanged members are skipped, and with DIMENSION_SCD=type2 one row
+-- per version of a member (Type 2 SCD, see etl.scd). Only the current
+-- version of a member is unique.
+
+
+-- DIMENSION: USER
+ALTER TABLE gold.dim_user
+    ADD COLUMN IF NOT EXISTS row_hash UUID,
+    ADD COLUMN IF NOT EXISTS valid_from TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS valid_to TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS is_current BOOLEAN NOT NULL DEFAULT TRUE;
+
+UPDATE gold.dim_user
+SET row_hash = md5(ROW(email, username, first_name, last_name, city)::text)::uuid
+WHERE row_hash IS NULL;
+
+ALTER TABLE gold.dim_user
+    DROP CONSTRAINT IF EXISTS dim_user_user_id_key;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_dim_user_current
+    ON gold.dim_user(user_id)
+    WHERE is_current;
+
+COMMENT ON TABLE gold.dim_user IS 'User dimension (Type 1 or Type 2 Slowly Changing Dimension, see DIMENSION_SCD).';
+COMMENT ON COLUMN gold.dim_user.row_hash IS 'MD5 of the tracked attributes (email, username, first_name, last_name, city).';
+COMMENT ON COLUMN gold.dim_user.valid_from IS 'Start of the version; NULL for the first version of a user.';
+COMMENT ON COLUMN gold.dim_user.valid_to IS 'End of the version (exclusive); NULL for the current version.';
+
+
+-- DIMENSION: PRODUCT
+ALTER TABLE gold.dim_product
+    ADD COLUMN IF NOT EXISTS row_hash UUID,
+    ADD COLUMN IF NOT EXISTS valid_from TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS valid_to TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS is_current BOOLEAN NOT NULL DEFAULT TRUE;
+
+UPDATE gold.dim_product
+SET row_hash = md5(ROW(title, category, price)::text)::uuid
+WHERE row_hash IS NULL;
+
+ALTER TABLE gold.dim_product
+    DROP CONSTRAINT IF EXISTS dim_product_product_id_key;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_dim_product_current
+    ON gold.dim_product(product_id)
+    WHERE is_current;
+
+COMMENT ON TABLE gold.dim_product IS 'Product dimension (Type 1 or Type 2 Slowly Changing Dimension, see DIMENSION_SCD).';
+COMMENT ON COLUMN gold.dim_product.row_hash IS 'MD5 of the tracked attributes (title, category, price).';
+COMMENT ON COLUMN gold.dim_product.valid_from IS 'Start of the version; NULL for the first version of a product.';
+COMMENT ON COLUMN gold.dim_product.valid_to IS 'End of the version (exclusive); NULL for the current version.';
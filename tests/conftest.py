@@ -0,0 +1,30 @@
+"""
+Shared fixtures.
+
+Tests marked with the `warehouse` fixture run against the Postgres from
+the DW_* settings (with sql/migrations applied) inside a transaction
+that is rolled back afterwards. They are skipped when it is unreachable.
+"""
+import psycopg
+import pytest
+
+from etl.db import _build_dsn, transaction
+
+
+@pytest.fixture(scope="session")
+def warehouse_available() -> None:
+    try:
+        psycopg.connect(_build_dsn(), connect_timeout=3).close()
+    except psycopg.OperationalError as e:
+        pytest.skip(f"warehouse not reachable: {e}")
+
+
+@pytest.fixture
+def warehouse(warehouse_available):
+    """
+    Connection of a transaction every etl.db call of the test joins,
+    rolled back when the test ends.
+    """
+    with transaction() as conn:
+        yield conn
+        conn.rollback()
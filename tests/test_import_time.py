@@ -0,0 +1,72 @@
+"""
+Import-time budget of the standalone CLI.
+
+Each stage selection is loaded in a fresh interpreter the way
+`python -m etl` does: the CLI, then the modules of the selected stages.
+It must stay under the budget and never pull in Prefect.
+"""
+import sys
+import json
+import subprocess
+from pathlib import Path
+
+import pytest
+
+BUDGET_MS = 1000
+REPEAT = 3
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Stage selections (as CLI arguments) to measure
+SELECTIONS = [
+    [],
+    ["--stage", "bronze"],
+    ["--stage", "silver", "--entity", "carts"],
+    ["--stage", "gold"],
+]
+
+_PROBE = """
+import sys, json, time
+
+# Record attempts too, so the check holds where Prefect is not installed
+attempts = []
+class Watch:
+    def find_spec(self, name, path=None, target=None):
+        if name.split(".")[0] == "prefect":
+            attempts.append(name)
+sys.meta_path.insert(0, Watch())
+
+start = time.perf_counter()
+from etl.__main__ import _parse_args
+from etl.stages import resolve, select
+args = _parse_args(sys.argv[1:])
+for stage in select(args.stage, args.entity):
+    resolve(stage.label)
+print(json.dumps({
+    "ms": (time.perf_counter() - start) * 1000,
+    "prefect": bool(attempts),
+}))
+"""
+
+
+def _probe(selection: list[str]) -> dict:
+    return json.loads(
+        subprocess.run(
+            [sys.executable, "-c", _PROBE, *selection],
+            check=True,
+            capture_output=True,
+            text=True,
+            cwd=ROOT,
+        ).stdout
+    )
+
+
+@pytest.mark.parametrize(
+    "selection", SELECTIONS, ids=lambda selection: " ".join(selection) or "all"
+)
+def test_cli_imports_within_budget_without_prefect(selection):
+    # Best of REPEAT runs, so a cold disk cache does not fail the budget
+    runs = [_probe(selection) for _ in range(REPEAT)]
+
+    assert not any(run["prefect"] for run in runs)
+    assert min(run["ms"] for run in runs) <= BUDGET_MS
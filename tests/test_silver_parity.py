@@ -0,0 +1,294 @@
+"""
+The SQL pushdown engine must load the same silver rows as the
+in-process engines from the same raw payloads, invalid ones included.
+"""
+import json
+
+import pytest
+
+from etl import silver, silver_sql
+from etl.db import execute_query, fetch_all
+
+USERS = (900001, 900002)
+PRODUCTS = (900001, 900002, 900003)
+
+RAW_PRODUCTS = {
+    # Valid
+    910001: {
+        "title": " Shirt ",
+        "category": " Men's Clothing ",
+        "price": 109.95,
+        "rating": {"rate": 3.9, "count": 120},
+    },
+    910002: {"title": "Ring", "price": "15.5", "rating": {"rate": "4.1", "count": "7.9"}},
+    # Missing or null price is 0
+    910003: {"title": "Free sample"},
+    910004: {"title": "Null price", "price": None},
+    # Invalid prices
+    910005: {"title": "Text price", "price": "abc"},
+    910006: {"title": "Negative price", "price": -1},
+    910007: {"title": "Boolean price", "price": True},
+    910008: {"title": "NaN price", "price": "NaN"},
+    # Invalid ratings are 0
+    910009: {"title": "Null rating", "price": 10, "rating": None},
+    910010: {"title": "Bad rating", "price": 10, "rating": {"rate": "x", "count": -5}},
+    # Missing text
+    910011: {"title": None, "price": 200},
+}
+
+EXPECTED_PRODUCTS = {910001, 910002, 910003, 910004, 910009, 910010, 910011}
+
+RAW_USERS = {
+    910001: {
+        "email": " Ann@Example.COM ",
+        "username": " ann ",
+        "name": {"firstname": " Ann ", "lastname": "Lee"},
+        "address": {"city": " Rio "},
+    },
+    # Missing or null fields are empty
+    910002: {"username": "no-email"},
+    910003: {"email": None, "username": "null-email"},
+    910004: {"email": "a@b.c", "address": {"city": "Lima"}},
+    910005: {"email": "d@e.f", "name": None, "address": None},
+    910006: {"email": "g@h.i", "name": {"firstname": None}},
+    910007: {"email": "j@k.l", "name": {"lastname": " Kim "}, "address": {}},
+}
+
+RAW_CARTS = {
+    # Valid
+    1: {
+        "userId": 900001,
+        "date": "2020-03-02T00:00:00.000Z",
+        "products": [
+            {"productId": 900001, "quantity": 4},
+            {"productId": 900002, "quantity": 1},
+        ],
+    },
+    2: {
+        "userId": "900002",
+        "date": "2020-03-01",
+        "products": [{"productId": "900003", "quantity": "2"}],
+    },
+    3: {"userId": 900001, "date": "2020-01-15T10:30:00Z"},
+    # Invalid dates
+    4: {"userId": 900001, "date": "2020-13-45T00:00:00Z", "products": []},
+    5: {"userId": 900001, "date": "2020-02-30", "products": []},
+    6: {"userId": 900001, "date": "not a date", "products": []},
+    7: {"userId": 900001, "date": 20200302, "products": []},
+    8: {"userId": 900001, "products": []},
+    # Invalid user ids
+    9: {"userId": "abc", "date": "2020-03-02", "products": []},
+    10: {"userId": 0, "date": "2020-03-02", "products": []},
+    11: {"userId": 900001.5, "date": "2020-03-02", "products": []},
+    12: {"userId": True, "date": "2020-03-02", "products": []},
+    13: {"date": "2020-03-02", "products": []},
+    16: {"userId": 900001.0, "date": "2020-03-02", "products": []},
+    17: {"userId": 3000000000, "date": "2020-03-02", "products": []},
+    # Invalid product ids and quantities are skipped item by item
+    14: {
+        "userId": 900002,
+        "date": "2020-04-01T00:00:00.000Z",
+        "products": [
+            {"productId": "x", "quantity": 1},
+            {"productId": 0, "quantity": 1},
+            {"productId": 1.5, "quantity": 1},
+            {"productId": None, "quantity": 1},
+            {"productId": 900001, "quantity": "abc"},
+            {"productId": 900002, "quantity": 0},
+            {"productId": 900003, "quantity": -1},
+            {"productId": 900003, "quantity": None},
+            {"productId": 900001, "quantity": 2.9},
+        ],
+    },
+    18: {
+        "userId": 900001,
+        "date": "2020-04-03",
+        "products": [
+            {"productId": 3000000000, "quantity": 1},
+            {"productId": 900002, "quantity": "2.5"},
+            {"productId": 900003, "quantity": 2.7},
+        ],
+    },
+    # Last occurrence of a product wins
+    15: {
+        "userId": 900002,
+        "date": "2020-04-02",
+        "products": [
+            {"productId": 900002, "quantity": 1},
+            {"productId": 900002, "quantity": 3},
+        ],
+    },
+}
+
+EXPECTED_CARTS = {1, 2, 3, 14, 15, 18}
+
+# Engines compared with the SQL pushdown engine, and the optional
+# dependency each one needs
+ENGINES = {"python": None, "typed": "msgspec", "columnar": "numpy"}
+
+
+def _engine(entity: str, engine: str):
+    if ENGINES[engine]:
+        pytest.importorskip(ENGINES[engine])
+    return getattr(silver, f"_{entity}_{engine}")
+
+
+def _load_raw(entity: str, id_column: str, payloads: dict) -> None:
+    execute_query(f"DELETE FROM raw.{entity}")
+
+    for record_id, payload in payloads.items():
+        execute_query(
+            f"INSERT INTO raw.{entity} ({id_column}, payload) VALUES (%s, %s::jsonb)",
+            (record_id, json.dumps(payload)),
+        )
+
+
+def _silver_rows(table: str, columns: tuple, ids) -> list:
+    return fetch_all(
+        f"""
+        SELECT {", ".join(columns)}
+        FROM {table}
+        WHERE {columns[0]} = ANY(%s)
+        ORDER BY {columns[0]}
+        """,
+        (list(ids),),
+    )
+
+
+# PRODUCTS
+@pytest.mark.parametrize("engine", ["python", "typed", "columnar"])
+def test_products_engines_load_the_same_rows(warehouse, engine):
+    _load_raw("products", "product_id", RAW_PRODUCTS)
+
+    seen, loaded, _ = _engine("products", engine)(None)
+    rows = _silver_rows("silver.products", silver.PRODUCT_COLUMNS, RAW_PRODUCTS)
+
+    execute_query(
+        "DELETE FROM silver.products WHERE product_id = ANY(%s)", (list(RAW_PRODUCTS),)
+    )
+
+    sql_seen, sql_loaded, _ = silver_sql.transform_products(None)
+    sql_rows = _silver_rows("silver.products", silver.PRODUCT_COLUMNS, RAW_PRODUCTS)
+
+    assert (sql_seen, sql_loaded) == (seen, loaded) == (
+        len(RAW_PRODUCTS),
+        len(EXPECTED_PRODUCTS),
+    )
+    assert sql_rows == rows
+    assert {row["product_id"] for row in rows} == EXPECTED_PRODUCTS
+
+
+def test_missing_product_fields_get_defaults(warehouse):
+    _load_raw("products", "product_id", RAW_PRODUCTS)
+    silver_sql.transform_products(None)
+    rows = {
+        row["product_id"]: row
+        for row in _silver_rows("silver.products", silver.PRODUCT_COLUMNS, RAW_PRODUCTS)
+    }
+
+    assert (rows[910003]["price"], rows[910003]["price_bucket"]) == (0, "low")
+    assert rows[910004]["price"] == 0
+    assert (rows[910009]["rating_rate"], rows[910009]["rating_count"]) == (0, 0)
+    assert (rows[910010]["rating_rate"], rows[910010]["rating_count"]) == (0, 0)
+    assert (rows[910011]["title"], rows[910011]["category"]) == ("", "")
+    assert rows[910002]["rating_count"] == 7
+
+
+# USERS
+@pytest.mark.parametrize("engine", ["python", "typed"])
+def test_users_engines_load_the_same_rows(warehouse, engine):
+    _load_raw("users", "user_id", RAW_USERS)
+
+    seen, loaded, _ = _engine("users", engine)(None)
+    rows = _silver_rows("silver.users", silver.USER_COLUMNS, RAW_USERS)
+
+    execute_query("DELETE FROM silver.users WHERE user_id = ANY(%s)", (list(RAW_USERS),))
+
+    sql_seen, sql_loaded, _ = silver_sql.transform_users(None)
+    sql_rows = _silver_rows("silver.users", silver.USER_COLUMNS, RAW_USERS)
+
+    assert (sql_seen, sql_loaded) == (seen, loaded) == (len(RAW_USERS), len(RAW_USERS))
+    assert sql_rows == rows
+    assert rows[0] == {
+        "user_id": 910001,
+        "email": "ann@example.com",
+        "username": "ann",
+        "first_name": "Ann",
+        "last_name": "Lee",
+        "city": "Rio",
+    }
+    assert all(row["first_name"] == "" for row in rows[1:6])
+
+
+# CARTS
+
+
+@pytest.fixture
+def raw_carts(warehouse):
+    execute_query("DELETE FROM silver.carts")
+
+    for user_id in USERS:
+        execute_query(
+            """
+            INSERT INTO silver.users (user_id, email, username)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (user_id) DO NOTHING
+            """,
+            (user_id, f"user{user_id}@example.com", f"user{user_id}"),
+        )
+
+    for product_id in PRODUCTS:
+        execute_query(
+            """
+            INSERT INTO silver.products (product_id, title, category, price, price_bucket)
+            VALUES (%s, %s, 'test', 10, 'low')
+            ON CONFLICT (product_id) DO NOTHING
+            """,
+            (product_id, f"product {product_id}"),
+        )
+
+    _load_raw("carts", "cart_id", RAW_CARTS)
+
+
+def _silver_carts() -> tuple[list, list]:
+    carts = fetch_all(
+        "SELECT cart_id, user_id, cart_date FROM silver.carts ORDER BY cart_id"
+    )
+    items = fetch_all(
+        """
+        SELECT cart_id, product_id, quantity
+        FROM silver.cart_items
+        ORDER BY cart_id, product_id
+        """
+    )
+    return carts, items
+
+
+@pytest.mark.parametrize("engine", ["python", "typed"])
+def test_carts_engines_load_the_same_rows(raw_carts, engine):
+    seen, loaded, _ = _engine("carts", engine)(None)
+    python_rows = _silver_carts()
+
+    execute_query("DELETE FROM silver.carts")
+
+    sql_seen, sql_loaded, _ = silver_sql.transform_carts(None)
+    sql_rows = _silver_carts()
+
+    assert (sql_seen, sql_loaded) == (seen, loaded) == (len(RAW_CARTS), len(EXPECTED_CARTS))
+    assert sql_rows == python_rows
+    assert {row["cart_id"] for row in python_rows[0]} == EXPECTED_CARTS
+
+
+def test_invalid_items_are_skipped(raw_carts):
+    silver_sql.transform_carts(None)
+    _, items = _silver_carts()
+
+    assert [
+        (row["product_id"], row["quantity"]) for row in items if row["cart_id"] == 14
+    ] == [(900001, 2)]
+    assert [
+        (row["product_id"], row["quantity"]) for row in items if row["cart_id"] == 15
+    ] == [(900002, 3)]
+    assert [
+        (row["product_id"], row["quantity"]) for row in items if row["cart_id"] == 18
+    ] == [(900002, 2), (900003, 2)]